@@ -0,0 +1,98 @@
+"""Client asset I/O and decode time: separate PNGs versus the sprite atlas.
+
+  png      - open and decode every PNG in snake_ladder_assets on its own (what
+             the client did), and just the two board sprites it actually uses
+  atlas    - mmap the atlas, parse its index and slice the same sprites out
+             (no decode; only the pages under those sprites are read)
+
+Each is timed with the files in the page cache ("warm") and, where the OS
+allows dropping a file's cached pages, from disk ("cold"). The atlas is built
+into a temporary copy of the assets first.
+
+Usage:
+    python bench_assets.py [--runs 7]
+"""
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+CLIENT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "client")
+sys.path.insert(0, CLIENT_DIR)
+
+from PIL import Image  # noqa: E402
+
+import atlas  # noqa: E402
+
+USED = ("snake_big", "ladder_big")  # what SpriteCache loads for the board
+
+
+def drop_cache(paths):
+    # Best effort: ask the kernel to forget the cached pages of these files
+    for path in paths:
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+
+
+def timed(fn, runs: int, before=None) -> float:
+    samples = []
+    for _ in range(runs):
+        if before:
+            before()
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1e3
+
+
+def decode(paths):
+    for path in paths:
+        with Image.open(path) as f:
+            f.convert("RGBA")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=7)
+    args = parser.parse_args()
+
+    asset_dir = os.path.join(tempfile.mkdtemp(), "snake_ladder_assets")
+    shutil.copytree(os.path.join(CLIENT_DIR, "snake_ladder_assets"), asset_dir,
+                    ignore=shutil.ignore_patterns(atlas.ATLAS_NAME))
+    start = time.perf_counter()
+    atlas_path = atlas.build(asset_dir, os.path.join(os.path.dirname(asset_dir), atlas.ATLAS_NAME))
+    print(f"build      {(time.perf_counter() - start) * 1e3:8.1f} ms   {os.path.getsize(atlas_path)} bytes")
+
+    every_png = [os.path.join(asset_dir, f"{name}.png") for name in atlas.sources(asset_dir)]
+    used_png = [os.path.join(asset_dir, f"{name}.png") for name in USED]
+
+    def from_atlas():
+        sheet = atlas.Atlas(atlas_path)
+        for name in USED:
+            sheet.image(name)
+
+    can_drop = hasattr(os, "posix_fadvise")
+    cases = (
+        ("png all", lambda: decode(every_png), every_png),
+        ("png used", lambda: decode(used_png), used_png),
+        ("atlas used", from_atlas, [atlas_path]),
+    )
+    for label, fn, files in cases:
+        warm = timed(fn, args.runs)
+        cold = timed(fn, args.runs, lambda: drop_cache(files)) if can_drop else float("nan")
+        read = sum(os.path.getsize(path) for path in files)
+        if label == "atlas used":
+            index = atlas.Atlas(atlas_path).index["sprites"]
+            read = sum(index[name][2] * index[name][3] * 4 for name in USED)  # pages actually touched, roughly
+        print(f"{label:<10} warm {warm:8.1f} ms   cold {cold:8.1f} ms   {read:>9} bytes read")
+
+
+if __name__ == "__main__":
+    main()
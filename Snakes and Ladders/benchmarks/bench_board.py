@@ -0,0 +1,216 @@
+"""Cost of putting the static board on the game canvas.
+
+Compares the old way (a rectangle and a text per tile, then lines and resized
+sprites per snake and ladder, all as canvas items) with board_render: one PIL
+composite, cached on disk, shown as a single canvas image. Reports:
+
+  render     - PIL compositing with nothing cached (first window ever), again with
+               the sprite variants cached (a new theme or size), and the
+               disk-cached PNG load every later window pays
+  geometry   - the 101 token spots worked out from row/column math on every
+               call (as get_tile_center_coords did) versus the per-size table
+  resize     - a 4K-sized board drawn with the sprite variants cached (what a
+               window resize does) versus loading the same board from the
+               disk cache, which at this size is the slower of the two
+  canvas     - time to draw the board on a Tk canvas and the canvas item count,
+               old versus new (needs a display; skipped without one)
+  window     - opening a full SnakeLadderGame window (needs a display)
+
+Usage:
+    python bench_board.py [--runs 5]
+"""
+import argparse
+import math
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+CLIENT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "client")
+sys.path.insert(0, CLIENT_DIR)
+sys.path.insert(0, os.path.join(CLIENT_DIR, "..", "common"))
+
+from PIL import Image  # noqa: E402
+
+import board_render  # noqa: E402
+import sprites  # noqa: E402
+from board import LADDERS, SNAKES  # noqa: E402
+
+BOARD_SIZE, BOARD_MARGIN = 640, 40
+sprites.ASSET_PATH = os.path.join(CLIENT_DIR, "snake_ladder_assets")
+
+
+def load_sprites():
+    return tuple(Image.open(sprites.SPRITES.path(asset)).convert("RGBA") for asset in ("snake", "ladder"))
+
+
+def legacy_draw(canvas, tk, ImageTk) -> list:
+    # What draw_board, load_images and draw_snakes_and_ladders did before board_render
+    tile = BOARD_SIZE // 10
+    colors = ['#3498db', '#5dade2', '#85c1e9', '#aed6f1', '#d6eaf8', '#ebf5fb']
+    for row in range(10):
+        for col in range(10):
+            x1, y1 = col * tile + BOARD_MARGIN, (9 - row) * tile + BOARD_MARGIN
+            index = row * 10 + (col if row % 2 == 0 else 9 - col) + 1
+            color = colors[(row + col) % len(colors)]
+            if index == 1:
+                color = '#27ae60'
+            elif index == 100:
+                color = '#f1c40f'
+            elif index in SNAKES:
+                color = '#e74c3c'
+            elif index in LADDERS:
+                color = '#2ecc71'
+            canvas.create_rectangle(x1, y1, x1 + tile, y1 + tile, fill=color, outline='#2c3e50', width=2)
+            canvas.create_text(x1 + tile // 2, y1 + tile // 2, text=str(index), font=("Arial", 12, "bold"),
+                               fill="#2c3e50")
+    snake_img, ladder_img = load_sprites()
+    photos = []
+    for start, end in SNAKES.items():
+        (sx, sy), (ex, ey) = (board_render.tile_center(p, BOARD_SIZE, BOARD_MARGIN) for p in (start, end))
+        canvas.create_line(sx, sy, ex, ey, fill='#c0392b', width=8, smooth=True, capstyle=tk.ROUND, arrow=tk.LAST,
+                           arrowshape=(16, 20, 6))
+        photos.append(ImageTk.PhotoImage(snake_img.resize((40, 40), Image.Resampling.LANCZOS)))
+        canvas.create_image(ex, ey, image=photos[-1])
+    for start, end in LADDERS.items():
+        (sx, sy), (ex, ey) = (board_render.tile_center(p, BOARD_SIZE, BOARD_MARGIN) for p in (start, end))
+        canvas.create_line(sx - 8, sy, ex - 8, ey, fill='#27ae60', width=4, capstyle=tk.ROUND)
+        canvas.create_line(sx + 8, sy, ex + 8, ey, fill='#27ae60', width=4, capstyle=tk.ROUND)
+        for i in range(1, 5):
+            x, y = sx + (ex - sx) * i / 5, sy + (ey - sy) * i / 5
+            canvas.create_line(x - 8, y, x + 8, y, fill='#2ecc71', width=3)
+        rotated = ladder_img.rotate(-math.degrees(math.atan2(ey - sy, ex - sx)), expand=True)
+        photos.append(ImageTk.PhotoImage(rotated.resize((50, 50), Image.Resampling.LANCZOS)))
+        canvas.create_image((sx + ex) // 2, (sy + ey) // 2, image=photos[-1])
+    return photos
+
+
+def cached_draw(canvas, cache_dir: str, ImageTk) -> list:
+    board = board_render.board_image(BOARD_SIZE, BOARD_MARGIN, SNAKES, LADDERS, sprites.SPRITES, cache_dir=cache_dir)
+    photo = ImageTk.PhotoImage(board)
+    canvas.create_image(0, 0, image=photo, anchor="nw")
+    return [photo]
+
+
+def timed(fn, runs: int) -> float:
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1e3
+
+
+def bench_render(runs: int, cache_dir: str):
+    def cold():
+        sprites.SPRITES.clear()
+        board_render.board_image(BOARD_SIZE, BOARD_MARGIN, SNAKES, LADDERS, sprites.SPRITES, cache_dir="")
+
+    def sprites_cached():
+        board_render.board_image(BOARD_SIZE, BOARD_MARGIN, SNAKES, LADDERS, sprites.SPRITES, cache_dir="")
+
+    def disk_cached():
+        board_render.board_image(BOARD_SIZE, BOARD_MARGIN, SNAKES, LADDERS, sprites.SPRITES, cache_dir=cache_dir)
+    disk_cached()
+    print(f"render     cold {timed(cold, runs):8.1f} ms   sprites cached {timed(sprites_cached, runs):8.1f} ms   "
+          f"disk cache {timed(disk_cached, runs):8.1f} ms")
+
+
+def bench_geometry(runs: int):
+    def computed(pos):
+        # The per-call math get_tile_center_coords used to do
+        tile = BOARD_SIZE // 10
+        pos = pos - 1
+        row = pos // 10
+        col = pos % 10 if row % 2 == 0 else 9 - (pos % 10)
+        return col * tile + tile // 2 + BOARD_MARGIN, BOARD_SIZE - (row * tile + tile // 2) + BOARD_MARGIN
+
+    def math_all():
+        for _ in range(1000):
+            for pos in range(1, 101):
+                computed(pos)
+
+    def table_all():
+        for _ in range(1000):
+            centers = board_render.geometry(BOARD_SIZE, BOARD_MARGIN).centers
+            for pos in range(1, 101):
+                centers[pos]
+    # 1000 rounds of 100 lookups, so milliseconds per run are microseconds per round
+    print(f"geometry   math {timed(math_all, runs):8.1f} us   table {timed(table_all, runs):8.1f} us"
+          f"   per 100 lookups")
+
+
+def bench_resize(runs: int, cache_dir: str):
+    size, margin = 1920, 120
+
+    def rendered():
+        board_render.board_image(size, margin, SNAKES, LADDERS, sprites.SPRITES, cache_dir="")
+
+    def disk_cached():
+        board_render.board_image(size, margin, SNAKES, LADDERS, sprites.SPRITES, cache_dir=cache_dir)
+    disk_cached()
+    print(f"resize     {size + margin * 2}px board: render {timed(rendered, runs):8.1f} ms   "
+          f"disk cache {timed(disk_cached, runs):8.1f} ms")
+
+
+def bench_canvas(runs: int, cache_dir: str):
+    import tkinter as tk
+    from PIL import ImageTk
+    try:
+        root = tk.Tk()
+    except tk.TclError as e:
+        print(f"canvas     skipped ({e})")
+        return None
+    root.withdraw()
+    for label, draw in (("old", lambda c: legacy_draw(c, tk, ImageTk)), ("new", lambda c: cached_draw(c, cache_dir, ImageTk))):
+        samples, items = [], 0
+        for _ in range(runs):
+            canvas = tk.Canvas(root, width=BOARD_SIZE + BOARD_MARGIN * 2, height=BOARD_SIZE + BOARD_MARGIN * 2)
+            canvas.pack()
+            start = time.perf_counter()
+            keep = draw(canvas)  # noqa: F841  (PhotoImages must outlive the update)
+            root.update_idletasks()
+            samples.append(time.perf_counter() - start)
+            items = len(canvas.find_all())
+            canvas.destroy()
+        print(f"canvas     {label}  {statistics.median(samples) * 1e3:8.1f} ms   {items:4d} canvas items")
+    return root
+
+
+def bench_window(root, runs: int):
+    import tkinter as tk
+    os.chdir(CLIENT_DIR)  # the game finds its assets relative to the working directory
+    from snake_ladder_game import SnakeLadderGame
+
+    def open_window():
+        window = tk.Toplevel(root)
+        game = SnakeLadderGame(window, singleplayer=True)
+        window.update_idletasks()
+        items = len(game.canvas.find_all())
+        window.destroy()
+        return items
+
+    items = open_window()  # first one fills the disk cache
+    print(f"window     {timed(open_window, runs):8.1f} ms to open a game window   {items} canvas items")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    cache_dir = os.path.join(tempfile.mkdtemp(), "board_cache")
+    bench_render(args.runs, cache_dir)
+    bench_geometry(args.runs)
+    bench_resize(args.runs, cache_dir)
+    root = bench_canvas(args.runs, cache_dir)
+    if root is not None:
+        board_render.BOARD_CACHE_DIR = cache_dir
+        bench_window(root, args.runs)
+        root.destroy()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Memory and CPU cost of server-side bot games.
+
+Seats two bots in each of N sessions on one event loop, with no connected
+clients, and lets every game run to 100 through server.play_roll, the same
+path a player's roll takes (broadcast to an empty session included). Reports:
+
+  setup KiB/game  - memory held by a seated, idle game (two Bot tasks + state)
+  peak KiB/game   - tracemalloc peak while all games run concurrently
+  CPU us/game     - process CPU time per finished game
+  CPU us/roll     - the same per roll
+
+CPU is measured in a separate pass from memory because tracemalloc slows
+allocation down considerably.
+
+Usage:
+    python bench_bots.py [--games 1000 5000] [--delay 0]
+"""
+import argparse
+import asyncio
+import gc
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "server"))
+os.chdir(tempfile.mkdtemp())  # keep the benchmark DB out of the repo
+
+import server  # noqa: E402
+
+
+def seat_games(n: int, delay: float) -> list:
+    """Create n bot-vs-bot sessions; returns their bot tasks"""
+    tasks = []
+    for i in range(n):
+        session_id = f"bench-{i}"
+        server.games[session_id] = {"positions": {}, "turn": None, "players": {}, "winner": None}
+        tasks.append(server.bot_manager.add(session_id, delay=delay).task)
+        tasks.append(server.bot_manager.add(session_id, delay=delay).task)
+    return tasks
+
+
+def drop_games(n: int):
+    for i in range(n):
+        assert server.games.pop(f"bench-{i}")["winner"] is not None
+
+
+async def cpu_pass(n: int, delay: float) -> tuple[float, float, int]:
+    """Wall seconds, CPU seconds and rolls for n concurrent games"""
+    rolls = server.BROADCAST_SECONDS.count("state_update")
+    gc.collect()
+    cpu = time.process_time()
+    wall = time.perf_counter()
+    await asyncio.gather(*seat_games(n, delay))
+    wall = time.perf_counter() - wall
+    cpu = time.process_time() - cpu
+    drop_games(n)
+    return wall, cpu, server.BROADCAST_SECONDS.count("state_update") - rolls
+
+
+async def memory_pass(n: int, delay: float) -> tuple[int, int]:
+    """Bytes held by n seated games before they start, and peak bytes while they run"""
+    gc.collect()
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    tasks = seat_games(n, delay)
+    setup = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.reset_peak()
+    await asyncio.gather(*tasks)
+    peak = tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+    drop_games(n)
+    return setup, peak
+
+
+async def run(sizes: list[int], delay: float):
+    print(f"{'games':>7}{'wall s':>9}{'rolls':>9}{'setup KiB/game':>16}{'peak KiB/game':>15}"
+          f"{'CPU us/game':>13}{'CPU us/roll':>13}")
+    for n in sizes:
+        wall, cpu, rolls = await cpu_pass(n, delay)
+        setup, peak = await memory_pass(n, delay)
+        print(f"{n:>7}{wall:>9.2f}{rolls:>9}{setup / n / 1024:>16.2f}{peak / n / 1024:>15.2f}"
+              f"{cpu / n * 1e6:>13.0f}{cpu / rolls * 1e6:>13.2f}")
+    assert server.bot_manager.count() == 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--games", type=int, nargs="+", default=[1000, 5000], help="concurrent games per run")
+    parser.add_argument("--delay", type=float, default=0.0, help="bot thinking time per roll in seconds")
+    args = parser.parse_args()
+    asyncio.run(run(args.games, args.delay))
+
+
+if __name__ == "__main__":
+    main()
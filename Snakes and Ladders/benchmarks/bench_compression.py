@@ -0,0 +1,122 @@
+"""CPU versus bytes for compressing typical game frames.
+
+Replays the frames of a simulated two-player game (one game_state, then one
+state_update per roll) through each strategy and reports the average wire size
+and encode/decode time per frame:
+
+  raw            - no compression
+  frame deflate  - wire.DeflateCodec: each frame deflated on its own
+                   (what the Tk client negotiates through *.deflate subprotocols)
+  permessage     - RFC 7692 permessage-deflate with context takeover, as
+                   uvicorn negotiates it with browsers / the websockets library
+
+Usage:
+    python bench_compression.py [--rolls 80]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "common"))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "server"))
+
+import wire  # noqa: E402
+from compression import ThresholdPerMessageDeflate  # noqa: E402
+from websockets.frames import Frame, Opcode  # noqa: E402
+
+PLAYERS = {
+    "ivkeex": {"display_name": "Ivan od Marija", "display_avatar": "🚀"},
+    "marija_99": {"display_name": "Marija", "display_avatar": "👑"},
+}
+
+
+def simulated_game(rolls: int) -> list[dict]:
+    rng = random.Random(7)
+    positions = {"ivkeex": 0, "marija_99": 0}
+    order = list(positions)
+    frames = [{"type": "game_state", "positions": dict(positions), "players": PLAYERS, "turn": None}]
+    for i in range(rolls):
+        player = order[i % 2]
+        roll = rng.randint(1, 6)
+        positions[player] = min(positions[player] + roll, 100)
+        frames.append({"type": "state_update", "positions": dict(positions), "turn": order[(i + 1) % 2],
+                       "last_roll": roll, "player": player, "players": PLAYERS})
+    return frames
+
+
+def payload_bytes(codec, message: dict) -> bytes:
+    frame = codec.encode(message)
+    return frame.encode("utf-8") if isinstance(frame, str) else frame
+
+
+def run_codec(codec, messages: list[dict]) -> tuple[float, float, float]:
+    start = time.perf_counter()
+    frames = [codec.encode(m) for m in messages]
+    encode = time.perf_counter() - start
+    start = time.perf_counter()
+    for frame in frames:
+        codec.decode(frame)
+    decode = time.perf_counter() - start
+    size = sum(len(f.encode("utf-8")) if isinstance(f, str) else len(f) for f in frames)
+    n = len(messages)
+    return size / n, encode / n, decode / n
+
+
+def run_permessage(inner, messages: list[dict], min_size: int, level: int) -> tuple[float, float, float]:
+    # One compressor per connection, window settings as in CompressedWebSocketProtocol
+    settings = dict(remote_no_context_takeover=False, local_no_context_takeover=False,
+                    remote_max_window_bits=12, local_max_window_bits=12,
+                    compress_settings={"memLevel": 5, "level": level})
+    sender = ThresholdPerMessageDeflate(**settings, min_size=min_size)
+    receiver = ThresholdPerMessageDeflate(**settings, min_size=min_size)
+    opcode = Opcode.BINARY if inner.binary else Opcode.TEXT
+
+    start = time.perf_counter()
+    frames = [sender.encode(Frame(opcode, payload_bytes(inner, m))) for m in messages]
+    encode = time.perf_counter() - start
+    start = time.perf_counter()
+    for frame in frames:
+        inner.decode(receiver.decode(frame).data)
+    decode = time.perf_counter() - start
+    n = len(messages)
+    return sum(len(f.data) for f in frames) / n, encode / n, decode / n
+
+
+def best(fn, repeat: int = 7):
+    results = [fn() for _ in range(repeat)]
+    return results[0][0], min(r[1] for r in results), min(r[2] for r in results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rolls", type=int, default=80)
+    args = parser.parse_args()
+
+    messages = simulated_game(args.rolls)
+    inners = [("json", wire.JSON)] + ([("msgpack", wire.MSGPACK)] if wire.MSGPACK else [])
+    zdicts = {"json": wire.JSON_ZDICT, "msgpack": b""}
+
+    print(f"{len(messages)} frames per game")
+    print(f"{'encoding':<9}{'strategy':<26}{'bytes/frame':>12}{'encode us':>11}{'decode us':>11}")
+    for name, inner in inners:
+        rows = [("raw", best(lambda: run_codec(inner, messages)))]
+        for level in (1, 6, 9):
+            codec = wire.DeflateCodec(inner, "bench", zdict=zdicts[name], min_size=0, level=level)
+            rows.append((f"frame deflate L{level}", best(lambda: run_codec(codec, messages))))
+        if zdicts[name]:
+            codec = wire.DeflateCodec(inner, "bench", min_size=0)
+            rows.append(("frame deflate L6 no dict", best(lambda: run_codec(codec, messages))))
+        codec = wire.DeflateCodec(inner, "bench", zdict=zdicts[name])
+        rows.append((f"frame deflate >={codec.min_size}B", best(lambda: run_codec(codec, messages))))
+        for level in (1, 6):
+            rows.append((f"permessage L{level}", best(lambda: run_permessage(inner, messages, 0, level))))
+        rows.append(("permessage L6 >=128B", best(lambda: run_permessage(inner, messages, 128, 6))))
+
+        for strategy, (size, encode, decode) in rows:
+            print(f"{name:<9}{strategy:<26}{size:>12.1f}{encode * 1e6:>11.2f}{decode * 1e6:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Append throughput of the session event log on one worker.
+
+Runs the EventLog the server uses in a temporary directory and reports:
+
+  append     - CPU time of append() on the event loop (encode + queue)
+  group      - N producers appending roll events as fast as the loop allows while
+               the writer task commits; durable events per second, events per
+               fsync and time per commit
+  per-event  - the same with every producer waiting for its own event to be
+               synced (what a log without group commit would cost)
+  replay     - rebuilding sessions from the written log (crash recovery)
+
+Usage:
+    python bench_eventlog.py [--events 200000] [--producers 100] [--sync-events 2000]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "server"))
+
+import eventlog  # noqa: E402
+
+POSITIONS = {"ivkeex": 57, "marija_99": 43}
+
+
+def roll(log: eventlog.EventLog, session_id: str, i: int):
+    log.append(session_id, "roll", user="ivkeex", roll=i % 6 + 1, positions=POSITIONS, turn="marija_99",
+               winner=None)
+
+
+def bench_append(n: int):
+    log = eventlog.EventLog(tempfile.mkdtemp())
+    cpu = time.process_time()
+    for i in range(n):
+        roll(log, "4f0c5d3e-8d4b-4a57-9a53-1b6c3c2d9e10", i)
+    cpu = time.process_time() - cpu
+    print(f"append     {cpu / n * 1e6:8.2f} us/event CPU")
+
+
+async def bench_group(n: int, producers: int, wait_each: bool) -> str:
+    directory = tempfile.mkdtemp()
+    log = eventlog.EventLog(directory)
+    writer = asyncio.create_task(log.run_writer())
+    commits = eventlog.COMMIT_EVENTS.count()
+    commit_time = eventlog.COMMIT_SECONDS.total()
+
+    async def producer(p: int):
+        session_id = f"session-{p}"
+        for i in range(n // producers):
+            roll(log, session_id, i)
+            if wait_each:
+                await log.sync()
+            elif i % 10 == 9:
+                await asyncio.sleep(0)  # let other producers (and the writer's wakeup) run
+
+    wall = time.perf_counter()
+    await asyncio.gather(*(producer(p) for p in range(producers)))
+    await log.sync()
+    wall = time.perf_counter() - wall
+    log.stop()
+    await writer
+
+    commits = eventlog.COMMIT_EVENTS.count() - commits
+    commit_time = eventlog.COMMIT_SECONDS.total() - commit_time
+    events = n // producers * producers
+    label = "per-event" if wait_each else "group"
+    print(f"{label:<10} {events / wall:8.0f} events/s durable  {commits} fsyncs  "
+          f"{events / commits:.1f} events/fsync  {commit_time / commits * 1e3:.2f} ms/commit")
+    return directory
+
+
+def bench_replay(directory: str):
+    events = sum(1 for _ in eventlog.read(directory))
+    start = time.perf_counter()
+    # Without the clean-shutdown marker at the end, as after a crash
+    games = {}
+    for event in eventlog.read(directory):
+        eventlog.apply(games, event)
+    elapsed = time.perf_counter() - start
+    print(f"replay     {events / elapsed:8.0f} events/s  ({events} events, {len(games)} sessions, "
+          f"{sum(os.path.getsize(p) for p in eventlog.segment_paths(directory)) / events:.0f} B/event)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=200000)
+    parser.add_argument("--producers", type=int, default=100, help="concurrent sessions appending")
+    parser.add_argument("--sync-events", type=int, default=2000, help="events for the per-event fsync run")
+    args = parser.parse_args()
+
+    bench_append(args.events)
+    directory = asyncio.run(bench_group(args.events, args.producers, wait_each=False))
+    asyncio.run(bench_group(args.sync_events, args.producers, wait_each=True))
+    asyncio.run(bench_group(args.sync_events, 1, wait_each=True))
+    bench_replay(directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Headless game core throughput: whole local games with no window.
+
+Plays N bot-vs-bot games of common/game.py to the end, as tests and
+simulations would, and reports:
+
+  games/s        - finished games per second, without and with a listener
+                   subscribed (what the Tk view adds before any drawing)
+  turns/game     - average turns (rolls) per game
+  first wins     - share of games won by the player who starts
+  events/game    - events emitted per game
+
+Usage:
+    python bench_game.py [--games 20000] [--seed 1]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "common"))
+
+import game  # noqa: E402
+
+
+def play(games: int, seed: int, listen: bool) -> tuple[float, int, int, int]:
+    rng = random.Random(seed)
+    events = turns = first_wins = 0
+
+    def count(event):
+        nonlocal events, turns
+        events += 1
+        turns += isinstance(event, game.Rolled)
+
+    start = time.perf_counter()
+    for _ in range(games):
+        g = game.Game(bots={0, 1}, rng=rng)
+        if listen:
+            g.subscribe(count)
+        first_wins += g.play_out() == 0
+    return time.perf_counter() - start, events, turns, first_wins
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--games", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    bare, _, _, _ = play(args.games, args.seed, listen=False)
+    listened, events, turns, first_wins = play(args.games, args.seed, listen=True)
+    print(f"games/s        {args.games / bare:10.0f} bare   {args.games / listened:10.0f} with a listener")
+    print(f"turns/game     {turns / args.games:10.1f}")
+    print(f"first wins     {first_wins / args.games:10.1%}")
+    print(f"events/game    {events / args.games:10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""Measure the overhead of the /metrics instrumentation on the hot paths.
+
+Compares the instrumented `broadcast` and `db_session` from server.py against
+uninstrumented copies of the same code. Broadcasts go through real Starlette
+WebSocket objects whose ASGI send is a no-op, so the baseline includes the
+per-message encoding and state checks but not socket I/O; the reported
+overhead is therefore an upper bound.
+
+Usage:
+    python bench_metrics.py [--sessions 1000] [--players 2]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import timeit
+from contextlib import contextmanager
+from time import perf_counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "server"))
+os.chdir(tempfile.mkdtemp())  # keep the benchmark DB out of the repo
+
+from starlette.websockets import WebSocket, WebSocketState  # noqa: E402
+
+import server  # noqa: E402
+from database import SessionLocal, User  # noqa: E402
+
+ROUNDS = 15
+
+
+async def _receive():
+    return {"type": "websocket.connect"}
+
+
+async def _send(message):
+    pass
+
+
+def accepted_websocket() -> WebSocket:
+    """A real Starlette WebSocket in the CONNECTED state whose ASGI send is a no-op"""
+    ws = WebSocket({"type": "websocket", "path": "/ws", "headers": []}, _receive, _send)
+    ws.client_state = ws.application_state = WebSocketState.CONNECTED
+    return ws
+
+
+async def broadcast_uninstrumented(session_id: str, message: dict):
+    frames = {}
+    for ws in list(server.clients.get(session_id, [])):
+        codec = server.codecs.get(ws, server.wire.JSON)
+        frame = frames.get(codec)
+        if frame is None:
+            frame = frames[codec] = codec.encode(message)
+        try:
+            if codec.binary:
+                await ws.send_bytes(frame)
+            else:
+                await ws.send_text(frame)
+        except Exception:
+            pass
+
+
+@contextmanager
+def db_session_uninstrumented(endpoint: str):
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def lookup(wrapper):
+    with wrapper("stats") as db:
+        db.query(User).filter(User.username == "nobody").first()
+
+
+def bench_broadcast(sessions: int, players: int) -> tuple[float, float]:
+    message = {
+        "type": "state_update",
+        "positions": {f"player{i}": 42 for i in range(players)},
+        "turn": "player0",
+        "last_roll": 4,
+        "player": "player1",
+        "players": {f"player{i}": {"display_name": f"Player {i}", "display_avatar": "🙂"} for i in range(players)},
+    }
+    for s in range(sessions):
+        server.clients[f"s{s}"] = [accepted_websocket() for _ in range(players)]
+        server.games[f"s{s}"] = {"positions": {}, "turn": None, "players": {}}
+
+    async def run(fn) -> float:
+        start = perf_counter()
+        for s in range(sessions):
+            await fn(f"s{s}", message)
+        return (perf_counter() - start) / sessions
+
+    return asyncio.run(best_of_async(run, broadcast_uninstrumented, server.broadcast))
+
+
+async def best_of_async(run, base_fn, instrumented_fn, rounds: int = ROUNDS) -> tuple[float, float]:
+    """Alternate baseline and instrumented runs and keep the best of each"""
+    base = instrumented = float("inf")
+    for _ in range(rounds):
+        base = min(base, await run(base_fn))
+        instrumented = min(instrumented, await run(instrumented_fn))
+    return base, instrumented
+
+
+def bench_db(iterations: int) -> tuple[float, float]:
+    base = instrumented = float("inf")
+    for _ in range(ROUNDS):
+        base = min(base, timeit.timeit(lambda: lookup(db_session_uninstrumented), number=iterations) / iterations)
+        instrumented = min(instrumented, timeit.timeit(lambda: lookup(server.db_session), number=iterations) / iterations)
+    return base, instrumented
+
+
+def bench_counter(iterations: int) -> float:
+    return min(timeit.repeat(lambda: server.MESSAGES_IN.inc("roll"), number=iterations, repeat=5)) / iterations
+
+
+def report(name: str, base: float, instrumented: float):
+    overhead = (instrumented - base) / base * 100
+    print(f"{name:<22}{base * 1e6:>12.2f}{instrumented * 1e6:>16.2f}{(instrumented - base) * 1e6:>10.2f}"
+          f"{overhead:>11.2f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=1000)
+    parser.add_argument("--players", type=int, default=2)
+    args = parser.parse_args()
+
+    server.init_database()
+    print(f"{'path':<22}{'base us':>12}{'instrumented us':>16}{'delta us':>10}{'overhead':>12}")
+    report(f"broadcast x{args.players}", *bench_broadcast(args.sessions, args.players))
+    report("db_session + query", *bench_db(2000))
+    print(f"{'Counter.inc':<22}{bench_counter(100000) * 1e6:>12.3f} us per call")
+
+
+if __name__ == "__main__":
+    main()
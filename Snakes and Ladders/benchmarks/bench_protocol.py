@@ -0,0 +1,115 @@
+"""Cost of validated, typed dispatch versus reading raw dicts.
+
+For each client action and server event the server and client handle most,
+times the old path (look up "action"/"type" with .get(), compare strings,
+read the fields with .get()) against the new one (protocol.parse_action /
+parse_event, then a dict lookup on the model), and puts both next to the
+cost of decoding the frame they come from.
+
+Usage:
+    python bench_protocol.py
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "common"))
+
+import protocol  # noqa: E402
+import wire  # noqa: E402
+
+PLAYERS = {
+    "ivkeex": {"display_name": "Ivan od Marija", "display_avatar": "🚀"},
+    "marija_99": {"display_name": "Marija", "display_avatar": "👑"},
+}
+POSITIONS = {"ivkeex": 57, "marija_99": 43}
+
+ACTIONS = {
+    "roll": {"action": "roll", "player": "ivkeex"},
+    "player_info": {"action": "player_info", "display_name": "Ivan od Marija", "display_avatar": "🚀"},
+    "roll (mux)": {"action": "roll", "player": "ivkeex", "session": "4f0c5d3e-8d4b-4a57-9a53-1b6c3c2d9e10"},
+}
+EVENTS = {
+    "state_update": {"type": "state_update", "positions": POSITIONS, "turn": "marija_99", "last_roll": 4,
+                     "player": "ivkeex", "players": PLAYERS},
+    "notice": {"type": "notice", "message": "marija_99 joined the game!", "positions": POSITIONS,
+               "turn": "ivkeex", "players": PLAYERS},
+}
+
+
+def handle(*fields):
+    return fields
+
+
+def raw_action(data: dict):
+    # What websocket_endpoint did before the protocol models
+    action = data.get("action")
+    if action == "player_info":
+        return handle(data.get("display_name", "user"), data.get("display_avatar", "🙂"))
+    elif action == "roll":
+        return handle()
+
+
+def raw_event(data: dict):
+    # What the client's on_ws_message did
+    if data["type"] == "state_update":
+        return handle(data.get("positions", {}), data.get("turn"), data.get("last_roll"), data.get("player"),
+                      data.get("players", {}))
+    elif data["type"] == "notice":
+        return handle(data["message"], data.get("positions"), data.get("turn"), data.get("players"))
+
+
+ACTION_HANDLERS = {
+    protocol.PlayerInfo: lambda m: handle(m.display_name or "user", m.display_avatar or "🙂"),
+    protocol.Roll: lambda m: handle(),
+}
+EVENT_HANDLERS = {
+    protocol.StateUpdate: lambda e: handle(e.positions, e.turn, e.last_roll, e.player, e.players),
+    protocol.Notice: lambda e: handle(e.message, e.positions, e.turn, e.players),
+}
+
+
+def typed_action(data: dict):
+    message = protocol.parse_action(data)
+    return ACTION_HANDLERS[type(message)](message)
+
+
+def typed_event(data: dict):
+    event = protocol.parse_event(data)
+    return EVENT_HANDLERS[type(event)](event)
+
+
+def per_call(fn, number: int = 50000) -> float:
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number
+
+
+def main():
+    if wire.MSGPACK is None:
+        sys.exit("msgpack is not installed")
+
+    print(f"protocol v{protocol.VERSION}")
+    print(f"{'message':<16}{'raw us':>9}{'typed us':>10}{'overhead':>10}{'json decode us':>16}"
+          f"{'msgpack decode us':>19}")
+    for table, raw, typed in ((ACTIONS, raw_action, typed_action), (EVENTS, raw_event, typed_event)):
+        for name, message in table.items():
+            json_frame, msgpack_frame = wire.JSON.encode(message), wire.MSGPACK.encode(message)
+            raw_us = per_call(lambda: raw(message)) * 1e6
+            typed_us = per_call(lambda: typed(message)) * 1e6
+            json_us = per_call(lambda: wire.JSON.decode(json_frame)) * 1e6
+            msgpack_us = per_call(lambda: wire.MSGPACK.decode(msgpack_frame)) * 1e6
+            print(f"{name:<16}{raw_us:>9.2f}{typed_us:>10.2f}{typed_us - raw_us:>+10.2f}{json_us:>16.2f}"
+                  f"{msgpack_us:>19.2f}")
+
+    # Rejecting a malformed message must be as cheap as accepting a good one
+    bad = {"action": "player_info", "display_name": 42}
+
+    def reject():
+        try:
+            protocol.parse_action(bad)
+        except protocol.ProtocolError:
+            pass
+    print(f"{'rejected':<16}{'':>9}{per_call(reject) * 1e6:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
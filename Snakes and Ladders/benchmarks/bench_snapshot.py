@@ -0,0 +1,86 @@
+"""Snapshot and restore time for the graceful-restart path.
+
+Fills server.games with N two-player sessions mid-game (a share of them with a
+bot in the second seat), then times what the lifespan does on shutdown
+(snapshot_sessions + snapshot.save) and on startup (restore_sessions, which
+reads the file and restarts the bots), and reports the snapshot size.
+
+Usage:
+    python bench_snapshot.py [--sessions 10000] [--bot-share 0.25]
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "server"))
+os.chdir(tempfile.mkdtemp())  # keep the benchmark DB and snapshot out of the repo
+
+import server  # noqa: E402
+import snapshot  # noqa: E402
+
+
+def fill_sessions(n: int, bot_share: float, rng: random.Random) -> list[tuple[str, str]]:
+    """Sessions with two seats each; returns the (session_id, username) of the bot seats"""
+    bot_seats = []
+    for i in range(n):
+        session_id = str(uuid.uuid4())
+        host, guest = f"player_{i}", f"guest_{i}"
+        if rng.random() < bot_share:
+            guest = f"bot-{i:06x}"
+            bot_seats.append((session_id, guest))
+        server.games[session_id] = {
+            "positions": {host: rng.randint(0, 99), guest: rng.randint(0, 99)},
+            "turn": host,
+            "players": {host: {"display_name": f"Player {i}", "display_avatar": "🚀"},
+                        guest: {"display_name": "Marija", "display_avatar": "👑"}},
+            "winner": None,
+        }
+    return bot_seats
+
+
+async def run(n: int, bot_share: float):
+    rng = random.Random(7)
+    bot_seats = fill_sessions(n, bot_share, rng)
+    for session_id, username in bot_seats:
+        # Long delay: the bots only need to exist, not to play during the measurement
+        server.bot_manager.resume(session_id, username, delay=3600)
+
+    start = time.perf_counter()
+    sessions = server.snapshot_sessions()
+    collected = time.perf_counter() - start
+    size = snapshot.save(sessions)
+    saved = time.perf_counter() - start
+
+    for session_id in list(server.games):
+        server.bot_manager.remove_session(session_id)
+    server.games.clear()
+    await asyncio.sleep(0)
+
+    start = time.perf_counter()
+    server.restore_sessions()
+    restored = time.perf_counter() - start
+
+    assert len(server.games) == n and server.bot_manager.count() == len(bot_seats)
+    print(f"{n} sessions, {len(bot_seats)} with a bot")
+    print(f"  snapshot  {saved * 1e3:8.1f} ms  (collect {collected * 1e3:.1f} ms)  {size / 1024:.0f} KiB"
+          f"  ({size / n:.0f} B/session)")
+    print(f"  restore   {restored * 1e3:8.1f} ms")
+    for session_id in list(server.games):
+        server.bot_manager.remove_session(session_id)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=10000)
+    parser.add_argument("--bot-share", type=float, default=0.25, help="fraction of sessions with a bot seat")
+    args = parser.parse_args()
+    asyncio.run(run(args.sessions, args.bot_share))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Throughput of the tournament engine on one worker.
+
+Starts several all-bot tournaments at once on one event loop, through the same
+TournamentEngine, BotManager and play_roll the server uses, and reports how
+many matches ran side by side, how long the brackets took, and how the
+write-behind batching behaved (rows per flush and time per flush).
+
+Usage:
+    python bench_tournament.py [--tournaments 4] [--entrants 1024] [--bot-delay 0.01]
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "server"))
+os.chdir(tempfile.mkdtemp())  # keep the benchmark DB out of the repo
+
+import server  # noqa: E402
+import tournament  # noqa: E402
+
+
+async def run(tournaments: int, entrants: int, bot_delay: float):
+    server.init_database()
+    engine = server.tournament_engine
+    writer = asyncio.create_task(engine.run_writer())
+
+    cpu = time.process_time()
+    wall = time.perf_counter()
+    brackets = await asyncio.gather(*(engine.create([], entrants, bot_delay) for _ in range(tournaments)))
+    peak = 0
+    while engine.brackets:
+        peak = max(peak, len(engine.matches))
+        await asyncio.sleep(0.01)
+    wall = time.perf_counter() - wall
+    cpu = time.process_time() - cpu
+    writer.cancel()
+
+    matches = sum(len(matches) for bracket in brackets for matches in bracket.rounds)
+    flushes = tournament.FLUSH_SECONDS.count()
+    rows = tournament.FLUSHED_ROWS.value()
+    print(f"{tournaments} x {entrants} entrants, bot delay {bot_delay}s")
+    print(f"  matches {matches}  peak concurrent {peak}  wall {wall:.2f}s  CPU {cpu:.2f}s"
+          f"  ({cpu / matches * 1e3:.2f} ms CPU/match)")
+    print(f"  flushes {flushes}  rows {rows:.0f}  rows/flush {rows / flushes:.1f}"
+          f"  avg flush {tournament.FLUSH_SECONDS.total() / flushes * 1e3:.2f} ms")
+    assert all(bracket.winner for bracket in brackets)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tournaments", type=int, default=4)
+    parser.add_argument("--entrants", type=int, default=1024)
+    parser.add_argument("--bot-delay", type=float, default=0.01, help="bot thinking time per roll in seconds")
+    args = parser.parse_args()
+    asyncio.run(run(args.tournaments, args.entrants, args.bot_delay))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Compare the JSON and MessagePack wire encodings.
+
+Prints bytes per message and encode/decode time for the frames the server
+sends most (state_update dominates a game: one per roll, to every player).
+
+Usage:
+    python bench_wire.py
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "common"))
+
+import wire  # noqa: E402
+
+PLAYERS = {
+    "ivkeex": {"display_name": "Ivan od Marija", "display_avatar": "🚀"},
+    "marija_99": {"display_name": "Marija", "display_avatar": "👑"},
+}
+POSITIONS = {"ivkeex": 57, "marija_99": 43}
+
+MESSAGES = {
+    "state_update": {"type": "state_update", "positions": POSITIONS, "turn": "marija_99", "last_roll": 4,
+                     "player": "ivkeex", "players": PLAYERS},
+    "game_state": {"type": "game_state", "positions": POSITIONS, "players": PLAYERS, "turn": "ivkeex"},
+    "notice": {"type": "notice", "message": "marija_99 joined the game!", "positions": POSITIONS,
+               "turn": None, "players": PLAYERS},
+    "player_info_update": {"type": "player_info_update", "players": PLAYERS},
+    "roll (client)": {"action": "roll", "player": "ivkeex"},
+}
+
+
+def per_call(fn, number: int = 20000) -> float:
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number
+
+
+def main():
+    if wire.MSGPACK is None:
+        sys.exit("msgpack is not installed")
+
+    print(f"{'message':<20}{'codec':<10}{'bytes':>7}{'encode us':>11}{'decode us':>11}")
+    for name, message in MESSAGES.items():
+        for codec in (wire.JSON, wire.MSGPACK):
+            frame = codec.encode(message)
+            # MessagePack drops None fields on decode, readers use .get()
+            expected = {k: v for k, v in message.items() if v is not None} if codec.binary else message
+            assert codec.decode(frame) == expected
+            size = len(frame.encode("utf-8")) if isinstance(frame, str) else len(frame)
+            encode = per_call(lambda: codec.encode(message))
+            decode = per_call(lambda: codec.decode(frame))
+            label = "msgpack" if codec.binary else "json"
+            print(f"{name:<20}{label:<10}{size:>7}{encode * 1e6:>11.2f}{decode * 1e6:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
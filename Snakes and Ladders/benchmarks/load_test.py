@@ -0,0 +1,289 @@
+"""Load generator for the Snake & Ladder server.
+
+Spins up N virtual players against the FastAPI app: every player registers and
+logs in, players are paired into sessions (the host calls /create_session),
+both join via /ws/{session_id}/{username} and roll until someone reaches 100.
+
+Reports p50/p95/p99 latency for every REST endpoint and for roll-to-broadcast
+(time from sending {"action": "roll"} until the matching state_update arrives),
+plus messages per second and error counts. Each run is appended to
+results/load_test.jsonl together with the current git commit so regressions
+across commits are visible.
+
+Usage:
+    python load_test.py --spawn --players 50 --games 3
+    python load_test.py --url http://127.0.0.1:8000 --players 200 --rate 5
+
+All virtual players share one IP, so a server started by hand needs raised
+WS_RATE / WS_IP_RATE / AUTH_RATE limits (--spawn does this itself).
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+import requests
+import websockets
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SERVER_DIR = os.path.join(BENCH_DIR, "..", "server")
+RESULTS_FILE = os.path.join(BENCH_DIR, "results", "load_test.jsonl")
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    """Nearest-rank percentile of an unsorted sample list (0 when empty)"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return ordered[rank]
+
+
+def summarize(samples: list[float]) -> dict:
+    """Latency summary in milliseconds"""
+    return {
+        "count": len(samples),
+        "p50_ms": round(percentile(samples, 50) * 1000, 3),
+        "p95_ms": round(percentile(samples, 95) * 1000, 3),
+        "p99_ms": round(percentile(samples, 99) * 1000, 3),
+        "max_ms": round(max(samples) * 1000, 3) if samples else 0.0,
+    }
+
+
+class Stats:
+    def __init__(self):
+        self.rest: dict[str, list[float]] = {}
+        self.roll_to_broadcast: list[float] = []
+        self.errors: dict[str, int] = {}
+        self.messages_in = 0
+        self.messages_out = 0
+        self.games_finished = 0
+
+    def error(self, kind: str):
+        self.errors[kind] = self.errors.get(kind, 0) + 1
+
+
+class VirtualPlayer:
+    def __init__(self, harness, index: int):
+        self.harness = harness
+        self.username = f"lt-{harness.run_id}-{index}"
+        self.password = uuid.uuid4().hex
+        self.http = requests.Session()
+
+    async def rest(self, method: str, path: str, **params):
+        """Timed REST call executed on the harness thread pool"""
+        url = f"{self.harness.base_url}{path}"
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        try:
+            r = await loop.run_in_executor(
+                self.harness.executor,
+                lambda: self.http.request(method, url, params=params, timeout=self.harness.timeout),
+            )
+        except requests.RequestException:
+            self.harness.stats.error(f"rest{path}")
+            return None
+        self.harness.stats.rest.setdefault(path, []).append(time.perf_counter() - start)
+        if r.status_code != 200:
+            self.harness.stats.error(f"rest{path}:{r.status_code}")
+            return None
+        return r.json()
+
+    async def authenticate(self) -> bool:
+        data = await self.rest("POST", "/register", username=self.username, password=self.password, avatar="🤖")
+        if not data or data.get("status") != "success":
+            return False
+        data = await self.rest("POST", "/login", username=self.username, password=self.password)
+        return bool(data) and data.get("status") == "success"
+
+    async def play(self, session_id: str, is_host: bool, players_needed: int = 2):
+        """Join a session and roll on our turn until a player reaches 100"""
+        stats = self.harness.stats
+        url = f"{self.harness.ws_base}/ws/{session_id}/{self.username}"
+        try:
+            async with websockets.connect(url, open_timeout=self.harness.timeout) as ws:
+                await ws.send(json.dumps({"action": "player_info", "display_name": self.username,
+                                          "display_avatar": "🤖"}))
+                stats.messages_out += 1
+                roll_sent_at = None
+                rolled = False
+                while True:
+                    raw = await asyncio.wait_for(ws.recv(), timeout=self.harness.timeout)
+                    stats.messages_in += 1
+                    msg = json.loads(raw)
+                    positions = msg.get("positions")
+                    if positions is None:
+                        continue
+
+                    if msg.get("type") == "state_update" and msg.get("player") == self.username \
+                            and roll_sent_at is not None:
+                        stats.roll_to_broadcast.append(time.perf_counter() - roll_sent_at)
+                        roll_sent_at = None
+
+                    if 100 in positions.values():
+                        if is_host:
+                            stats.games_finished += 1
+                        return
+                    if len(positions) < players_needed or roll_sent_at is not None:
+                        continue
+
+                    turn = msg.get("turn")
+                    my_turn = turn == self.username or (turn is None and is_host and not rolled)
+                    if my_turn:
+                        if self.harness.roll_interval:
+                            await asyncio.sleep(self.harness.roll_interval)
+                        roll_sent_at = time.perf_counter()
+                        rolled = True
+                        await ws.send(json.dumps({"action": "roll", "player": self.username}))
+                        stats.messages_out += 1
+        except (asyncio.TimeoutError, websockets.WebSocketException, OSError):
+            stats.error("ws")
+
+
+class LoadTest:
+    def __init__(self, base_url: str, players: int, games: int, rate: float, timeout: float):
+        self.base_url = base_url.rstrip("/")
+        parsed = urlparse(self.base_url)
+        scheme = "wss" if parsed.scheme == "https" else "ws"
+        self.ws_base = f"{scheme}://{parsed.netloc}"
+        self.players = players
+        self.games = games
+        self.roll_interval = 1.0 / rate if rate > 0 else 0.0
+        self.timeout = timeout
+        self.run_id = uuid.uuid4().hex[:8]
+        self.stats = Stats()
+        self.executor = ThreadPoolExecutor(max_workers=min(max(players, 4), 256))
+
+    async def run_pair(self, host: VirtualPlayer, guest: VirtualPlayer):
+        for _ in range(self.games):
+            data = await host.rest("POST", "/create_session")
+            if not data:
+                continue
+            session_id = data["session_id"]
+            host_task = asyncio.create_task(host.play(session_id, is_host=True))
+            # Give the host a head start so it is players[0] in the session
+            await asyncio.sleep(0.05)
+            await asyncio.gather(host_task, guest.play(session_id, is_host=False))
+
+    async def run(self) -> dict:
+        vplayers = [VirtualPlayer(self, i) for i in range(self.players - self.players % 2)]
+        auth = await asyncio.gather(*(p.authenticate() for p in vplayers))
+        ready = [p for p, ok in zip(vplayers, auth) if ok]
+        random.shuffle(ready)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(self.run_pair(ready[i], ready[i + 1]) for i in range(0, len(ready) - 1, 2)))
+        elapsed = time.perf_counter() - start
+        self.executor.shutdown(wait=False)
+
+        stats = self.stats
+        return {
+            "players": len(vplayers),
+            "authenticated": len(ready),
+            "games_finished": stats.games_finished,
+            "elapsed_s": round(elapsed, 3),
+            "messages_in": stats.messages_in,
+            "messages_out": stats.messages_out,
+            "messages_per_s": round((stats.messages_in + stats.messages_out) / elapsed, 1) if elapsed else 0.0,
+            "rest": {path: summarize(samples) for path, samples in sorted(stats.rest.items())},
+            "roll_to_broadcast": summarize(stats.roll_to_broadcast),
+            "errors": stats.errors,
+        }
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=BENCH_DIR,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def spawn_server(port: int, workdir: str) -> subprocess.Popen:
+    """Start a local uvicorn instance with its database in a scratch directory.
+
+    Every virtual player connects from 127.0.0.1, so the per-IP and per-connection
+    rate limits are lifted; the limiter code path still runs."""
+    unlimited = {name: "1e9" for name in ("WS_RATE", "WS_BURST", "WS_IP_RATE", "WS_IP_BURST",
+                                          "AUTH_RATE", "AUTH_BURST")}
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server:app", "--app-dir", os.path.abspath(SERVER_DIR),
+         "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=workdir,
+        env={**os.environ, **unlimited},
+    )
+    deadline = time.time() + 20
+    while time.time() < deadline:
+        try:
+            requests.post(f"http://127.0.0.1:{port}/create_session", timeout=1)
+            return proc
+        except requests.RequestException:
+            time.sleep(0.2)
+    proc.terminate()
+    raise RuntimeError("uvicorn did not start in time")
+
+
+def store_result(result: dict):
+    os.makedirs(os.path.dirname(RESULTS_FILE), exist_ok=True)
+    with open(RESULTS_FILE, "a") as f:
+        f.write(json.dumps(result, ensure_ascii=False) + "\n")
+
+
+def print_report(result: dict):
+    print(f"commit {result['commit']}  players {result['players']}  games {result['games_finished']}  "
+          f"elapsed {result['elapsed_s']}s  msgs/s {result['messages_per_s']}")
+    rows = dict(result["rest"])
+    rows["roll->broadcast"] = result["roll_to_broadcast"]
+    print(f"{'metric':<22}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, row in rows.items():
+        print(f"{name:<22}{row['count']:>8}{row['p50_ms']:>10}{row['p95_ms']:>10}{row['p99_ms']:>10}")
+    if result["errors"]:
+        print("errors:", result["errors"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="server base URL")
+    parser.add_argument("--spawn", action="store_true", help="start a local uvicorn instance for the run")
+    parser.add_argument("--port", type=int, default=8765, help="port used with --spawn")
+    parser.add_argument("--players", type=int, default=20, help="number of virtual players (paired 2 per session)")
+    parser.add_argument("--games", type=int, default=1, help="games each pair plays back to back")
+    parser.add_argument("--rate", type=float, default=0.0, help="rolls per second per player (0 = as fast as possible)")
+    parser.add_argument("--timeout", type=float, default=30.0, help="per-request / per-message timeout in seconds")
+    parser.add_argument("--no-store", action="store_true", help="don't append the result to results/load_test.jsonl")
+    args = parser.parse_args()
+
+    proc = None
+    scratch = None
+    url = args.url
+    if args.spawn:
+        scratch = tempfile.TemporaryDirectory()
+        proc = spawn_server(args.port, scratch.name)
+        url = f"http://127.0.0.1:{args.port}"
+
+    try:
+        result = asyncio.run(LoadTest(url, args.players, args.games, args.rate, args.timeout).run())
+    finally:
+        if proc:
+            proc.terminate()
+            proc.wait()
+        if scratch:
+            scratch.cleanup()
+
+    result = {"commit": git_commit(), "timestamp": int(time.time()), "url": url,
+              "rate": args.rate, **result}
+    print_report(result)
+    if not args.no_store:
+        store_result(result)
+
+
+if __name__ == "__main__":
+    main()
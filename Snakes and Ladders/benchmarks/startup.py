@@ -0,0 +1,149 @@
+"""Cold-start profile and budget check for the server process.
+
+Measures, over several fresh processes:
+
+  import_ms          - cumulative `python -X importtime` time of `import server`
+  first_response_ms  - process start (uvicorn launched as in the Procfile) until
+                       the first HTTP response of any status
+  ready_ms           - process start until GET /ready answers 200 (DB initialized)
+
+The medians are checked against startup_budget.json (exit status 1 when over
+budget) and appended to results/startup.jsonl with the git commit. The import
+profile of the last run is written to results/importtime.txt, heaviest
+modules first, so changes to the import graph show up in review.
+
+Usage:
+    python startup.py [--runs 5] [--no-store]
+"""
+import argparse
+import http.client
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SERVER_DIR = os.path.abspath(os.path.join(BENCH_DIR, "..", "server"))
+BUDGET_FILE = os.path.join(BENCH_DIR, "startup_budget.json")
+RESULTS_FILE = os.path.join(BENCH_DIR, "results", "startup.jsonl")
+PROFILE_FILE = os.path.join(BENCH_DIR, "results", "importtime.txt")
+PROFILE_LINES = 60
+
+
+def import_profile(workdir: str) -> tuple[float, list[tuple[int, int, str]]]:
+    """`import server` under -X importtime: (cumulative ms, [(self us, cumulative us, module)])"""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", "import server"], cwd=workdir,
+                          env={**os.environ, "PYTHONPATH": SERVER_DIR}, capture_output=True, text=True, check=True)
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        rows.append((int(own), int(cumulative), name.rstrip()))
+    total = next(cumulative for _, cumulative, name in rows if name.strip() == "server")
+    return total / 1000, rows
+
+
+def get_status(port: int, path: str) -> int | None:
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+    try:
+        conn.request("GET", path)
+        return conn.getresponse().status
+    except OSError:
+        return None
+    finally:
+        conn.close()
+
+
+def time_to_ready(port: int, workdir: str, timeout: float = 30.0) -> tuple[float, float]:
+    """(first response ms, ready ms) for one uvicorn process started like the Procfile does"""
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "server:app", "--app-dir", SERVER_DIR, "--host", "127.0.0.1",
+         "--port", str(port), "--ws", "compression:CompressedWebSocketProtocol", "--log-level", "warning"],
+        cwd=workdir,
+    )
+    first = None
+    try:
+        while time.perf_counter() - start < timeout:
+            status = get_status(port, "/ready")
+            if status is not None and first is None:
+                first = time.perf_counter() - start
+            if status == 200:
+                return first * 1000, (time.perf_counter() - start) * 1000
+            time.sleep(0.005)
+        raise RuntimeError("server did not become ready in time")
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def write_profile(rows: list[tuple[int, int, str]], result: dict):
+    os.makedirs(os.path.dirname(PROFILE_FILE), exist_ok=True)
+    with open(PROFILE_FILE, "w") as f:
+        f.write(f"# python -X importtime -c 'import server' (commit {result['commit']}, "
+                f"python {result['python']})\n")
+        f.write(f"# import server: {result['import_ms']} ms; heaviest {PROFILE_LINES} modules by cumulative time\n")
+        f.write(f"{'self [us]':>10} | {'cumulative':>10} | imported package\n")
+        for own, cumulative, name in sorted(rows, key=lambda row: -row[1])[:PROFILE_LINES]:
+            f.write(f"{own:>10} | {cumulative:>10} | {name}\n")
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=BENCH_DIR,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--no-store", action="store_true", help="don't write results/ (budget is still checked)")
+    args = parser.parse_args()
+
+    imports, firsts, readies = [], [], []
+    rows = []
+    for _ in range(args.runs):
+        # A fresh directory per run: no DB file and no snapshot, as on a new dyno
+        with tempfile.TemporaryDirectory() as workdir:
+            import_ms, rows = import_profile(workdir)
+        with tempfile.TemporaryDirectory() as workdir:
+            first_ms, ready_ms = time_to_ready(args.port, workdir)
+        imports.append(import_ms)
+        firsts.append(first_ms)
+        readies.append(ready_ms)
+
+    result = {
+        "commit": git_commit(),
+        "timestamp": int(time.time()),
+        "python": sys.version.split()[0],
+        "runs": args.runs,
+        "import_ms": round(statistics.median(imports), 1),
+        "first_response_ms": round(statistics.median(firsts), 1),
+        "ready_ms": round(statistics.median(readies), 1),
+    }
+    with open(BUDGET_FILE) as f:
+        budget = json.load(f)
+
+    over = False
+    print(f"{'metric':<20}{'median':>10}{'budget':>10}")
+    for key, limit in budget.items():
+        flag = "  OVER" if result[key] > limit else ""
+        over = over or bool(flag)
+        print(f"{key:<20}{result[key]:>10}{limit:>10}{flag}")
+
+    if not args.no_store:
+        write_profile(rows, result)
+        with open(RESULTS_FILE, "a") as f:
+            f.write(json.dumps(result) + "\n")
+    sys.exit(1 if over else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+# Time-based tweens for the game window, all driven by one Tk `after` loop.
+# A tween's progress comes from the clock, not from a frame count, so a late
+# frame just jumps ahead: animations take their wall time however busy Tk is,
+# and at most one callback per window is ever waiting in the event queue.
+import math
+from time import perf_counter
+
+FPS = 60
+
+
+def linear(t: float) -> float:
+    return t
+
+
+def ease_in_out(t: float) -> float:
+    # Cubic: slow start, fast middle, slow stop
+    return 4 * t * t * t if t < 0.5 else 1 - (-2 * t + 2) ** 3 / 2
+
+
+def ease_out(t: float) -> float:
+    return 1 - (1 - t) * (1 - t)
+
+
+def along(points: list[tuple[float, float]], t: float) -> tuple[float, float]:
+    """Point a fraction `t` of the way along a polyline, by distance travelled"""
+    if len(points) == 1 or t <= 0:
+        return points[0]
+    if t >= 1:
+        return points[-1]
+    lengths = [math.dist(a, b) for a, b in zip(points, points[1:])]
+    target = t * sum(lengths)
+    for (ax, ay), (bx, by), length in zip(points, points[1:], lengths):
+        if target <= length and length:
+            f = target / length
+            return ax + (bx - ax) * f, ay + (by - ay) * f
+        target -= length
+    return points[-1]
+
+
+class Tween:
+    __slots__ = ("base", "duration", "on_update", "on_done", "easing", "start")
+
+    def __init__(self, base: float, duration: float, on_update, on_done, easing, start: float):
+        self.base = base  # as asked for, before the speed factor
+        self.duration = duration
+        self.on_update = on_update
+        self.on_done = on_done
+        self.easing = easing
+        self.start = start
+
+
+class Animator:
+    """Runs every active tween of a window from a single `after` loop at a fixed frame rate.
+
+    tween(duration, on_update, on_done) calls on_update(eased progress) on
+    every frame until `duration` seconds have passed, then on_update(1.0) and
+    on_done(). The loop only runs while there are tweens; frames that come
+    late are dropped rather than queued.
+
+    `speed` divides every duration (2 = twice as fast); math.inf finishes
+    each tween on its first frame. That frame always comes from the event
+    loop, never from inside tween(), so a callback runs after the code that
+    started it has returned (at any speed) and Tk gets a turn between
+    frames. set_speed() also rescales tweens already running."""
+
+    def __init__(self, widget, fps: int = FPS, speed: float = 1.0):
+        self.widget = widget
+        self.frame = 1.0 / fps
+        self.speed = speed
+        self.tweens: list[Tween] = []
+        self._job = None
+        self._ticking = False  # tweens started from a callback wait for the frame being run to reschedule
+        self._next_frame = 0.0
+
+    def tween(self, duration: float, on_update=None, on_done=None, easing=ease_in_out) -> Tween:
+        duration = max(duration, 0.0)
+        tween = Tween(duration, duration / self.speed, on_update, on_done, easing, perf_counter())
+        self.tweens.append(tween)
+        if self._job is None and not self._ticking:
+            self._next_frame = tween.start
+            self._schedule(0)
+        return tween
+
+    def delay(self, seconds: float, callback) -> Tween:
+        """Run `callback` after `seconds`, in step with the frames"""
+        return self.tween(seconds, on_done=callback)
+
+    def set_speed(self, speed: float):
+        # Keep each running tween at the progress it has reached, with the rest of it at the new speed
+        now = perf_counter()
+        for tween in self.tweens:
+            progress = 1.0 if tween.duration == 0 else min((now - tween.start) / tween.duration, 1.0)
+            tween.duration = tween.base / speed
+            tween.start = now - progress * tween.duration
+        self.speed = speed
+
+    def cancel(self, tween: Tween):
+        if tween in self.tweens:
+            self.tweens.remove(tween)
+
+    def cancel_all(self):
+        self.tweens.clear()
+        if self._job is not None:
+            try:
+                self.widget.after_cancel(self._job)
+            except Exception:
+                pass  # the window is already gone
+            self._job = None
+
+    def busy(self) -> bool:
+        return bool(self.tweens)
+
+    def _tick(self):
+        self._job = None
+        self._ticking = True
+        now = perf_counter()
+        try:
+            for tween in list(self.tweens):
+                if tween not in self.tweens:
+                    continue  # cancelled by an earlier callback this frame
+                t = 1.0 if tween.duration == 0 else min((now - tween.start) / tween.duration, 1.0)
+                if tween.on_update is not None:
+                    tween.on_update(tween.easing(t))
+                if t >= 1.0:
+                    self.tweens.remove(tween)
+                    if tween.on_done is not None:
+                        tween.on_done()
+        finally:
+            self._ticking = False
+        if not self.tweens or self._job is not None:
+            return
+        # Next frame on the fixed grid; if we are more than a frame behind, skip ahead instead of catching up
+        self._next_frame += self.frame
+        if self._next_frame < now:
+            self._next_frame = now + self.frame
+        self._schedule(max(1, int((self._next_frame - perf_counter()) * 1000)))
+
+    def _schedule(self, ms: int):
+        try:
+            self._job = self.widget.after(ms, self._tick)
+        except Exception:
+            self.tweens.clear()  # the window was destroyed mid-animation
@@ -0,0 +1,131 @@
+# Sprite atlas: every PNG in snake_ladder_assets packed into one file.
+# The pixels are stored raw (RGBA, uncompressed) after a JSON index, so loading
+# is an mmap and a header parse; sub-images are sliced out when first asked for.
+# It is a build artifact, kept in ATLAS_CACHE_DIR rather than next to the assets
+# (and ignored by git): `python atlas.py [asset_dir]` rebuilds it, and the client
+# also builds a missing or stale atlas on first use.
+import json
+import mmap
+import os
+import struct
+import sys
+
+from PIL import Image
+
+ATLAS_NAME = "atlas.bin"
+ATLAS_CACHE_DIR = os.environ.get("ATLAS_CACHE_DIR", "asset_cache")  # overridable, like the board cache
+MAGIC = b"SLAT"
+VERSION = 1
+PREFIX = struct.Struct("<4sHI")  # magic, version, index length
+ALIGN = 16
+
+# Longest side a sprite is stored at: the board never draws one bigger than a tile
+MAX_SIDE = int(os.environ.get("ATLAS_MAX_SIDE", "512"))
+ATLAS_WIDTH = 2048  # rows of sprites are packed up to this width
+
+
+def sources(asset_dir: str) -> dict[str, list]:
+    """name -> [size, mtime] of every PNG the atlas is built from"""
+    found = {}
+    for file_name in sorted(os.listdir(asset_dir)):
+        if file_name.lower().endswith(".png"):
+            st = os.stat(os.path.join(asset_dir, file_name))
+            found[os.path.splitext(file_name)[0]] = [st.st_size, int(st.st_mtime)]
+    return found
+
+
+def build(asset_dir: str, path: str | None = None, max_side: int = MAX_SIDE) -> str:
+    """Pack the PNGs of `asset_dir` into an atlas file (ATLAS_CACHE_DIR/atlas.bin by default); returns its path"""
+    path = path or os.path.join(ATLAS_CACHE_DIR, ATLAS_NAME)
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    images = {}
+    for name in sources(asset_dir):
+        with Image.open(os.path.join(asset_dir, f"{name}.png")) as f:
+            img = f.convert("RGBA")
+        if max(img.size) > max_side:
+            img.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+        images[name] = img
+
+    # Shelf packing, tallest first
+    boxes, x, y, shelf, width = {}, 0, 0, 0, 0
+    for name, img in sorted(images.items(), key=lambda item: -item[1].height):
+        if x + img.width > ATLAS_WIDTH:
+            x, y, shelf = 0, y + shelf, 0
+        boxes[name] = [x, y, img.width, img.height]
+        x += img.width
+        shelf = max(shelf, img.height)
+        width = max(width, x)
+    height = y + shelf
+
+    sheet = Image.new("RGBA", (max(width, 1), max(height, 1)), (0, 0, 0, 0))
+    for name, (x, y, _, _) in boxes.items():
+        sheet.paste(images[name], (x, y))
+    index = json.dumps({"width": sheet.width, "height": sheet.height, "max_side": max_side,
+                        "sources": sources(asset_dir), "sprites": boxes}).encode()
+    header = PREFIX.pack(MAGIC, VERSION, len(index)) + index
+    header += b"\0" * (-len(header) % ALIGN)
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(header)
+        f.write(sheet.tobytes())
+    os.replace(tmp_path, path)
+    return path
+
+
+class Atlas:
+    """A memory-mapped atlas file; image(name) copies one sprite out of it.
+
+    Only the pages under a requested sprite are read from disk, and nothing
+    is decoded: the sheet is raw RGBA viewed in place with Image.frombuffer."""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, index_length = PREFIX.unpack_from(self._map)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} sprite atlas")
+        self.index = json.loads(self._map[PREFIX.size:PREFIX.size + index_length])
+        offset = PREFIX.size + index_length
+        offset += -offset % ALIGN
+        size = (self.index["width"], self.index["height"])
+        self._sheet = Image.frombuffer("RGBA", size, memoryview(self._map)[offset:offset + size[0] * size[1] * 4],
+                                       "raw", "RGBA", 0, 1)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.index["sprites"]
+
+    def image(self, name: str) -> Image.Image:
+        x, y, w, h = self.index["sprites"][name]
+        return self._sheet.crop((x, y, x + w, y + h))
+
+    def stale(self, asset_dir: str) -> bool:
+        return self.index["sources"] != sources(asset_dir) or self.index["max_side"] != MAX_SIDE
+
+
+def load(asset_dir: str, cache_dir: str = ATLAS_CACHE_DIR) -> Atlas | None:
+    """The atlas of `asset_dir` kept in `cache_dir`, rebuilt first if it is missing or out of date; None if that fails"""
+    path = os.path.join(cache_dir, ATLAS_NAME)
+    try:
+        atlas = Atlas(path)
+        if not atlas.stale(asset_dir):
+            return atlas
+    except (OSError, ValueError):
+        pass
+    try:
+        return Atlas(build(asset_dir, path))
+    except (OSError, ValueError):
+        return None  # read-only install or no assets: callers fall back to the PNGs
+
+
+def main():
+    asset_dir = sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                                   "snake_ladder_assets")
+    path = build(asset_dir)
+    atlas = Atlas(path)
+    print(f"{path}: {len(atlas.index['sprites'])} sprites, {atlas.index['width']}x{atlas.index['height']}, "
+          f"{os.path.getsize(path)} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+# Static board (tiles, numbers, snakes, ladders) composited once with PIL.
+# The game window shows it as a single canvas image under the tokens; renders
+# are cached on disk, keyed by everything that affects the pixels, so opening
+# a window or pressing "Play again" normally costs one PNG decode.
+import hashlib
+import math
+import os
+from functools import lru_cache
+from typing import NamedTuple
+
+from PIL import Image, ImageDraw, ImageFont
+
+# Where rendered boards are kept (next to local_scores.json unless overridden)
+BOARD_CACHE_DIR = os.environ.get("BOARD_CACHE_DIR", "board_cache")
+
+# Bump when the drawing code changes so stale renders aren't reused
+RENDER_VERSION = 3
+
+# Tile size the stroke widths and offsets below were drawn for; other sizes scale them
+BASE_TILE = 64
+
+DEFAULT_THEME = {
+    "background": "#2c3e50",
+    "tiles": ("#3498db", "#5dade2", "#85c1e9", "#aed6f1", "#d6eaf8", "#ebf5fb"),
+    "start": "#27ae60",
+    "finish": "#f1c40f",
+    "snake_tile": "#e74c3c",
+    "ladder_tile": "#2ecc71",
+    "grid": "#2c3e50",
+    "number": "#2c3e50",
+    "snake": "#c0392b",
+    "ladder_rail": "#27ae60",
+    "ladder_rung": "#2ecc71",
+}
+
+# Bold fonts tried for the tile numbers, first found wins
+NUMBER_FONTS = ("arialbd.ttf", "Arial Bold.ttf", "DejaVuSans-Bold.ttf", "LiberationSans-Bold.ttf")
+
+
+class Geometry(NamedTuple):
+    """Where everything is on a board of one size, computed once per (board_size, margin).
+
+    centers[pos] is the middle of tile `pos` for 1..100 and centers[0] the
+    off-board start spot (left of tile 1); rects[pos] is the tile's
+    (x1, y1, x2, y2), None for 0. scale is the tile size over BASE_TILE."""
+    board_size: int
+    margin: int
+    tile: int
+    scale: float
+    centers: tuple
+    rects: tuple
+
+    @property
+    def width(self) -> int:
+        return self.board_size + self.margin * 2
+
+
+@lru_cache(maxsize=16)
+def geometry(board_size: int, margin: int) -> Geometry:
+    tile = board_size // 10
+    centers = [(margin * 3 // 8, board_size)]
+    rects = [None]
+    for pos in range(100):
+        row = pos // 10
+        col = pos % 10 if row % 2 == 0 else 9 - (pos % 10)  # rows alternate direction
+        x1, y1 = col * tile + margin, (9 - row) * tile + margin
+        centers.append((x1 + tile // 2, board_size - (row * tile + tile // 2) + margin))
+        rects.append((x1, y1, x1 + tile, y1 + tile))
+    return Geometry(board_size, margin, tile, tile / BASE_TILE, tuple(centers), tuple(rects))
+
+
+def tile_center(pos: int, board_size: int, margin: int) -> tuple[int, int]:
+    """Canvas coordinates of the middle of tile `pos` (1..100)"""
+    return geometry(board_size, margin).centers[max(min(pos, 100), 1)]
+
+
+def number_font(size: int):
+    for name in NUMBER_FONTS:
+        try:
+            return ImageFont.truetype(name, size)
+        except OSError:
+            continue
+    return ImageFont.load_default(size)
+
+
+def cache_key(board_size: int, margin: int, snakes: dict, ladders: dict, theme: dict, sprites_stamp) -> str:
+    key = repr((RENDER_VERSION, board_size, margin, sorted(snakes.items()), sorted(ladders.items()),
+                sorted(theme.items()), sprites_stamp))
+    return hashlib.sha1(key.encode()).hexdigest()[:16]
+
+
+def render(board_size: int, margin: int, snakes: dict, ladders: dict, sprites,
+           theme: dict = DEFAULT_THEME) -> Image.Image:
+    """Draw the board as the canvas used to: tiles, then snakes, then ladders (sprites from a SpriteCache)"""
+    geo = geometry(board_size, margin)
+    tile = geo.tile
+
+    def px(value: float) -> int:
+        return max(1, round(value * geo.scale))
+
+    img = Image.new("RGBA", (geo.width, geo.width), theme["background"])
+    draw = ImageDraw.Draw(img)
+    font = number_font(tile // 4)
+
+    for row in range(10):
+        for col in range(10):
+            index = row * 10 + (col if row % 2 == 0 else 9 - col) + 1
+            color = theme["tiles"][(row + col) % len(theme["tiles"])]
+            if index == 1:
+                color = theme["start"]
+            elif index == 100:
+                color = theme["finish"]
+            elif index in snakes:
+                color = theme["snake_tile"]
+            elif index in ladders:
+                color = theme["ladder_tile"]
+            x1, y1, x2, y2 = geo.rects[index]
+            draw.rectangle([x1, y1, x2, y2], fill=color, outline=theme["grid"], width=px(2))
+            draw.text(geo.centers[index], str(index), font=font, fill=theme["number"], anchor="mm")
+
+    snake_size = tile * 5 // 8
+    for start, end in snakes.items():
+        (sx, sy), (ex, ey) = geo.centers[start], geo.centers[end]
+        _line(draw, sx, sy, ex, ey, theme["snake"], px(8))
+        _arrow_head(draw, sx, sy, ex, ey, theme["snake"], px(20), px(16), px(10))
+        _paste(img, sprites.get("snake", snake_size), ex, ey)
+
+    ladder_size = tile * 25 // 32
+    for start, end in ladders.items():
+        (sx, sy), (ex, ey) = geo.centers[start], geo.centers[end]
+        offset = px(8)
+        _line(draw, sx - offset, sy, ex - offset, ey, theme["ladder_rail"], px(4))
+        _line(draw, sx + offset, sy, ex + offset, ey, theme["ladder_rail"], px(4))
+        steps = 5
+        for i in range(1, steps):
+            x = sx + (ex - sx) * i / steps
+            y = sy + (ey - sy) * i / steps
+            draw.line([(x - offset, y), (x + offset, y)], fill=theme["ladder_rung"], width=px(3))
+        angle = math.degrees(math.atan2(ey - sy, ex - sx))
+        _paste(img, sprites.get("ladder", ladder_size, -angle), (sx + ex) // 2, (sy + ey) // 2)
+    return img
+
+
+def _line(draw: ImageDraw.ImageDraw, x1, y1, x2, y2, color: str, width: int):
+    # Round caps, as Tk's capstyle=ROUND
+    draw.line([(x1, y1), (x2, y2)], fill=color, width=width)
+    r = width / 2
+    for x, y in ((x1, y1), (x2, y2)):
+        draw.ellipse([x - r, y - r, x + r, y + r], fill=color)
+
+
+def _arrow_head(draw: ImageDraw.ImageDraw, x1, y1, x2, y2, color: str, length: int = 20, neck: int = 16,
+                half_width: int = 10):
+    # Same proportions as Tk's arrowshape=(16, 20, 6) on a width 8 line
+    dx, dy = x2 - x1, y2 - y1
+    norm = math.hypot(dx, dy) or 1
+    ux, uy = dx / norm, dy / norm
+    nx, ny = -uy, ux
+    draw.polygon([(x2, y2),
+                  (x2 - ux * length + nx * half_width, y2 - uy * length + ny * half_width),
+                  (x2 - ux * neck, y2 - uy * neck),
+                  (x2 - ux * length - nx * half_width, y2 - uy * length - ny * half_width)], fill=color)
+
+
+def _paste(img: Image.Image, sprite: Image.Image, cx: int, cy: int):
+    # Centered like canvas.create_image(cx, cy, image=...), blending the sprite's alpha
+    img.alpha_composite(sprite.convert("RGBA"), (int(cx - sprite.width // 2), int(cy - sprite.height // 2)))
+
+
+def board_image(board_size: int, margin: int, snakes: dict, ladders: dict, sprites,
+                theme: dict = DEFAULT_THEME, cache_dir: str | None = None) -> Image.Image:
+    """The rendered board, from the disk cache when possible.
+
+    Sprites are only touched on a cache miss, so a warm start never decodes
+    them; their files' stamp is part of the key so edits are noticed.
+    `cache_dir` defaults to BOARD_CACHE_DIR; "" turns the disk cache off."""
+    cache_dir = BOARD_CACHE_DIR if cache_dir is None else cache_dir
+    path = None
+    if cache_dir:
+        path = os.path.join(cache_dir, f"board-{cache_key(board_size, margin, snakes, ladders, theme, sprites.stamp())}.png")
+        try:
+            with Image.open(path) as cached:
+                return cached.convert("RGBA")
+        except OSError:
+            pass  # not rendered yet, or unreadable: draw it again
+
+    img = render(board_size, margin, snakes, ladders, sprites, theme)
+    if path:
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            img.save(tmp_path, "PNG")
+            os.replace(tmp_path, path)  # another window rendering the same board can't see half a file
+        except OSError:
+            pass
+    return img
@@ -8,11 +8,17 @@ import json  # Import JSON for serializing and deserializing local profile and s
 import pyperclip  # Import pyperclip to copy invite links to the system clipboard
 import time  # Import time for timing-related utilities (e.g., duration measurements)
 import os  # Import os for filesystem operations like checking and reading files
-from urllib.parse import urlparse
+import queue  # Import queue to hand lobby events from the stream thread to the Tk thread
+from urllib.parse import urlencode, urlparse
 from snake_ladder_game import \
     SnakeLadderGame  # Import the core game class that renders and runs the board GUI and logic
+import protocol  # Typed WebSocket messages shared with the server, put on sys.path by snake_ladder_game
+import wire  # Shared wire encodings (JSON / MessagePack), put on sys.path by snake_ladder_game
+from http_worker import HttpWorker  # Pooled keep-alive HTTP calls on background threads, answered on the Tk thread
+from ws_pump import WsPump  # Hands game events from the WebSocket threads to the Tk thread, coalesced
 
 SERVER_URL = "https://slidetoglory-project-2.onrender.com"
+WS_COMPRESSION = True  # Offer the *.deflate subprotocols (websocket-client has no permessage-deflate)
 
 
 def build_ws_url(session_id: str, username: str) -> str:
@@ -22,6 +28,12 @@ def build_ws_url(session_id: str, username: str) -> str:
     return f"{scheme}://{host}/ws/{session_id}/{username}"
 
 
+def build_mux_url(username: str, token: str) -> str:
+    parsed = urlparse(SERVER_URL)
+    scheme = "wss" if parsed.scheme == "https" else "ws"
+    return f"{scheme}://{parsed.netloc}/ws?{urlencode({'username': username, 'token': token})}"
+
+
 class GameClient:  # Define the main application class that handles UI flow, auth, and game sessions
     def __init__(self):  # Constructor for the GameClient class
         self.root = tk.Tk()  # Create the main Tkinter root window
@@ -32,6 +44,20 @@ class GameClient:  # Define the main application class that handles UI flow, aut
         self.display_name = None  # Display name shown in games (can differ from account)
         self.display_avatar = None  # Avatar used in-game (can be different from account avatar)
         self.is_host = True  # Tracks whether this client created (hosts) an online session
+        self.token = None  # Token from /login for the shared WebSocket (None on servers without one)
+        self.mux_app = None  # One WebSocket for every online game and the lobby, opened on first use
+        self.mux_connected = False  # True while the shared WebSocket is open
+        self.mux_subscriptions = {}  # session_id -> frames that (re)join it, replayed on every (re)connect
+        self.lobby_listener = None  # Called with (event, data) for lobby events while the lobby window is open
+        self.game_event_handlers = {
+            protocol.StateUpdate: self.on_state_update,
+            protocol.GameState: self.on_game_state,
+            protocol.PlayerInfoUpdate: self.on_player_info_update,
+            protocol.Notice: self.on_notice,
+        }  # Server events for the open game, by model (see common/protocol.py)
+        self.http = HttpWorker(self.root, SERVER_URL)  # Every server call goes through here, never on the Tk thread
+        self.http.warm_up()  # Connect (and wake the server) while the user is still typing
+        self.ws_pump = WsPump(self.root, self.apply_game_event)  # WebSocket threads queue events; Tk applies them
         self.local_profile = self.load_local_profile()  # Load local profile data for offline use
         self.show_register_window()  # Start the UI flow by showing registration screen
 
@@ -113,10 +139,14 @@ class GameClient:  # Define the main application class that handles UI flow, aut
                                      "Username and password are required!")  # Show error if either field missing
                 return  # Abort registration attempt
 
+            self.set_waiting(register_button, True)  # One attempt at a time
+            self.http.post("/register", registered, connection_error,
+                           params={"username": username, "password": password,
+                                   "avatar": avatar})  # Make POST request to server register endpoint with params
+
+        def registered(r):
+            self.set_waiting(register_button, False)  # Allow another attempt
             try:
-                r = requests.post(f"{SERVER_URL}/register",
-                                  params={"username": username, "password": password,
-                                          "avatar": avatar})  # Make POST request to server register endpoint with params
                 if r.status_code == 200 and r.json().get(
                         "status") == "success":  # Check for success response from server
                     messagebox.showinfo("Success", "Registration successful!")  # Notify user of successful registration
@@ -125,13 +155,17 @@ class GameClient:  # Define the main application class that handles UI flow, aut
                     messagebox.showerror("Error", r.json().get("message",
                                                                "Unknown error"))  # Show server-provided error message or fallback
             except Exception as e:
-                messagebox.showerror("Error", f"Connection error: {e}")  # Show network/connection error details
+                connection_error(e)
+
+        def connection_error(e):
+            self.set_waiting(register_button, False)  # Allow another attempt
+            messagebox.showerror("Error", f"Connection error: {e}")  # Show network/connection error details
 
         # Buttons
-        tk.Button(content_frame, text="Register", command=attempt_register,
-                  font=("Arial", 14, "bold"), bg="#27ae60", fg="white",
-                  padx=20, pady=8, relief=tk.FLAT, width=15).pack(
-            pady=15)  # Register button that triggers attempt_register
+        register_button = tk.Button(content_frame, text="Register", command=attempt_register,
+                                    font=("Arial", 14, "bold"), bg="#27ae60", fg="white",
+                                    padx=20, pady=8, relief=tk.FLAT, width=15)
+        register_button.pack(pady=15)  # Register button that triggers attempt_register
 
         tk.Button(content_frame, text="Already have account? Login", command=self.show_login_window,
                   font=("Arial", 12), bg="#3498db", fg="white",
@@ -178,15 +212,20 @@ class GameClient:  # Define the main application class that handles UI flow, aut
                                      "Please enter both username and password!")  # Prompt if fields are missing
                 return  # Stop further processing
 
+            self.set_waiting(login_button, True)  # One attempt at a time
+            self.http.post("/login", lambda r: logged_in(r, username), connection_error,
+                           params={"username": username,
+                                   "password": password})  # Call server /login endpoint with credentials
+
+        def logged_in(r, username):
+            self.set_waiting(login_button, False)  # Allow another attempt
             try:
-                r = requests.post(f"{SERVER_URL}/login",
-                                  params={"username": username,
-                                          "password": password})  # Call server /login endpoint with credentials
                 data = r.json()  # Parse JSON response from the server
                 if r.status_code == 200 and data.get("status") == "success":  # Check successful login
                     self.username = data.get("username",
                                              username)  # Логиран корисник  # English: Set logged-in username (server may normalize it)
                     self.avatar = data.get("avatar", "🙂")  # Update account avatar from server response if available
+                    self.token = data.get("token")  # Lets us open the shared WebSocket as this user
                     # Иницијално display профилот е ист како логираниот
                     self.display_name = self.username  # Initialize display name to the account username
                     self.display_avatar = self.avatar  # Initialize display avatar to the account avatar
@@ -196,13 +235,17 @@ class GameClient:  # Define the main application class that handles UI flow, aut
                     messagebox.showerror("Error",
                                          data.get("message", "Invalid credentials"))  # Show error message from server
             except Exception as e:
-                messagebox.showerror("Error", f"Connection error: {e}")  # Show exception details on connection error
+                connection_error(e)
+
+        def connection_error(e):
+            self.set_waiting(login_button, False)  # Allow another attempt
+            messagebox.showerror("Error", f"Connection error: {e}")  # Show exception details on connection error
 
         # Buttons
-        tk.Button(content_frame, text="Login", command=attempt_login,
-                  font=("Arial", 14, "bold"), bg="#27ae60", fg="white",
-                  padx=20, pady=8, relief=tk.FLAT, width=15).pack(
-            pady=15)  # Login button tied to attempt_login function
+        login_button = tk.Button(content_frame, text="Login", command=attempt_login,
+                                 font=("Arial", 14, "bold"), bg="#27ae60", fg="white",
+                                 padx=20, pady=8, relief=tk.FLAT, width=15)
+        login_button.pack(pady=15)  # Login button tied to attempt_login function
 
         tk.Button(content_frame, text="Back to Register", command=self.show_register_window,
                   font=("Arial", 12), bg="#e67e22", fg="white",
@@ -257,6 +300,11 @@ class GameClient:  # Define the main application class that handles UI flow, aut
                   padx=25, pady=12, width=25, relief=tk.FLAT).pack(
             pady=10)  # Button to join someone else's session via invite link
 
+        tk.Button(content_frame, text="🏠 Browse Lobby", font=("Arial", 16, "bold"),
+                  command=self.show_lobby_window, bg="#16a085", fg="white",
+                  padx=25, pady=12, width=25, relief=tk.FLAT).pack(
+            pady=10)  # Button to pick a session that is waiting for players
+
         # Profile and settings
         profile_frame = tk.Frame(content_frame, bg="#2c3e50")  # Small frame for profile buttons
         profile_frame.pack(pady=20)  # Place it with padding
@@ -307,6 +355,8 @@ class GameClient:  # Define the main application class that handles UI flow, aut
     def logout(self):
         """Излегување од акаунтот"""  # English: Log the user out
         self.username = None  # Clear logged-in username
+        self.token = None  # The shared WebSocket belongs to the account
+        self.close_mux()  # Close it so the next login opens its own
         self.avatar = "🙂"  # Reset account avatar to default
         self.display_name = self.local_profile.get("display_name", "Player")  # Restore display name from local profile
         self.display_avatar = self.local_profile.get("display_avatar", "🙂")  # Restore display avatar from local profile
@@ -337,9 +387,12 @@ class GameClient:  # Define the main application class that handles UI flow, aut
                                    "Please login to create online games!")  # Require login to create online sessions
             return
 
+        self.http.post("/create_session", self.on_session_created,
+                       lambda e: messagebox.showerror("Error", f"Server error: {e}"))  # Ask the server for a new session; answered on the Tk thread
+
+    def on_session_created(self, r):
+        """Прикажи ја поканата и започни ја играта"""  # English: Show the invite for a newly created session and start hosting it
         try:
-            r = requests.post(
-                f"{SERVER_URL}/create_session")  # Request the server to create a new session and return metadata
             if r.status_code == 200:
                 session_info = r.json()  # Parse the session info JSON
                 invite_link = session_info["invite_link"]  # Extract invite link from server response
@@ -402,17 +455,123 @@ class GameClient:  # Define the main application class that handles UI flow, aut
             return  # If user cancels or enters nothing, abort
         try:
             session_id = invite_link.strip().split("/")[-1]  # Extract the session id from the invite URL
-            ws_url = build_ws_url(session_id, self.username)  # Build websocket URL for the session
-
-            current_display_name = self.display_name or self.username  # Choose display name for joining player
-            current_display_avatar = self.display_avatar or self.avatar  # Choose display avatar for joining player
-
-            self.start_game(session_id=session_id, ws_url=ws_url, is_host=False, singleplayer=False,
-                            player_name=current_display_name,
-                            player_avatar=current_display_avatar)  # Start the client as a joining participant
+            self.join_session(session_id)  # Join it as the guest player
         except Exception as e:
             messagebox.showerror("Error", f"Invalid invite link: {e}")  # Error handling for malformed invites
 
+    def join_session(self, session_id):
+        """Приклучи се кон сесија според id"""  # English: Join a session by its id (invite link or lobby)
+        ws_url = build_ws_url(session_id, self.username)  # Build websocket URL for the session
+
+        current_display_name = self.display_name or self.username  # Choose display name for joining player
+        current_display_avatar = self.display_avatar or self.avatar  # Choose display avatar for joining player
+
+        self.start_game(session_id=session_id, ws_url=ws_url, is_host=False, singleplayer=False,
+                        player_name=current_display_name,
+                        player_avatar=current_display_avatar)  # Start the client as a joining participant
+
+    def show_lobby_window(self):
+        """Лоби со игри што чекаат играчи"""  # English: Live list of online games waiting for players
+        if not self.username:
+            messagebox.showwarning("Login Required",
+                                   "Please login to join online games!")  # Require login before joining online sessions
+            return
+
+        lobby_window = tk.Toplevel(self.root)  # Separate window so the main menu stays usable
+        lobby_window.title("Online Lobby")  # Title for the lobby window
+        lobby_window.geometry("460x440")  # Size for the lobby window
+        lobby_window.configure(bg="#2c3e50")  # Match app theme
+
+        tk.Label(lobby_window, text="🏠 Games Waiting for Players",
+                 font=("Arial", 16, "bold"), bg="#2c3e50", fg="#f1c40f").pack(pady=15)  # Heading of the lobby
+
+        listbox = tk.Listbox(lobby_window, font=("Arial", 13), width=36, height=10,
+                             bg="#ecf0f1", relief=tk.FLAT)  # One row per waiting session
+        listbox.pack(pady=5)  # Place the list under the heading
+
+        status_label = tk.Label(lobby_window, text="Connecting...", font=("Arial", 11),
+                                bg="#2c3e50", fg="#95a5a6")  # Connection state / number of games
+        status_label.pack(pady=5)  # Place the status under the list
+
+        sessions = {}  # session_id -> lobby entry, in the server's order (waiting longest first)
+        events = queue.Queue()  # Events read by the stream thread, applied on the Tk thread
+        stop = threading.Event()  # Set when the window closes so the stream thread exits
+
+        def read_stream():
+            # Server-sent events: a snapshot first, then batched updates (one every burst of changes)
+            try:
+                with requests.get(f"{SERVER_URL}/lobby/events", stream=True, timeout=(5, 60)) as r:
+                    event = None  # Name of the event whose data line comes next
+                    for line in r.iter_lines(decode_unicode=True):
+                        if stop.is_set():
+                            return  # Window closed: stop reading
+                        if line.startswith("event:"):
+                            event = line[len("event:"):].strip()  # Remember which event this is
+                        elif line.startswith("data:") and event:
+                            events.put((event, json.loads(line[len("data:"):])))  # Hand the payload to the UI
+            except (requests.RequestException, ValueError):
+                events.put(("error", None))  # Let the UI show that the lobby is unavailable
+
+        def listen(event, data):
+            events.put((event, data))  # Lobby events from the shared connection, same shape as the stream's
+
+        def render():
+            listbox.delete(0, tk.END)  # Rebuild the rows from the current entries
+            for entry in sessions.values():
+                listbox.insert(tk.END, f"{entry['avatar']} {entry['host']}   ({entry['players']}/{entry['seats']})")
+            status_label.config(text=f"{len(sessions)} game(s) waiting" if sessions else "No games waiting yet")
+
+        def apply_events():
+            if stop.is_set():
+                return  # Window closed: stop polling
+            changed = False  # Only redraw when something arrived
+            while not events.empty():
+                event, data = events.get_nowait()  # Next event from the stream thread
+                if event == "snapshot":
+                    sessions.clear()  # Full listing replaces whatever we had
+                    sessions.update({entry["session_id"]: entry for entry in data["sessions"]})
+                elif event == "update":
+                    for session_id in data["remove"]:
+                        sessions.pop(session_id, None)  # Session filled up, started or closed
+                    for entry in data["upsert"]:
+                        sessions[entry["session_id"]] = entry  # New or changed session
+                elif event == "error":
+                    status_label.config(text="Lobby unavailable, try again later.")  # Stream failed
+                    continue
+                changed = True
+            if changed:
+                render()  # Show the new state
+            lobby_window.after(200, apply_events)  # Keep polling the queue from the Tk thread
+
+        def join_selected():
+            selection = listbox.curselection()  # Index of the chosen row
+            if not selection:
+                messagebox.showinfo("Lobby", "Select a game first.")  # Nothing picked yet
+                return
+            session_id = list(sessions)[selection[0]]  # Rows are in the same order as the dict
+            close_lobby()  # Close the lobby before the game window opens
+            self.join_session(session_id)  # Join the chosen session as guest
+
+        def close_lobby():
+            stop.set()  # Tell the stream thread and the poll loop to stop
+            if self.lobby_listener is listen:
+                self.lobby_listener = None  # Stop routing lobby events to this window
+                self.mux_send(protocol.UnsubscribeLobby().to_dict())
+            lobby_window.destroy()  # Close the window
+
+        tk.Button(lobby_window, text="▶ Join Selected", command=join_selected,
+                  font=("Arial", 12, "bold"), bg="#27ae60", fg="white",
+                  padx=20, pady=8, relief=tk.FLAT).pack(pady=10)  # Join the highlighted game
+        lobby_window.protocol("WM_DELETE_WINDOW", close_lobby)  # Closing the window also stops the stream
+
+        if self.token:
+            self.lobby_listener = listen  # Lobby updates come over the shared connection
+            self.open_mux()
+            self.mux_send(protocol.SubscribeLobby().to_dict())  # Or from on_mux_open once it connects
+        else:
+            threading.Thread(target=read_stream, daemon=True).start()  # Read the stream without blocking the UI
+        apply_events()  # Start polling for events
+
     # ---------- Game window ----------
     def start_game(self, session_id, ws_url, is_host: bool, singleplayer: bool,
                    player_name=None, player_avatar=None):
@@ -425,10 +584,20 @@ class GameClient:  # Define the main application class that handles UI flow, aut
         game_window.title("Snake & Ladder Game")  # Title the game window
 
         # WebSocket врска за мултиплејер
-        self.ws_app = None  # Initialize websocket attribute
-        if ws_url:
+        self.ws_app = None  # Per-session websocket, only used when the shared one isn't available
+        multiplexed = bool(ws_url and self.token)  # Logged in against a server that hands out tokens
+        if multiplexed:
+            self.open_mux()  # Reuse (or open) the one connection this account has
+            player_info = self.player_info_message(player_name, player_avatar)
+            player_info.session = session_id  # Which game on the shared connection it is for
+            self.mux_subscribe(session_id, [
+                protocol.Subscribe(session=session_id).to_dict(),  # Take a seat in this game
+                player_info.to_dict(),
+            ])  # Sent now if connected, otherwise as soon as the connection opens
+        elif ws_url:
             self.ws_app = websocket.WebSocketApp(
                 ws_url,
+                subprotocols=wire.SUBPROTOCOLS if WS_COMPRESSION else wire.UNCOMPRESSED_SUBPROTOCOLS,  # Preferred first
                 on_message=self.on_ws_message,
                 on_close=lambda ws, *args: print("Disconnected from session."),
                 on_open=lambda ws, *args: self.on_ws_open(ws, player_name, player_avatar)
@@ -448,69 +617,168 @@ class GameClient:  # Define the main application class that handles UI flow, aut
                                                                   current_name]  # Placeholder names depending on host/joiner
             avatars = [current_avatar, "😎"] if is_host else ["🙂", current_avatar]  # Avatars accordingly
 
-        def update_stats(username: str, result: str, duration: int | None):
+        def update_stats(username: str, result: str, duration: int | None, moves: int | None = None):
             """Ажурирај серверски статистики - само за логиран корисник"""  # English: Update server-side stats when a game finishes (only for logged in users)
             if self.username:  # Ажурирај само ако е логиран  # English: Only attempt server update if user is logged in
-                try:
-                    requests.post(f"{SERVER_URL}/update_stats",
-                                  params={"username": self.username, "result": result,
-                                          "duration": duration or 0})  # Send result and duration to server endpoint
-                except Exception:
-                    pass  # If it fails, ignore to avoid disrupting game cleanup
+                self.http.post("/update_stats",
+                               params={"username": self.username, "result": result,
+                                       "duration": duration or 0,
+                                       "moves": moves or 0})  # Send result, duration and moves to win; failures are ignored so game cleanup isn't disrupted
 
         # Создади инстанца на играта
         self.game_instance = SnakeLadderGame(
             game_window,
             player_names=names,
             player_avatars=avatars,
-            websocket_connection=self.ws_app,
+            websocket_connection=self.mux_app if multiplexed else self.ws_app,
             singleplayer=singleplayer,
             is_host=is_host,
             on_game_end=self.on_game_end,
             server_update_fn=update_stats,
-            logged_username=self.username
+            logged_username=self.username,
             # Проследи го логираниот корисник  # English: Pass the logged-in username to the game instance
+            session_id=session_id if multiplexed else None  # Moves on the shared connection are tagged with it
         )  # Instantiate the SnakeLadderGame which will render the board and manage gameplay logic
 
     # ---------- WebSocket handlers ----------
+    def player_info_message(self, player_name, player_avatar):
+        """Name and avatar shown to the other players"""
+        return protocol.PlayerInfo(
+            display_name=player_name or self.display_name or self.username or "Player",
+            display_avatar=player_avatar or self.display_avatar or self.avatar or "🙂"
+        )
+
     def on_ws_open(self, ws, player_name, player_avatar):
         """Called when WebSocket connection opens"""
         # Send player information to server
-        player_info = {
-            "action": "player_info",
-            "display_name": player_name or self.display_name or self.username or "Player",
-            "display_avatar": player_avatar or self.display_avatar or self.avatar or "🙂"
-        }
+        player_info = self.player_info_message(player_name, player_avatar)
         try:
-            ws.send(json.dumps(player_info))
+            codec = wire.codec_for(ws.sock.getsubprotocol() if ws.sock else None)  # Encoding the server accepted
+            ws.send(codec.encode(player_info.to_dict()),
+                    websocket.ABNF.OPCODE_BINARY if codec.binary else websocket.ABNF.OPCODE_TEXT)
             print(f"Sent player info: {player_info}")
         except Exception as e:
             print(f"Failed to send player info: {e}")
 
-    def on_ws_message(self, ws, message: str):
+    def on_ws_message(self, ws, message: str | bytes):
         """Handle WebSocket messages"""
         try:
-            data = json.loads(message)
-            print(f"Received: {data}")  # Debug logging
-
-            if hasattr(self, "game_instance"):
-                if data["type"] == "state_update":
-                    self.game_instance.apply_server_state(data)
-                elif data["type"] == "player_info_update":
-                    self.update_game_players(data["players"])
-                elif data["type"] == "game_state":
-                    # Initial game state when joining
-                    self.game_instance.apply_server_state(data)
-                    if "players" in data:
-                        self.update_game_players(data["players"])
-                elif data["type"] == "notice":
-                    print("Server notice:", data["message"])
-                    # Also update players info if included
-                    if "players" in data:
-                        self.update_game_players(data["players"])
-
-        except json.JSONDecodeError:
-            print(f"Invalid JSON received: {message}")
+            codec = wire.codec_for(ws.sock.getsubprotocol() if ws.sock else None)  # Encoding the server accepted
+            event = protocol.parse_event(wire.decode(message, codec))  # Text frames are JSON, binary frames use the codec
+            print(f"Received: {event}")  # Debug logging
+            self.ws_pump.put(None, event)  # This thread must not touch Tk; None = the game this connection is for
+        except ValueError:  # Invalid JSON, a malformed binary frame or a message that doesn't match the protocol
+            print(f"Invalid message received: {message!r}")
+        except Exception as e:
+            print(f"Error handling message: {e}")
+
+    def apply_game_event(self, session, event):
+        """Called on the Tk thread by the pump with each (coalesced) game event"""
+        if session is None or session == self.session_id:
+            self.handle_game_event(event)  # Other sessions' messages belong to games we've left
+
+    def handle_game_event(self, event):
+        """Apply a game event from either connection to the open game window"""
+        handler = self.game_event_handlers.get(type(event))
+        if handler and hasattr(self, "game_instance"):
+            handler(event)
+
+    def on_state_update(self, event):
+        self.game_instance.apply_server_state(event)
+
+    def on_game_state(self, event):
+        # Initial game state when joining
+        self.game_instance.apply_server_state(event)
+        if event.players is not None:
+            self.update_game_players(event.players)
+
+    def on_player_info_update(self, event):
+        self.update_game_players(event.players)
+
+    def on_notice(self, event):
+        print("Server notice:", event.message)
+        # Also update players info if included
+        if event.players is not None:
+            self.update_game_players(event.players)
+
+    # ---------- Shared (multiplexed) WebSocket ----------
+    def open_mux(self):
+        """Отвори ја заедничката врска"""  # English: Open the account's shared connection once; games and the lobby subscribe on it
+        if self.mux_app is None:
+            self.mux_app = websocket.WebSocketApp(
+                build_mux_url(self.username, self.token),
+                subprotocols=wire.SUBPROTOCOLS if WS_COMPRESSION else wire.UNCOMPRESSED_SUBPROTOCOLS,  # Preferred first
+                on_open=self.on_mux_open,
+                on_message=self.on_mux_message,
+                on_close=self.on_mux_close
+            )  # One socket and one thread however many games and lobby windows use it
+            threading.Thread(target=self.mux_app.run_forever, kwargs={"reconnect": 5},
+                             daemon=True).start()  # Reconnects after 5s (e.g. across a server restart)
+        return self.mux_app
+
+    def close_mux(self):
+        """Затвори ја заедничката врска"""  # English: Close the shared connection (logout / username change)
+        app, self.mux_app = self.mux_app, None  # Forget it first so nothing else is sent on it
+        self.mux_connected = False
+        self.mux_subscriptions.clear()  # A new connection starts without subscriptions
+        if app:
+            try:
+                app.close()  # Also stops run_forever from reconnecting
+            except Exception:
+                pass  # Ignore errors while closing
+
+    def mux_send(self, message: dict):
+        """Send one frame on the shared connection; dropped while it is not open"""
+        app = self.mux_app
+        if not app or not self.mux_connected:
+            return  # Subscriptions are replayed by on_mux_open anyway
+        try:
+            codec = wire.codec_for(app.sock.getsubprotocol() if app.sock else None)  # Encoding the server accepted
+            app.send(codec.encode(message),
+                     websocket.ABNF.OPCODE_BINARY if codec.binary else websocket.ABNF.OPCODE_TEXT)
+        except Exception as e:
+            print(f"Failed to send on shared connection: {e}")
+
+    def mux_subscribe(self, session_id, frames):
+        self.mux_subscriptions[session_id] = frames  # Remember them first so a connect in between replays them
+        for frame in frames:
+            self.mux_send(frame)
+
+    def mux_unsubscribe(self, session_id):
+        if self.mux_subscriptions.pop(session_id, None) is not None:
+            self.mux_send(protocol.Unsubscribe(session=session_id).to_dict())  # Give up the seat, keep the connection
+
+    def on_mux_open(self, ws):
+        """Called on every (re)connect: subscribe to everything we follow again"""
+        self.mux_connected = True
+        if self.lobby_listener:
+            self.mux_send(protocol.SubscribeLobby().to_dict())
+        for frames in list(self.mux_subscriptions.values()):
+            for frame in frames:
+                self.mux_send(frame)
+
+    def on_mux_close(self, ws, *args):
+        self.mux_connected = False  # Frames are held back until on_mux_open
+        print("Shared connection closed.")
+
+    def on_mux_message(self, ws, message: str | bytes):
+        """Route a message to the lobby window or to the game it is tagged with"""
+        try:
+            codec = wire.codec_for(ws.sock.getsubprotocol() if ws.sock else None)  # Encoding the server accepted
+            data = wire.decode(message, codec)
+            event = protocol.parse_event(data)
+        except ValueError:  # Invalid JSON, a malformed binary frame or a message that doesn't match the protocol
+            print(f"Invalid message received: {message!r}")
+            return
+        try:
+            if isinstance(event, (protocol.LobbySnapshot, protocol.LobbyUpdate)):
+                listener = self.lobby_listener
+                if listener:
+                    listener(event.name[len("lobby_"):], data)  # "snapshot" or "update", as on /lobby/events
+            elif isinstance(event, protocol.Error):
+                print("Server error:", event.message)
+            else:
+                self.ws_pump.put(event.session, event)  # Applied (or dropped) on the Tk thread
         except Exception as e:
             print(f"Error handling message: {e}")
 
@@ -557,6 +825,7 @@ class GameClient:  # Define the main application class that handles UI flow, aut
 
     def on_game_end(self, winner_idx: int):
         """Кога играта завршува"""  # English: Called when a game finishes to perform cleanup and return to menu
+        self.mux_unsubscribe(self.session_id)  # Leave the game on the shared connection, which stays open
         try:
             if hasattr(self, 'ws_app') and self.ws_app:
                 self.ws_app.close()  # Close the websocket connection if present
@@ -699,44 +968,71 @@ class GameClient:  # Define the main application class that handles UI flow, aut
         stats_frame = tk.Frame(stats_window, bg="#34495e", relief=tk.RAISED, bd=3)  # Frame to contain fetched stats
         stats_frame.pack(pady=20, padx=30, fill="both", expand=True)  # Pack it to expand within the window
 
-        try:
-            r = requests.get(f"{SERVER_URL}/stats",
-                             params={"username": self.username})  # Fetch stats from server endpoint
-            if r.status_code == 200 and r.json().get("status") != "error":  # If server returns usable stats
-                stats = r.json()  # Parse server response JSON
-
-                tk.Label(stats_frame, text="🌐 Online Game Statistics",
-                         font=("Arial", 16, "bold"), bg="#34495e", fg="#ecf0f1").pack(
-                    pady=15)  # Subheader for online stats
-
-                stats_info = tk.Frame(stats_frame, bg="#34495e")  # Inner frame for stat labels
-                stats_info.pack(pady=10)  # Pack it with spacing
-
-                tk.Label(stats_info, text=f"Online Wins: {stats['wins']}",
-                         font=("Arial", 14), bg="#34495e", fg="#27ae60").pack(
-                    pady=3)  # Show wins fetched from the server
-                tk.Label(stats_info, text=f"Online Losses: {stats['losses']}",
-                         font=("Arial", 14), bg="#34495e", fg="#e74c3c").pack(pady=3)  # Show losses fetched from server
-
-                if stats["fastest_win_seconds"] < 9999:
-                    tk.Label(stats_info, text=f"Fastest Online Win: {stats['fastest_win_seconds']} seconds",
-                             font=("Arial", 14), bg="#34495e", fg="#f39c12").pack(
-                        pady=3)  # Display fastest online win if it's a valid value
-
-                total_games = stats['wins'] + stats['losses']  # Compute total online games from wins/losses
-                if total_games > 0:
-                    win_rate = (stats['wins'] / total_games) * 100  # Calculate win percentage
-                    tk.Label(stats_info, text=f"Win Rate: {win_rate:.1f}%",
-                             font=("Arial", 14, "bold"), bg="#34495e", fg="#3498db").pack(
-                        pady=8)  # Show win rate formatted with one decimal
-            else:
-                tk.Label(stats_frame, text="Could not load online statistics",
-                         font=("Arial", 14), bg="#34495e", fg="#e74c3c").pack(
-                    pady=20)  # Message if server returned an error state
-        except Exception as e:
-            tk.Label(stats_frame, text=f"Error connecting to server: {e}",
-                     font=("Arial", 12), bg="#34495e", fg="#e74c3c").pack(
-                pady=20)  # Display network/exception error details
+        stats_body = tk.Frame(stats_frame, bg="#34495e")  # Filled in when the server answers, above the account button
+        stats_body.pack(fill="both", expand=True)
+        loading = tk.Label(stats_body, text="Loading statistics...",
+                           font=("Arial", 14), bg="#34495e", fg="#bdc3c7")  # Shown until the server answers
+        loading.pack(pady=20)
+
+        def show_stats(r):
+            if not stats_body.winfo_exists():
+                return  # The window was closed before the answer came
+            loading.destroy()
+            try:
+                if r.status_code == 200 and r.json().get("status") != "error":  # If server returns usable stats
+                    stats = r.json()  # Parse server response JSON
+
+                    tk.Label(stats_body, text="🌐 Online Game Statistics",
+                             font=("Arial", 16, "bold"), bg="#34495e", fg="#ecf0f1").pack(
+                        pady=15)  # Subheader for online stats
+
+                    stats_info = tk.Frame(stats_body, bg="#34495e")  # Inner frame for stat labels
+                    stats_info.pack(pady=10)  # Pack it with spacing
+
+                    tk.Label(stats_info, text=f"Online Wins: {stats['wins']}",
+                             font=("Arial", 14), bg="#34495e", fg="#27ae60").pack(
+                        pady=3)  # Show wins fetched from the server
+                    tk.Label(stats_info, text=f"Online Losses: {stats['losses']}",
+                             font=("Arial", 14), bg="#34495e", fg="#e74c3c").pack(pady=3)  # Show losses fetched from server
+
+                    if stats["fastest_win_seconds"] < 9999:
+                        tk.Label(stats_info, text=f"Fastest Online Win: {stats['fastest_win_seconds']} seconds",
+                                 font=("Arial", 14), bg="#34495e", fg="#f39c12").pack(
+                            pady=3)  # Display fastest online win if it's a valid value
+
+                    duration = stats.get("duration") or {}  # Quantiles of game length (missing on older servers)
+                    if duration.get("count"):
+                        tk.Label(stats_info, text=f"Typical Game: {duration['p50']:.0f}s  (90% under {duration['p90']:.0f}s)",
+                                 font=("Arial", 14), bg="#34495e", fg="#ecf0f1").pack(
+                            pady=3)  # Median and 90th percentile game duration
+                    win_moves = stats.get("win_moves") or {}  # Quantiles of moves needed to win
+                    if win_moves.get("count"):
+                        tk.Label(stats_info, text=f"Moves to Win: {win_moves['p50']:.0f}  (90% under {win_moves['p90']:.0f})",
+                                 font=("Arial", 14), bg="#34495e", fg="#ecf0f1").pack(
+                            pady=3)  # Median and 90th percentile moves per win
+
+                    total_games = stats['wins'] + stats['losses']  # Compute total online games from wins/losses
+                    if total_games > 0:
+                        win_rate = (stats['wins'] / total_games) * 100  # Calculate win percentage
+                        tk.Label(stats_info, text=f"Win Rate: {win_rate:.1f}%",
+                                 font=("Arial", 14, "bold"), bg="#34495e", fg="#3498db").pack(
+                            pady=8)  # Show win rate formatted with one decimal
+                else:
+                    tk.Label(stats_body, text="Could not load online statistics",
+                             font=("Arial", 14), bg="#34495e", fg="#e74c3c").pack(
+                        pady=20)  # Message if server returned an error state
+            except Exception as e:
+                show_error(e)
+
+        def show_error(e):
+            if stats_body.winfo_exists():
+                loading.destroy()
+                tk.Label(stats_body, text=f"Error connecting to server: {e}",
+                         font=("Arial", 12), bg="#34495e", fg="#e74c3c").pack(
+                    pady=20)  # Display network/exception error details
+
+        self.http.get("/stats", show_stats, show_error,
+                      params={"username": self.username})  # Fetch stats from server endpoint
 
         # Account management button
         def change_account_profile():
@@ -773,21 +1069,29 @@ class GameClient:  # Define the main application class that handles UI flow, aut
                     messagebox.showerror("Error", "Username cannot be empty!")  # Guard against empty usernames
                     return
 
+                self.set_waiting(save_button, True)  # One attempt at a time
+                entered = (username_entry.get(), avatar_entry.get())  # As typed; the dialog may be gone when the answer comes
+                self.http.post("/update_profile", lambda r: profile_saved(r, new_username, new_avatar, entered),
+                               connection_error,
+                               params={"username": self.username, "avatar": new_avatar,
+                                       "new_name": new_username})  # Send update request to server to change account data
+
+            def profile_saved(r, new_username, new_avatar, entered):
+                self.set_waiting(save_button, False)  # Allow another attempt
                 try:
-                    r = requests.post(f"{SERVER_URL}/update_profile",
-                                      params={"username": self.username, "avatar": new_avatar,
-                                              "new_name": new_username})  # Send update request to server to change account data
                     data = r.json()  # Parse server response
                     if r.status_code == 200 and data.get("status") == "success":  # If update succeeded
                         # Ажурирај ги локалните податоци
                         self.username = data.get("username",
                                                  new_username)  # Update local client username to server-provided or new value
                         self.avatar = data.get("avatar", new_avatar)  # Update local avatar
+                        self.token = data.get("token", self.token)  # Tokens are per username
+                        self.close_mux()  # Reopen under the new name when next needed
 
                         # Ажурирај го и display профилот ако е ист како акаунтот
-                        if self.display_name == username_entry.get() or not self.display_name:
+                        if self.display_name == entered[0] or not self.display_name:
                             self.display_name = self.username  # If display name was the same as account, update it as well
-                        if self.display_avatar == avatar_entry.get() or not self.display_avatar:
+                        if self.display_avatar == entered[1] or not self.display_avatar:
                             self.display_avatar = self.avatar  # Update display avatar if it matched the account avatar
 
                         messagebox.showinfo("Success",
@@ -799,11 +1103,16 @@ class GameClient:  # Define the main application class that handles UI flow, aut
                         messagebox.showerror("Error", data.get("message",
                                                                "Failed to update account"))  # Show server error message
                 except Exception as e:
-                    messagebox.showerror("Error", f"Connection error: {e}")  # Show connection error
+                    connection_error(e)
+
+            def connection_error(e):
+                self.set_waiting(save_button, False)  # Allow another attempt
+                messagebox.showerror("Error", f"Connection error: {e}")  # Show connection error
 
-            tk.Button(change_window, text="💾 Save Account Changes", command=save_account_changes,
-                      font=("Arial", 12, "bold"), bg="#e67e22", fg="white",
-                      padx=15, pady=8, relief=tk.FLAT).pack(pady=20)  # Button to submit account changes to server
+            save_button = tk.Button(change_window, text="💾 Save Account Changes", command=save_account_changes,
+                                    font=("Arial", 12, "bold"), bg="#e67e22", fg="white",
+                                    padx=15, pady=8, relief=tk.FLAT)
+            save_button.pack(pady=20)  # Button to submit account changes to server
 
             tk.Button(change_window, text="Cancel", command=change_window.destroy,
                       font=("Arial", 10), bg="#95a5a6", fg="white",
@@ -814,6 +1123,11 @@ class GameClient:  # Define the main application class that handles UI flow, aut
                   padx=15, pady=8, relief=tk.FLAT).pack(pady=20)  # Button to open account profile change dialog
 
     # ---------- Utils ----------
+    def set_waiting(self, button, waiting: bool):
+        """Копче исклучено додека барањето е во тек"""  # English: Disable a button while its request is in flight
+        if button.winfo_exists():  # The screen may have changed before the answer came
+            button.config(state=tk.DISABLED if waiting else tk.NORMAL)
+
     def clear_window(self):
         """Исчисти ги сите елементи од прозорецот"""  # English: Remove all widgets from the root window
         for widget in self.root.winfo_children():
@@ -822,6 +1136,7 @@ class GameClient:  # Define the main application class that handles UI flow, aut
     def run(self):
         """Започни ја апликацијата"""  # English: Start the Tkinter mainloop and run the application
         self.root.mainloop()  # Enter Tkinter's main event loop
+        self.http.close()  # Wait for calls already made (e.g. the last /update_stats), then close the connections
 
 
 if __name__ == "__main__":
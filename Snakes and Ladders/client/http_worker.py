@@ -0,0 +1,103 @@
+# HTTP calls to the game server, made off the Tk thread.
+# One pooled keep-alive requests.Session is shared by a few worker threads, so
+# only the first call pays the TCP + TLS handshake; results come back to the Tk
+# thread through a queue drained with `after`, where the callbacks may touch widgets.
+import os
+import queue
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Overridable through the environment on the hosting platform
+HTTP_WORKERS = int(os.environ.get("HTTP_WORKERS", "2"))
+HTTP_CONNECT_TIMEOUT = float(os.environ.get("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_READ_TIMEOUT = float(os.environ.get("HTTP_READ_TIMEOUT", "20"))  # a sleeping free-tier server takes a while to wake
+HTTP_RETRIES = int(os.environ.get("HTTP_RETRIES", "2"))
+POLL_MS = 30  # how often the Tk thread looks for finished calls while any are in flight
+
+
+def make_session(retries: int = HTTP_RETRIES, pool_size: int = HTTP_WORKERS) -> requests.Session:
+    """A Session whose connections are kept alive and reused, with retries.
+
+    Any method is retried when the connection can't be made (nothing was
+    sent); only idempotent ones (GET, PUT, ...) after a read error or a
+    502/503/504, so a POST like /update_stats is never applied twice."""
+    retry = Retry(total=retries, connect=retries, read=retries, status=retries,
+                  backoff_factor=0.5, status_forcelist=(502, 503, 504),
+                  allowed_methods=Retry.DEFAULT_ALLOWED_METHODS, raise_on_status=False)
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+class HttpWorker:
+    """Runs requests against `base_url` on background threads and calls back on the Tk thread.
+
+    request(method, path, on_done, on_error, **kwargs) returns at once;
+    on_done(response) or on_error(exception) later runs on the Tk thread
+    (either may be None). Every call has a (connect, read) timeout unless
+    one is passed. Only call request() from the Tk thread."""
+
+    def __init__(self, root, base_url: str, workers: int = HTTP_WORKERS):
+        self.root = root
+        self.base_url = base_url.rstrip("/")
+        self.session = make_session(pool_size=workers)
+        self.timeout = (HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="http")
+        self._results = queue.Queue()  # (callback, argument) pairs for the Tk thread
+        self._pending = 0
+        self._polling = False
+
+    def request(self, method: str, path: str, on_done=None, on_error=None, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        self._pending += 1
+        self._executor.submit(self._call, method, f"{self.base_url}{path}", on_done, on_error, kwargs)
+        if not self._polling:
+            self._polling = True
+            self.root.after(POLL_MS, self._drain)
+
+    def get(self, path: str, on_done=None, on_error=None, **kwargs):
+        self.request("GET", path, on_done, on_error, **kwargs)
+
+    def post(self, path: str, on_done=None, on_error=None, **kwargs):
+        self.request("POST", path, on_done, on_error, **kwargs)
+
+    def warm_up(self):
+        # Open the pooled connection (and wake the server) while the user is still typing
+        self.get("/ready")
+
+    def _call(self, method, url, on_done, on_error, kwargs):
+        # Worker thread: no Tk calls here
+        try:
+            response = self.session.request(method, url, **kwargs)
+            self._results.put((on_done, response))
+        except Exception as e:
+            self._results.put((on_error, e))
+
+    def _drain(self):
+        # Tk thread: run the callbacks of every call that has finished
+        while True:
+            try:
+                callback, argument = self._results.get_nowait()
+            except queue.Empty:
+                break
+            self._pending -= 1
+            if callback is not None:
+                try:
+                    callback(argument)
+                except Exception:
+                    self.root.report_callback_exception(*sys.exc_info())  # as Tk would; the rest still run
+        if self._pending:
+            self.root.after(POLL_MS, self._drain)
+        else:
+            self._polling = False
+
+    def close(self):
+        # Lets calls already made (a final /update_stats) finish, then drops the connections
+        self._executor.shutdown(wait=True)
+        self.session.close()
@@ -1,40 +1,51 @@
 # snake_ladder_game.py
 import tkinter as tk
 from tkinter import messagebox
-from PIL import Image, ImageTk, ImageDraw
 import random
 import os
-import math
 import time
 import json
+import math
+import sys
+from collections import deque
+from functools import partial
 import websocket  # websocket-client
 
-# Намалена табла со подобар стил
+# Заеднички жичен протокол со серверот (../common)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "common"))
+import protocol  # noqa: E402
+import wire  # noqa: E402
+from board import LADDERS, SNAKES  # noqa: E402  # Змии и скали (заеднички со серверот)
+import board_render  # noqa: E402  # Статичната табла, исцртана еднаш и кеширана на диск
+from sprites import BOARD_PHOTOS, PHOTOS, SPRITES, dice_face  # noqa: E402  # Слики заеднички за сите прозорци
+import animation  # noqa: E402  # Анимации според времето, од една `after` јамка
+import game  # noqa: E402  # Правилата на играта без UI; прозорецот само ги прикажува нејзините настани
+
+# Намалена табла со подобар стил; ова е големината на екран од 96 DPI,
+# прозорецот ја зголемува на HiDPI екрани и кога се менува неговата големина
 BOARD_SIZE = 640
-TILE_SIZE = BOARD_SIZE // 10
 BOARD_MARGIN = 40  # Маргини околу таблата
-ASSET_PATH = "snake_ladder_assets/"
-
-# Точно поставени змии и скали според стандардната игра
-SNAKES = {
-    98: 78,  # Горе-лево до долу-средина
-    95: 56,  # Горе-средина до средина
-    87: 24,  # Горе-десно до долу-лево
-    62: 18,  # Средина-десно до долу
-    54: 34,  # Средина до долу-средина
-    16: 6  # Долу-средина до почеток
-}
-
-LADDERS = {
-    1: 38,  # Почеток до средина-лево
-    4: 14,  # Почеток малку нагоре
-    9: 21,  # Лево-долу до долу-средина
-    28: 84,  # Средина до горе-лево
-    36: 44,  # Средина-лево малку нагоре
-    51: 67,  # Средина до средина-горе
-    71: 91,  # Горе-лево до врв-лево
-    80: 100  # Горе-десно до врв
-}
+MIN_BOARD_SIZE = 400
+BOARD_STEP = 20  # таблата расте во чекори, за да се повторуваат истите кеширани слики
+RESIZE_DELAY_MS = 60  # таблата се менува кога ќе престане влечењето на работ
+CONTROLS_WIDTH = 280
+
+# Траење на анимациите во секунди (исто колку и да е далеку потегот)
+DICE_SECONDS = 1.2
+DICE_FACE_SECONDS = 0.08  # колку долго се гледа секое лице при фрлање
+MOVE_SECONDS = 0.6
+SPECIAL_PAUSE_SECONDS = 0.5  # пауза пред змија / скала
+SPECIAL_SECONDS = 0.5
+BOT_DELAY_SECONDS = 1.0  # ботот "размислува" пред да фрли
+
+# Брзини за singleplayer: делат секое траење погоре; Instant ги прескокнува анимациите
+SPEEDS = {"Normal": 1.0, "Fast": 2.0, "Turbo": 6.0, "Instant": math.inf}
+
+
+def fit_board(side: int) -> board_render.Geometry:
+    """Најголемата табла (со маргините) што собира во квадрат со страна `side`"""
+    board_size = max(MIN_BOARD_SIZE, side * BOARD_SIZE // (BOARD_SIZE + BOARD_MARGIN * 2) // BOARD_STEP * BOARD_STEP)
+    return board_render.geometry(board_size, board_size * BOARD_MARGIN // BOARD_SIZE)
 
 
 class SnakeLadderGame:
@@ -46,14 +57,29 @@ class SnakeLadderGame:
                  is_host: bool = True,
                  on_game_end=None,
                  server_update_fn=None,
-                 logged_username=None):
+                 logged_username=None,
+                 session_id: str | None = None):
         self.root = root
         self.root.title("Snake & Ladder Game")
-        self.root.geometry(f"{BOARD_SIZE + BOARD_MARGIN * 2 + 320}x{BOARD_SIZE + BOARD_MARGIN * 2 + 100}")
+        # Почетна табла според DPI на екранот, но да собере по висина
+        self.ui_scale = max(1.0, self.root.winfo_fpixels("1i") / 96)
+        side = (BOARD_SIZE + BOARD_MARGIN * 2) * self.ui_scale
+        self.geo = fit_board(int(min(side, self.root.winfo_screenheight() - 160)))
+        self._resize_job = None
+        self.root.geometry(f"{self.geo.width + CONTROLS_WIDTH + 90}x{self.geo.width + 100}")
         self.root.configure(bg="#2c3e50")
 
         self.ws = websocket_connection
         self.ws_connected = websocket_connection is not None
+        self.session_id = session_id  # Set when the connection is shared by several sessions (multiplexed)
+        # Server events by model (see common/protocol.py)
+        self.event_handlers = {
+            protocol.StateUpdate: self.apply_server_state,
+            protocol.GameState: self.apply_server_state,
+            protocol.PlayerInfoUpdate: lambda event: self.update_players_from_server(event.players),
+            protocol.Notice: self.apply_notice,
+            protocol.Reset: lambda event: self.reset_game(),
+        }
         self.singleplayer = singleplayer
         self.is_host = is_host
         self.on_game_end = on_game_end
@@ -65,12 +91,29 @@ class SnakeLadderGame:
         self.display_to_username = {}
 
         self.start_time = time.time()
-        self.total_moves = [0, 0]
 
         self.player_names = player_names or ["Player 1", "Player 2"]
         self.player_avatars = player_avatars or ["🙂", "😎"]
 
         self.local_score = self.load_local_score()
+        self.animator = animation.Animator(self.root)
+        # Локалната игра: ботот е вториот играч во singleplayer; онлајн правилата ги води серверот
+        self.game = game.Game(players=2, bots={1} if singleplayer else ())
+        self.game.subscribe(self.on_game_event)
+        self.game_handlers = {
+            game.Rolled: self.show_roll,
+            game.Moved: self.show_move,
+            game.Slid: self.show_slide,
+            game.Overshot: self.show_overshot,
+            game.TurnChanged: self.show_turn,
+            game.Won: self.show_win,
+            game.Reset: self.show_reset,
+        }
+        self.steps = deque()  # настани од играта што чекаат да се прикажат, по ред
+        self.playing = False  # се прикажува настан (анимација во тек)
+        self._stepping = False  # play_next е веќе на стекот (за Instant, каде настаните завршуваат веднаш)
+        self._step_again = False
+        self.practice = False  # игра на поголема брзина или со auto-play - резултатот не се запишува
         self.setup_ui()
         self.init_game()
 
@@ -79,38 +122,33 @@ class SnakeLadderGame:
         main_frame = tk.Frame(self.root, bg="#2c3e50")
         main_frame.pack(expand=True, fill=tk.BOTH, padx=15, pady=15)
 
-        # Лева страна - табла со фиксирана големина
-        board_container = tk.Frame(main_frame, bg="#34495e", relief=tk.RAISED, bd=3)
-        board_container.pack(side=tk.LEFT, padx=10, anchor="n")
+        # Десна страна - контроли со фиксирана ширина (се пакува прва за да не ја стесни таблата)
+        self.controls_frame = tk.Frame(main_frame, bg="#34495e", width=CONTROLS_WIDTH,
+                                       relief=tk.RAISED, bd=3)
+        self.controls_frame.pack(side=tk.RIGHT, fill=tk.Y, padx=10, anchor="n")
+        self.controls_frame.pack_propagate(False)
 
-        # Canvas со фиксирана големина
-        canvas_width = BOARD_SIZE + BOARD_MARGIN * 2
-        canvas_height = BOARD_SIZE + BOARD_MARGIN * 2
+        # Лева страна - табла што го зафаќа остатокот од прозорецот
+        board_container = tk.Frame(main_frame, bg="#34495e", relief=tk.RAISED, bd=3)
+        board_container.pack(side=tk.LEFT, padx=10, anchor="n", expand=True, fill=tk.BOTH)
 
         self.canvas = tk.Canvas(board_container,
-                                width=canvas_width,
-                                height=canvas_height,
+                                width=self.geo.width,
+                                height=self.geo.width,
                                 bg="#2c3e50",
                                 highlightbackground="#34495e",
                                 highlightthickness=3,
                                 relief=tk.RAISED,
                                 bd=2)
-        self.canvas.pack(padx=8, pady=8)
-
-        # Десна страна - контроли со фиксирана ширина
-        self.controls_frame = tk.Frame(main_frame, bg="#34495e", width=280,
-                                       relief=tk.RAISED, bd=3)
-        self.controls_frame.pack(side=tk.RIGHT, fill=tk.Y, padx=10, anchor="n")
-        self.controls_frame.pack_propagate(False)
+        self.canvas.pack(padx=8, pady=8, expand=True, fill=tk.BOTH)
+        self.canvas.bind("<Configure>", self.on_canvas_resize)
 
         # Поставка на минимална големина на прозорецот
-        min_width = canvas_width + 320 + 50
-        min_height = canvas_height + 100
-        self.root.minsize(min_width, min_height)
+        min_board = fit_board(0)
+        self.root.minsize(min_board.width + CONTROLS_WIDTH + 90, min_board.width + 100)
 
+        self.load_images(round(70 * self.ui_scale))
         self.draw_board()
-        self.load_images()
-        self.draw_snakes_and_ladders()
 
     def init_game(self):
         self.positions = [0, 0]
@@ -128,9 +166,9 @@ class SnakeLadderGame:
             self.canvas.create_text(0, 0, text=f"{self.player_avatars[1]}",
                                     font=("Arial", 16, "bold"), fill="#3498db", tags="label1")
         ]
+        self.scale_tokens()
 
-        self.dice_value = 0
-        self.current_player = 0
+        self.current_player = 0  # чиј ред е прикажан (онлајн го поставува серверот)
         self.movable = False
 
         self.setup_controls()
@@ -185,6 +223,10 @@ class SnakeLadderGame:
                                       padx=10, pady=5, width=12)
         self.reset_button.pack(pady=5)
 
+        # Брзина и auto-play (само против бот)
+        if self.singleplayer:
+            self.setup_speed_controls(dice_frame)
+
         # Статус
         self.status_label = tk.Label(self.controls_frame, text=f"{self.player_names[0]}'s turn",
                                      font=("Arial", 14, "bold"), bg="#34495e", fg="#f1c40f",
@@ -195,6 +237,42 @@ class SnakeLadderGame:
         if self.singleplayer and self.local_score:
             self.show_local_score()
 
+    def setup_speed_controls(self, parent):
+        speed_frame = tk.Frame(parent, bg="#34495e")
+        speed_frame.pack(pady=5)
+
+        tk.Label(speed_frame, text="Speed:", font=("Arial", 11),
+                 bg="#34495e", fg="#ecf0f1").pack(side=tk.LEFT, padx=5)
+        self.speed_var = tk.StringVar(value="Normal")
+        speed_menu = tk.OptionMenu(speed_frame, self.speed_var, *SPEEDS, command=self.set_speed)
+        speed_menu.config(font=("Arial", 11), bg="#2c3e50", fg="#ecf0f1", activebackground="#34495e",
+                          highlightthickness=0, width=7)
+        speed_menu.pack(side=tk.LEFT)
+
+        self.autoplay_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(parent, text="Auto-play both seats", variable=self.autoplay_var,
+                       command=self.toggle_autoplay, font=("Arial", 11),
+                       bg="#34495e", fg="#ecf0f1", selectcolor="#2c3e50",
+                       activebackground="#34495e", activeforeground="#ecf0f1").pack(pady=5)
+
+    def set_speed(self, name):
+        # И анимациите што се во тек продолжуваат со новата брзина
+        self.animator.set_speed(SPEEDS[name])
+        if SPEEDS[name] != 1.0:
+            self.practice = True  # побрзата игра не смее да стане "најбрза победа"
+
+    def toggle_autoplay(self):
+        if self.autoplay_var.get():
+            self.game.bots.add(0)
+            self.practice = True
+            self.roll_button.config(state=tk.DISABLED)
+            if not self.playing:
+                self.animator.delay(BOT_DELAY_SECONDS, self.play_bot_turn)
+        else:
+            self.game.bots.discard(0)
+            if self.game.current == 0 and self.game.can_roll() and not self.playing:
+                self.roll_button.config(state=tk.NORMAL)
+
     def show_local_score(self):
         score_frame = tk.Frame(self.controls_frame, bg="#2c3e50", relief=tk.SUNKEN, bd=2)
         score_frame.pack(pady=10, padx=10, fill="x")
@@ -243,210 +321,77 @@ class SnakeLadderGame:
             pass
 
     # ---------- WebSocket helpers ----------
-    def safe_ws_send(self, message: str):
+    def safe_ws_send(self, message: str | bytes, opcode=websocket.ABNF.OPCODE_TEXT):
         if self.ws and self.ws_connected:
             try:
-                self.ws.send(message)
+                self.ws.send(message, opcode)
             except Exception:
                 self.ws_connected = False
 
+    def ws_codec(self):
+        """Codec for the subprotocol the server accepted (JSON if none)"""
+        sock = getattr(self.ws, "sock", None)
+        return wire.codec_for(sock.getsubprotocol() if sock else None)
+
     def safe_ws_send_json(self, obj: dict):
+        if self.session_id:
+            obj = {**obj, "session": self.session_id}  # Tell the shared connection which game this is for
         try:
-            self.safe_ws_send(json.dumps(obj))
+            codec = self.ws_codec()
+            opcode = websocket.ABNF.OPCODE_BINARY if codec.binary else websocket.ABNF.OPCODE_TEXT
+            self.safe_ws_send(codec.encode(obj), opcode)
         except Exception:
             pass
 
     # ---------- Dice ----------
-    def create_dice_image(self, value, size=70):
-        img = Image.new('RGB', (size, size), '#ecf0f1')
-        draw = ImageDraw.Draw(img)
-        dot_radius = size // 12
-        center = size // 2
-        offset = size // 4
-
-        draw.rectangle([2, 2, size - 3, size - 3], outline='#34495e', width=3, fill='#ecf0f1')
-
-        dots = {
-            1: [(center, center)],
-            2: [(center - offset, center - offset), (center + offset, center + offset)],
-            3: [(center - offset, center - offset), (center, center), (center + offset, center + offset)],
-            4: [(center - offset, center - offset), (center + offset, center - offset),
-                (center - offset, center + offset), (center + offset, center + offset)],
-            5: [(center - offset, center - offset), (center + offset, center - offset),
-                (center - offset, center + offset), (center + offset, center + offset), (center, center)],
-            6: [(center - offset, center - offset), (center + offset, center - offset),
-                (center - offset, center), (center + offset, center),
-                (center - offset, center + offset), (center + offset, center + offset)]
-        }
-
-        for x, y in dots[value]:
-            draw.ellipse((x - dot_radius, y - dot_radius, x + dot_radius, y + dot_radius), fill='#e74c3c')
-        return ImageTk.PhotoImage(img)
-
-    def load_images(self):
-        self.dice_images = [self.create_dice_image(i) for i in range(1, 7)]
-
-        try:
-            snake_path = os.path.join(ASSET_PATH, "snake_big.png")
-            ladder_path = os.path.join(ASSET_PATH, "ladder_big.png")
-
-            if os.path.exists(snake_path):
-                self.base_snake_img = Image.open(snake_path).convert("RGBA")
-            else:
-                self.base_snake_img = self.create_snake_image()
-
-            if os.path.exists(ladder_path):
-                self.base_ladder_img = Image.open(ladder_path).convert("RGBA")
-            else:
-                self.base_ladder_img = self.create_ladder_image()
-
-        except Exception:
-            self.base_snake_img = self.create_snake_image()
-            self.base_ladder_img = self.create_ladder_image()
-
-    def create_snake_image(self):
-        img = Image.new('RGBA', (80, 80), (0, 0, 0, 0))
-        draw = ImageDraw.Draw(img)
-
-        draw.ellipse([10, 20, 70, 60], fill='#e74c3c', outline='#c0392b', width=3)
-        draw.ellipse([50, 10, 75, 35], fill='#c0392b', outline='#8b0000', width=2)
-        draw.ellipse([58, 16, 62, 20], fill='white')
-        draw.ellipse([68, 16, 72, 20], fill='white')
-        draw.ellipse([59, 17, 61, 19], fill='black')
-        draw.ellipse([69, 17, 71, 19], fill='black')
-
-        return img
-
-    def create_ladder_image(self):
-        img = Image.new('RGBA', (80, 80), (0, 0, 0, 0))
-        draw = ImageDraw.Draw(img)
-
-        draw.rectangle([25, 5, 30, 75], fill='#8B4513', outline='#654321', width=1)
-        draw.rectangle([50, 5, 55, 75], fill='#8B4513', outline='#654321', width=1)
-
-        for i in range(6):
-            y = 10 + i * 11
-            draw.rectangle([25, y, 55, y + 3], fill='#A0522D', outline='#654321', width=1)
-
-        return img
+    def load_images(self, dice_size=70):
+        # Исти PhotoImage за сите прозорци и за "Play again" - ништо ново не се алоцира
+        self.dice_images = [PHOTOS.get(self.root, ("dice", value, dice_size), partial(dice_face, value, dice_size))
+                            for value in range(1, 7)]
 
     # ---------- Board ----------
     def draw_board(self):
-        colors = ['#3498db', '#5dade2', '#85c1e9', '#aed6f1', '#d6eaf8', '#ebf5fb']
-
-        for row in range(10):
-            for col in range(10):
-                x1 = col * TILE_SIZE + BOARD_MARGIN
-                y1 = (9 - row) * TILE_SIZE + BOARD_MARGIN
-                x2 = x1 + TILE_SIZE
-                y2 = y1 + TILE_SIZE
-
-                if row % 2 == 0:
-                    index = row * 10 + col + 1
-                else:
-                    index = row * 10 + (9 - col) + 1
-
-                color_index = (row + col) % len(colors)
-                color = colors[color_index]
-
-                if index == 1:
-                    color = '#27ae60'
-                elif index == 100:
-                    color = '#f1c40f'
-                elif index in SNAKES:
-                    color = '#e74c3c'
-                elif index in LADDERS:
-                    color = '#2ecc71'
-
-                self.canvas.create_rectangle(x1, y1, x2, y2, fill=color, outline='#2c3e50', width=2)
-                self.canvas.create_text(x1 + TILE_SIZE // 2, y1 + TILE_SIZE // 2,
-                                        text=str(index), font=("Arial", 12, "bold"), fill="#2c3e50")
+        # Полиња, броеви, змии и скали како една слика; над неа се само токените
+        self.board_item = self.canvas.create_image(0, 0, anchor="nw", tags="board")
+        self.show_board()
+
+    def show_board(self, cache_dir=None):
+        # Рендерот за оваа големина: од меморија, од дискот или, првиот пат, исцртан со PIL
+        geo = self.geo
+        self.board_photo = BOARD_PHOTOS.get(self.root, ("board", geo.board_size, geo.margin),
+                                            partial(board_render.board_image, geo.board_size, geo.margin,
+                                                    SNAKES, LADDERS, SPRITES, cache_dir=cache_dir))
+        self.canvas.itemconfig(self.board_item, image=self.board_photo)
+
+    def on_canvas_resize(self, event):
+        # Configure стига при секое поместување на работ; таблата се менува по кратка пауза
+        if self._resize_job is not None:
+            self.root.after_cancel(self._resize_job)
+        self._resize_job = self.root.after(RESIZE_DELAY_MS, self.resize_board, event.width, event.height)
+
+    def resize_board(self, width, height):
+        self._resize_job = None
+        border = 2 * (int(self.canvas["highlightthickness"]) + int(self.canvas["bd"]))
+        geo = fit_board(min(width, height) - border)
+        if geo == self.geo:
+            return
+        # Само се заменува сликата на таблата и се поместуваат токените - ништо не се црта одново
+        # Сликите на змиите и скалите се веќе во меморија, па за големи табли цртањето е
+        # побрзо од вчитување PNG од дискот - дискот се користи само за почетната големина
+        self.geo = geo
+        self.show_board(cache_dir="")
+        self.scale_tokens()
+
+    def scale_tokens(self):
+        scale = self.geo.scale
+        for player in range(2):
+            self.canvas.itemconfig(self.tokens[player], width=max(1, round(3 * scale)))
+            self.canvas.itemconfig(self.labels[player], font=("Arial", max(8, round(16 * scale)), "bold"))
+            self.move_token(player)
 
     def get_tile_center_coords(self, pos: int):
-        if pos <= 0:
-            x = 15
-            y = BOARD_SIZE + BOARD_MARGIN - 40
-            return x, y
-
-        if pos > 100:
-            pos = 100
-
-        pos -= 1
-        row = pos // 10
-
-        if row % 2 == 0:
-            col = pos % 10
-        else:
-            col = 9 - (pos % 10)
-
-        x = col * TILE_SIZE + TILE_SIZE // 2 + BOARD_MARGIN
-        y = BOARD_SIZE - (row * TILE_SIZE + TILE_SIZE // 2) + BOARD_MARGIN
-        return x, y
-
-    # ---------- Snakes & Ladders ----------
-    def draw_snakes_and_ladders(self):
-        self.snake_photo_images = []
-        self.ladder_photo_images = []
-
-        for start_pos, end_pos in SNAKES.items():
-            self._draw_snake(start_pos, end_pos)
-
-        for start_pos, end_pos in LADDERS.items():
-            self._draw_ladder(start_pos, end_pos)
-
-        self.canvas.tag_raise("player0")
-        self.canvas.tag_raise("player1")
-        self.canvas.tag_raise("label0")
-        self.canvas.tag_raise("label1")
-
-    def _draw_snake(self, start_pos, end_pos):
-        start_x, start_y = self.get_tile_center_coords(start_pos)
-        end_x, end_y = self.get_tile_center_coords(end_pos)
-
-        self.canvas.create_line(start_x, start_y, end_x, end_y,
-                                fill='#c0392b', width=8, smooth=True,
-                                capstyle=tk.ROUND, arrow=tk.LAST, arrowshape=(16, 20, 6))
-
-        try:
-            resized_snake = self.base_snake_img.resize((40, 40), Image.Resampling.LANCZOS)
-            snake_photo = ImageTk.PhotoImage(resized_snake)
-            self.snake_photo_images.append(snake_photo)
-            self.canvas.create_image(end_x, end_y, image=snake_photo)
-        except Exception:
-            self.canvas.create_oval(end_x - 8, end_y - 8, end_x + 8, end_y + 8,
-                                    fill='#e74c3c', outline='#c0392b', width=2)
-
-    def _draw_ladder(self, start_pos, end_pos):
-        start_x, start_y = self.get_tile_center_coords(start_pos)
-        end_x, end_y = self.get_tile_center_coords(end_pos)
-
-        offset = 8
-        self.canvas.create_line(start_x - offset, start_y, end_x - offset, end_y,
-                                fill='#27ae60', width=4, capstyle=tk.ROUND)
-        self.canvas.create_line(start_x + offset, start_y, end_x + offset, end_y,
-                                fill='#27ae60', width=4, capstyle=tk.ROUND)
-
-        steps = 5
-        for i in range(1, steps):
-            step_x1 = start_x + (end_x - start_x) * i / steps - offset
-            step_y1 = start_y + (end_y - start_y) * i / steps
-            step_x2 = start_x + (end_x - start_x) * i / steps + offset
-            step_y2 = start_y + (end_y - start_y) * i / steps
-            self.canvas.create_line(step_x1, step_y1, step_x2, step_y2,
-                                    fill='#2ecc71', width=3)
-
-        try:
-            angle = math.atan2(end_y - start_y, end_x - start_x)
-            angle_deg = math.degrees(angle)
-            rotated_ladder = self.base_ladder_img.rotate(-angle_deg, expand=True)
-            resized_ladder = rotated_ladder.resize((50, 50), Image.Resampling.LANCZOS)
-            ladder_photo = ImageTk.PhotoImage(resized_ladder)
-            self.ladder_photo_images.append(ladder_photo)
-            mid_x = (start_x + end_x) // 2
-            mid_y = (start_y + end_y) // 2
-            self.canvas.create_image(mid_x, mid_y, image=ladder_photo)
-        except Exception:
-            pass
+        # Од табелата на геометријата: 0 е почетното место лево од полето 1
+        return self.geo.centers[max(min(pos, 100), 0)]
 
     # ---------- Gameplay ----------
     def roll_dice(self):
@@ -467,104 +412,162 @@ class SnakeLadderGame:
                 return
 
             self.roll_button.config(state=tk.DISABLED)
-            self.safe_ws_send_json({"action": "roll", "player": self.logged_username})
-        else:
+            self.safe_ws_send_json(protocol.Roll(player=self.logged_username).to_dict())
+        elif not self.playing and self.game.can_roll() and not self.game.is_bot(self.game.current):
             self.roll_button.config(state=tk.DISABLED)
-            self.animate_dice()
-
-    def animate_dice(self, frame=0):
-        if frame < 15:
-            value = random.randint(1, 6)
-            self.dice_label.config(image=self.dice_images[value - 1])
-            self.root.after(80, lambda: self.animate_dice(frame + 1))
-        else:
-            self.dice_value = random.randint(1, 6)
-            self.dice_label.config(image=self.dice_images[self.dice_value - 1])
-            self.movable = True
-            self.roll_button.config(state=tk.NORMAL)
+            self.game.roll()
 
     def try_move(self, player: int):
-        if player != self.current_player or not self.movable:
+        if self.ws_connected or self.playing:
+            return  # онлајн потегот го прави серверот; локално се чека крајот на анимацијата
+        if not self.game.move(player):
             self.status_label.config(text=f"It's {self.player_names[self.current_player]}'s turn!")
-            return
 
-        current_pos = self.positions[player]
-        next_pos = current_pos + self.dice_value
+    def play_bot_turn(self):
+        if self.playing or not self.game.is_bot(self.game.current):
+            return
+        if self.game.can_roll():
+            self.game.roll()
+        elif self.game.dice is not None:
+            self.game.move(self.game.current)  # auto-play вклучено откако играчот фрлил
+
+    def animate(self, seconds, update, done, **kwargs):
+        # На Instant анимацијата се прескокнува: само крајната состојба, во истиот повик
+        if self.animator.speed == math.inf:
+            done()
+        else:
+            self.animator.tween(seconds, update, done, **kwargs)
+
+    # ---------- Приказ на настаните од играта ----------
+    # Играта ги решава потезите веднаш; настаните се редат и се прикажуваат еден по еден,
+    # секој со својата анимација, а следниот почнува кога ќе заврши претходниот.
+    def on_game_event(self, event):
+        self.steps.append(event)
+        if not self.playing:
+            self.play_next()
+
+    def play_next(self):
+        # Кога настанот завршува веднаш (Instant), следниот се прикажува во истата јамка, не рекурзивно
+        if self._stepping:
+            self._step_again = True
+            return
+        self._stepping = True
+        try:
+            while True:
+                if not self.steps:
+                    self.playing = False
+                    return
+                self.playing = True
+                self._step_again = False
+                event = self.steps.popleft()
+                self.game_handlers[type(event)](event)
+                if not self._step_again:
+                    return  # анимацијата е во тек; нејзиниот done ќе повика play_next
+        finally:
+            self._stepping = False
+
+    def show_roll(self, event):
+        shown = [-1]  # последното прикажано лице, за да не се менува слика на секој кадар
+
+        def update(t):
+            face = int(t * DICE_SECONDS / DICE_FACE_SECONDS)
+            if face != shown[0]:
+                shown[0] = face
+                self.dice_label.config(image=self.dice_images[random.randint(1, 6) - 1])
+
+        def done():
+            self.dice_label.config(image=self.dice_images[event.value - 1])
+            if self.game.is_bot(event.player):
+                self.game.move(event.player)  # ботот сам го поместува токенот
+            else:
+                self.movable = True
+                self.roll_button.config(state=tk.NORMAL)
+            self.play_next()
 
-        if current_pos == 0:
-            next_pos = self.dice_value
+        self.roll_button.config(state=tk.DISABLED)
+        self.animate(DICE_SECONDS, update, done, easing=animation.linear)
 
-        if next_pos > 100:
-            self.status_label.config(text=f"{self.player_names[player]} overshot! Turn passes.")
-            self.movable = False
-            self.switch_turn()
-            return
+    def show_move(self, event):
+        # Низ центрите на сите полиња по патот, за исто време без разлика на растојанието
+        self.movable = False
+        path = range(event.start, event.end + 1)
 
-        self.total_moves[player] += 1
-        self.animate_token_move(player, current_pos, next_pos)
+        def done():
+            self.positions[event.player] = event.end
+            self.move_token(event.player)
+            self.play_next()
 
-    def animate_token_move(self, player, start_pos, end_pos, step=0):
-        if step < (end_pos - start_pos):
-            intermediate_pos = start_pos + step + 1
-            self.positions[player] = intermediate_pos
-            self.move_token(player)
-            self.root.after(100, lambda: self.animate_token_move(player, start_pos, end_pos, step + 1))
-        else:
-            final_pos = end_pos
+        self.animate(MOVE_SECONDS, lambda t: self.place_token_along(event.player, path, t), done)
 
-            if final_pos in LADDERS:
-                self.status_label.config(text=f"{self.player_names[player]} climbed a ladder!")
-                ladder_top = LADDERS[final_pos]
-                self.root.after(500, lambda: self.animate_special_move(player, final_pos, ladder_top))
-                return
-            elif final_pos in SNAKES:
-                self.status_label.config(text=f"{self.player_names[player]} was bitten by a snake!")
-                snake_tail = SNAKES[final_pos]
-                self.root.after(500, lambda: self.animate_special_move(player, final_pos, snake_tail))
-                return
+    def show_slide(self, event):
+        name = self.player_names[event.player]
+        self.status_label.config(text=f"{name} climbed a ladder!" if event.ladder else f"{name} was bitten by a snake!")
+        path = (event.start, event.end)
 
-            self.positions[player] = final_pos
-            self.move_token(player)
-            self.movable = False
+        def done():
+            self.positions[event.player] = event.end
+            self.move_token(event.player)
+            self.play_next()
 
-            if final_pos == 100:
-                self.handle_victory(player)
-            else:
-                self.switch_turn()
+        self.animate(SPECIAL_PAUSE_SECONDS, None, lambda: self.animate(
+            SPECIAL_SECONDS, lambda t: self.place_token_along(event.player, path, t), done))
 
-    def animate_special_move(self, player, from_pos, to_pos):
-        self.positions[player] = to_pos
-        self.move_token(player)
+    def show_overshot(self, event):
         self.movable = False
-        if to_pos == 100:
-            self.handle_victory(player)
-        else:
-            self.switch_turn()
+        self.status_label.config(text=f"{self.player_names[event.player]} overshot! Turn passes.")
+        self.play_next()
 
-    def move_token(self, player):
-        if self.positions[player] <= 0:
-            if player == 0:
-                x, y = 15, BOARD_SIZE + BOARD_MARGIN - 40
-            else:
-                x, y = BOARD_SIZE + BOARD_MARGIN * 2 - 15, BOARD_SIZE + BOARD_MARGIN - 40
-        else:
-            x, y = self.get_tile_center_coords(self.positions[player])
+    def show_turn(self, event):
+        self.current_player = event.player
+        self.status_label.config(text=f"{self.player_names[self.current_player]}'s turn")
+        bot = self.game.is_bot(event.player)
+        self.roll_button.config(state=tk.DISABLED if bot else tk.NORMAL)
+        if bot:
+            self.animator.delay(BOT_DELAY_SECONDS, self.play_bot_turn)
+        self.play_next()
+
+    def show_win(self, event):
+        self.playing = False  # "Play again" почнува нова низа настани
+        self.handle_victory(event.player)
 
+    def show_reset(self, event):
+        self.positions = [0, 0]
+        self.move_token(0)
+        self.move_token(1)
+        self.current_player = 0
+        self.movable = False
+        self.status_label.config(text=f"{self.player_names[0]}'s turn")
+        self.dice_label.config(image='')
+        self.start_time = time.time()
+        # Брзината и auto-play остануваат вклучени и за новата игра
+        self.practice = self.game.is_bot(0) or self.animator.speed != 1.0
+        self.roll_button.config(state=tk.DISABLED if self.game.is_bot(0) else tk.NORMAL)
+        if self.game.is_bot(0):
+            self.animator.delay(BOT_DELAY_SECONDS, self.play_bot_turn)
+        self.play_next()
+
+    def token_coords(self, player, pos):
+        """Каде стои токенот на играчот на дадено поле (0 = надвор од таблата)"""
+        x, y = self.get_tile_center_coords(pos)
+        if pos <= 0 and player == 1:
+            x = self.geo.width - x  # вториот играч чека десно од таблата
+
+        offset = round(8 * self.geo.scale)
         if player == 0:
-            offset_x, offset_y = -8, -8
-        else:
-            offset_x, offset_y = 8, 8
+            offset = -offset
+        return x + offset, y + offset
 
-        self.canvas.coords(self.tokens[player],
-                           x + offset_x - 12, y + offset_y - 12,
-                           x + offset_x + 12, y + offset_y + 12)
+    def place_token(self, player, x, y):
+        radius = 12 * self.geo.scale
+        self.canvas.coords(self.tokens[player], x - radius, y - radius, x + radius, y + radius)
+        self.canvas.coords(self.labels[player], x, y - 30 * self.geo.scale)
 
-        if self.positions[player] <= 0:
-            label_y = y + offset_y - 30
-        else:
-            label_y = y + offset_y - 30
+    def place_token_along(self, player, path, t):
+        # Координатите се земаат од тековната геометрија, па анимацијата го следи и менувањето на големината
+        self.place_token(player, *animation.along([self.token_coords(player, pos) for pos in path], t))
 
-        self.canvas.coords(self.labels[player], x + offset_x, label_y)
+    def move_token(self, player):
+        self.place_token(player, *self.token_coords(player, self.positions[player]))
 
     def handle_victory(self, player):
         winner_name = self.player_names[player]
@@ -573,18 +576,20 @@ class SnakeLadderGame:
 
         duration = int(time.time() - self.start_time)
 
-        if self.singleplayer:
+        if self.practice:
+            self.status_label.config(text=f"🎉 {winner_name} WINS! 🎉\n(practice game, not recorded)")
+        elif self.singleplayer:
             if player == 0:
                 self.save_local_score("win", duration)
             else:
                 self.save_local_score("loss")
 
-        if self.server_update_fn and self.logged_username:
+        if self.server_update_fn and self.logged_username and not self.practice:
             try:
                 if (player == 0 and self.is_host) or (player == 1 and not self.is_host):
-                    self.server_update_fn(self.logged_username, "win", duration)
+                    self.server_update_fn(self.logged_username, "win", duration, self.game.moves[player])
                 elif not self.singleplayer:
-                    self.server_update_fn(self.logged_username, "loss", None)
+                    self.server_update_fn(self.logged_username, "loss", duration, None)
             except Exception:
                 pass
 
@@ -594,30 +599,18 @@ class SnakeLadderGame:
         if choice == "yes":
             self.reset_game()
             if self.ws_connected:
-                self.safe_ws_send_json({"type": "reset"})
+                self.safe_ws_send_json(protocol.Reset().to_dict())
         else:
             if callable(self.on_game_end):
                 self.on_game_end(player)
             self.root.quit()
 
-    def switch_turn(self):
-        self.current_player = 1 - self.current_player
-        self.status_label.config(text=f"{self.player_names[self.current_player]}'s turn")
-
-        if self.singleplayer and self.current_player == 1:
-            self.root.after(1000, self.roll_dice)
-
     def reset_game(self):
-        self.positions = [0, 0]
-        self.move_token(0)
-        self.move_token(1)
-        self.current_player = 0
-        self.movable = False
-        self.status_label.config(text=f"{self.player_names[0]}'s turn")
-        self.dice_label.config(image='')
-        self.roll_button.config(state=tk.NORMAL)
-        self.total_moves = [0, 0]
-        self.start_time = time.time()
+        # Потег што се уште се анимира не смее да продолжи по ресетот
+        self.animator.cancel_all()
+        self.steps.clear()
+        self.playing = False
+        self.game.reset()  # -> show_reset
 
     def update_player_info(self, player_idx, name, avatar):
         """Update player information and UI"""
@@ -633,39 +626,34 @@ class SnakeLadderGame:
                 self.canvas.itemconfig(self.labels[player_idx], text=avatar)
 
     # ---------- WebSocket handler ----------
-    def on_ws_message(self, message: str):
+    def on_ws_message(self, message: str | bytes):
         try:
-            obj = json.loads(message)
-            print(f"Game received: {obj}")  # Debug logging
-        except json.JSONDecodeError:
+            event = protocol.parse_event(wire.decode(message, self.ws_codec()))
+            print(f"Game received: {event}")  # Debug logging
+        except Exception:
             return
 
-        if obj.get("type") == "state_update":
-            self.apply_server_state(obj)
-        elif obj.get("type") == "player_info_update":
-            if "players" in obj:
-                self.update_players_from_server(obj["players"])
-        elif obj.get("type") == "game_state":
-            self.apply_server_state(obj)
-        elif obj.get("type") == "notice":
-            print(f"Game notice: {obj.get('message')}")
-            if "positions" in obj:
-                for pname, pos in obj["positions"].items():
-                    self.move_piece_by_name(pname, pos)
-            if "turn" in obj and obj["turn"]:
-                turn_display = self.get_display_name_for_username(obj["turn"])
-                if turn_display in self.player_names:
-                    self.current_player = self.player_names.index(turn_display)
-        elif obj.get("type") == "reset":
-            self.reset_game()
+        handler = self.event_handlers.get(type(event))
+        if handler:
+            handler(event)
+
+    def apply_notice(self, notice):
+        print(f"Game notice: {notice.message}")
+        if notice.positions:
+            for pname, pos in notice.positions.items():
+                self.move_piece_by_name(pname, pos)
+        if notice.turn:
+            turn_display = self.get_display_name_for_username(notice.turn)
+            if turn_display in self.player_names:
+                self.current_player = self.player_names.index(turn_display)
 
     def apply_server_state(self, state):
         """Apply server state updates to the game - FIXED VERSION"""
-        positions = state.get("positions", {})
-        turn = state.get("turn")
-        last_roll = state.get("last_roll")
-        player = state.get("player")
-        players_info = state.get("players", {})
+        positions = state.positions or {}
+        turn = state.turn
+        last_roll = getattr(state, "last_roll", None)  # Only state_update carries a roll
+        player = getattr(state, "player", None)
+        players_info = state.players or {}
 
         print(f"Applying state: positions={positions}, turn={turn}, players={players_info}")
 
@@ -764,39 +752,24 @@ class SnakeLadderGame:
             self.move_token(idx)
 
     # ---------- WebSocket handler ----------
-    def on_ws_message(self, message: str):
+    def on_ws_message(self, message: str | bytes):
         try:
-            obj = json.loads(message)
-            print(f"Game received: {obj}")  # Debug logging
-        except json.JSONDecodeError:
+            event = protocol.parse_event(wire.decode(message, self.ws_codec()))
+            print(f"Game received: {event}")  # Debug logging
+        except Exception:
             return
 
-        if obj.get("type") == "state_update":
-            self.apply_server_state(obj)
-        elif obj.get("type") == "player_info_update":
-            if "players" in obj:
-                self.update_players_from_server(obj["players"])
-        elif obj.get("type") == "game_state":
-            self.apply_server_state(obj)
-        elif obj.get("type") == "notice":
-            print(f"Game notice: {obj.get('message')}")
-            if "positions" in obj:
-                for pname, pos in obj["positions"].items():
-                    self.move_piece_by_name(pname, pos)
-            if "turn" in obj and obj["turn"]:
-                turn_display = self.get_display_name_for_username(obj["turn"])
-                if turn_display in self.player_names:
-                    self.current_player = self.player_names.index(turn_display)
-        elif obj.get("type") == "reset":
-            self.reset_game()
+        handler = self.event_handlers.get(type(event))
+        if handler:
+            handler(event)
 
     def apply_server_state(self, state):
         """Apply server state updates to the game - FIXED VERSION"""
-        positions = state.get("positions", {})
-        turn = state.get("turn")
-        last_roll = state.get("last_roll")
-        player = state.get("player")
-        players_info = state.get("players", {})
+        positions = state.positions or {}
+        turn = state.turn
+        last_roll = getattr(state, "last_roll", None)  # Only state_update carries a roll
+        player = getattr(state, "player", None)
+        players_info = state.players or {}
 
         print(f"Applying state: positions={positions}, turn={turn}, players={players_info}")
 
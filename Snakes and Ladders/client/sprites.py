@@ -0,0 +1,187 @@
+# Sprite images shared by every game window in the process.
+# Base images are decoded once; resized and rotated variants are kept in a
+# bounded LRU, so repeat games and board re-renders don't resample again.
+# Dice faces are drawn once per size, and Tk images made once per interpreter.
+import os
+from collections import OrderedDict
+from functools import lru_cache
+
+from PIL import Image, ImageDraw, ImageTk
+
+import atlas
+
+ASSET_PATH = "snake_ladder_assets/"
+
+# Resized/rotated variants and Tk images kept, overridable through the environment
+SPRITE_CACHE_SIZE = int(os.environ.get("SPRITE_CACHE_SIZE", "64"))
+PHOTO_CACHE_SIZE = int(os.environ.get("PHOTO_CACHE_SIZE", "64"))
+# Whole-board renders are big (about 18 MB each at 4K), so only the last few sizes stay around
+BOARD_PHOTO_CACHE_SIZE = int(os.environ.get("BOARD_PHOTO_CACHE_SIZE", "4"))
+
+
+def draw_snake() -> Image.Image:
+    # Used when snake_big.png is missing or unreadable
+    img = Image.new('RGBA', (80, 80), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(img)
+
+    draw.ellipse([10, 20, 70, 60], fill='#e74c3c', outline='#c0392b', width=3)
+    draw.ellipse([50, 10, 75, 35], fill='#c0392b', outline='#8b0000', width=2)
+    draw.ellipse([58, 16, 62, 20], fill='white')
+    draw.ellipse([68, 16, 72, 20], fill='white')
+    draw.ellipse([59, 17, 61, 19], fill='black')
+    draw.ellipse([69, 17, 71, 19], fill='black')
+
+    return img
+
+
+def draw_ladder() -> Image.Image:
+    # Used when ladder_big.png is missing or unreadable
+    img = Image.new('RGBA', (80, 80), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(img)
+
+    draw.rectangle([25, 5, 30, 75], fill='#8B4513', outline='#654321', width=1)
+    draw.rectangle([50, 5, 55, 75], fill='#8B4513', outline='#654321', width=1)
+
+    for i in range(6):
+        y = 10 + i * 11
+        draw.rectangle([25, y, 55, y + 3], fill='#A0522D', outline='#654321', width=1)
+
+    return img
+
+
+@lru_cache(maxsize=64)
+def dice_face(value: int, size: int = 70) -> Image.Image:
+    """Dice face drawn once per (value, size) in the process"""
+    img = Image.new('RGB', (size, size), '#ecf0f1')
+    draw = ImageDraw.Draw(img)
+    dot_radius = size // 12
+    center = size // 2
+    offset = size // 4
+
+    draw.rectangle([2, 2, size - 3, size - 3], outline='#34495e', width=3, fill='#ecf0f1')
+
+    dots = {
+        1: [(center, center)],
+        2: [(center - offset, center - offset), (center + offset, center + offset)],
+        3: [(center - offset, center - offset), (center, center), (center + offset, center + offset)],
+        4: [(center - offset, center - offset), (center + offset, center - offset),
+            (center - offset, center + offset), (center + offset, center + offset)],
+        5: [(center - offset, center - offset), (center + offset, center - offset),
+            (center - offset, center + offset), (center + offset, center + offset), (center, center)],
+        6: [(center - offset, center - offset), (center + offset, center - offset),
+            (center - offset, center), (center + offset, center),
+            (center - offset, center + offset), (center + offset, center + offset)]
+    }
+
+    for x, y in dots[value]:
+        draw.ellipse((x - dot_radius, y - dot_radius, x + dot_radius, y + dot_radius), fill='#e74c3c')
+    return img
+
+
+class SpriteCache:
+    """Decoded sprite assets and an LRU of their variants, keyed by (asset, size, angle).
+
+    Each asset is a PNG under ASSET_PATH with a drawn fallback; bases are
+    sliced from the memory-mapped sprite atlas (see atlas.py) when there is
+    one, and decoded from the PNG otherwise. get() returns
+    the asset rotated by `angle` degrees (counter-clockwise, canvas expanded)
+    and resized to `size`; angles are rounded to a tenth of a degree so
+    float noise from atan2 doesn't defeat the cache. Returned images are
+    shared: don't draw on them."""
+
+    def __init__(self, files: dict[str, tuple[str, object]], maxsize: int = SPRITE_CACHE_SIZE):
+        self.files = files  # asset -> (file name, fallback drawing function)
+        self.maxsize = maxsize
+        self._bases: dict[str, Image.Image] = {}
+        self._variants: OrderedDict[tuple, Image.Image] = OrderedDict()
+        self._atlas = None  # opened on first use; False once it turned out to be unavailable
+        self.hits = self.misses = 0
+
+    def path(self, asset: str) -> str:
+        return os.path.join(ASSET_PATH, self.files[asset][0])
+
+    def stamp(self) -> tuple:
+        """Name, size and mtime of every asset file, so editing one invalidates renders made from it"""
+        stamp = []
+        for asset in sorted(self.files):
+            try:
+                st = os.stat(self.path(asset))
+                stamp.append((asset, st.st_size, int(st.st_mtime)))
+            except OSError:
+                stamp.append((asset, None, None))
+        return tuple(stamp)
+
+    def base(self, asset: str) -> Image.Image:
+        image = self._bases.get(asset)
+        if image is None:
+            if self._atlas is None:
+                self._atlas = atlas.load(ASSET_PATH) or False
+            name = os.path.splitext(self.files[asset][0])[0]
+            try:
+                if self._atlas and name in self._atlas:
+                    image = self._atlas.image(name)
+                else:
+                    with Image.open(self.path(asset)) as f:
+                        image = f.convert("RGBA")
+            except Exception:
+                image = self.files[asset][1]()
+            self._bases[asset] = image
+        return image
+
+    def get(self, asset: str, size: int | tuple[int, int], angle: float = 0.0) -> Image.Image:
+        if isinstance(size, int):
+            size = (size, size)
+        key = (asset, size, round(angle, 1) % 360)
+        image = self._variants.get(key)
+        if image is not None:
+            self.hits += 1
+            self._variants.move_to_end(key)
+            return image
+        self.misses += 1
+        image = self.base(asset)
+        if key[2]:
+            image = image.rotate(key[2], expand=True)
+        image = image.resize(size, Image.Resampling.LANCZOS)
+        self._variants[key] = image
+        if len(self._variants) > self.maxsize:
+            self._variants.popitem(last=False)
+        return image
+
+    def clear(self):
+        self._bases.clear()
+        self._variants.clear()
+        self._atlas = None
+
+
+class PhotoCache:
+    """Tk PhotoImages made once per Tk interpreter and key, in an LRU.
+
+    A PhotoImage belongs to the interpreter it was created in, and every
+    window of the client is a Toplevel of the same root, so all game windows
+    (and every "Play again") show the same image objects. Windows keep their
+    own reference, so evicting one from here never blanks a window."""
+
+    def __init__(self, maxsize: int = PHOTO_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._photos: OrderedDict[tuple, ImageTk.PhotoImage] = OrderedDict()
+
+    def get(self, master, key: tuple, make) -> ImageTk.PhotoImage:
+        """The PhotoImage for `key` in `master`'s interpreter; `make()` returns the PIL image on a miss"""
+        cache_key = (master.tk, key)
+        photo = self._photos.get(cache_key)
+        if photo is not None:
+            self._photos.move_to_end(cache_key)
+            return photo
+        photo = self._photos[cache_key] = ImageTk.PhotoImage(make(), master=master)
+        if len(self._photos) > self.maxsize:
+            self._photos.popitem(last=False)
+        return photo
+
+
+# Shared by all SnakeLadderGame instances
+PHOTOS = PhotoCache()
+BOARD_PHOTOS = PhotoCache(BOARD_PHOTO_CACHE_SIZE)
+SPRITES = SpriteCache({
+    "snake": ("snake_big.png", draw_snake),
+    "ladder": ("ladder_big.png", draw_ladder),
+})
@@ -0,0 +1,79 @@
+# Game events from the WebSocket threads, applied on the Tk thread.
+# websocket-client calls on_message on its run_forever thread, where Tk widgets
+# must not be touched; the callbacks only decode and queue, and a periodic
+# `after` pump on the Tk thread applies what arrived. A burst of full-state
+# frames for one game is applied as its newest frame: one redraw, not one per frame.
+import dataclasses
+import os
+import queue
+import sys
+
+import protocol
+
+# Overridable through the environment on the hosting platform
+WS_PUMP_MS = int(os.environ.get("WS_PUMP_MS", "16"))  # about one check per frame at 60 Hz
+WS_PUMP_MAX = int(os.environ.get("WS_PUMP_MAX", "500"))  # frames taken per pump, so a flood can't freeze the UI
+
+# Events that carry the whole board, so a newer one makes an older one redundant
+FULL_STATE = (protocol.StateUpdate, protocol.GameState)
+
+
+def coalesce(frames: list[tuple]) -> list[tuple]:
+    """Drop full-state frames that a later one for the same session replaces.
+
+    `frames` are (session, event) in arrival order. A full-state frame only
+    replaces the one before it when nothing else for that session came in
+    between (a reset or notice keeps its place in the order), and the
+    survivor takes over the older frame's player list if it has none, so
+    no name or avatar change is lost."""
+    out = []
+    latest = {}  # session -> index in `out` of its full-state frame, while nothing newer for it followed
+    for session, event in frames:
+        if isinstance(event, FULL_STATE):
+            index = latest.get(session)
+            if index is not None:
+                older = out[index][1]
+                if event.players is None and older.players is not None:
+                    event = dataclasses.replace(event, players=older.players)
+                out[index] = (session, event)
+                continue
+            latest[session] = len(out)
+        else:
+            latest.pop(session, None)
+        out.append((session, event))
+    return out
+
+
+class WsPump:
+    """Queue that WebSocket threads put events on and the Tk thread drains every WS_PUMP_MS.
+
+    put(session, event) may be called from any thread; handler(session,
+    event) is called on the Tk thread with the coalesced events, in order."""
+
+    def __init__(self, root, handler, interval_ms: int = WS_PUMP_MS):
+        self.root = root
+        self.handler = handler
+        self.interval_ms = interval_ms
+        self._events = queue.Queue()
+        self.received = self.applied = 0  # frames put versus frames handed to the handler
+        self.root.after(self.interval_ms, self._pump)
+
+    def put(self, session, event):
+        self._events.put((session, event))
+
+    def _pump(self):
+        frames = []
+        try:
+            while len(frames) < WS_PUMP_MAX:
+                frames.append(self._events.get_nowait())
+        except queue.Empty:
+            pass
+        if frames:
+            self.received += len(frames)
+            for session, event in coalesce(frames):
+                self.applied += 1
+                try:
+                    self.handler(session, event)
+                except Exception:
+                    self.root.report_callback_exception(*sys.exc_info())  # as Tk would; the rest still apply
+        self.root.after(self.interval_ms, self._pump)
@@ -0,0 +1,23 @@
+# Board layout, shared by the client (drawing and local play) and the server (analytics).
+# Keys are the tiles a token lands on, values where it ends up.
+
+# Точно поставени змии и скали според стандардната игра
+SNAKES = {
+    98: 78,  # Горе-лево до долу-средина
+    95: 56,  # Горе-средина до средина
+    87: 24,  # Горе-десно до долу-лево
+    62: 18,  # Средина-десно до долу
+    54: 34,  # Средина до долу-средина
+    16: 6  # Долу-средина до почеток
+}
+
+LADDERS = {
+    1: 38,  # Почеток до средина-лево
+    4: 14,  # Почеток малку нагоре
+    9: 21,  # Лево-долу до долу-средина
+    28: 84,  # Средина до горе-лево
+    36: 44,  # Средина-лево малку нагоре
+    51: 67,  # Средина до средина-горе
+    71: 91,  # Горе-лево до врв-лево
+    80: 100  # Горе-десно до врв
+}
@@ -0,0 +1,156 @@
+# Rules of a local game without any UI: turns, dice, moves, snakes and ladders,
+# overshooting, victory and which seats are played by the bot.
+# The Tk window is a view over a Game: it calls roll()/move() and animates the
+# events the game emits; tests, simulations and the server can run one directly.
+import random
+from dataclasses import dataclass
+
+from board import LADDERS, SNAKES
+
+FINISH = 100
+
+
+# ========= EVENTS ==========
+# Emitted in order, synchronously from the call that caused them
+
+@dataclass(slots=True, frozen=True)
+class Rolled:
+    player: int
+    value: int
+
+
+@dataclass(slots=True, frozen=True)
+class Moved:
+    player: int
+    start: int
+    end: int  # the tile the token lands on, before any snake or ladder
+
+
+@dataclass(slots=True, frozen=True)
+class Slid:
+    player: int
+    start: int
+    end: int
+    ladder: bool  # False: a snake
+
+
+@dataclass(slots=True, frozen=True)
+class Overshot:
+    player: int
+    value: int  # the roll that would have gone past the finish
+
+
+@dataclass(slots=True, frozen=True)
+class TurnChanged:
+    player: int
+
+
+@dataclass(slots=True, frozen=True)
+class Won:
+    player: int
+
+
+@dataclass(slots=True, frozen=True)
+class Reset:
+    pass
+
+
+class Game:
+    """State and rules of one game; listeners get every change as an event.
+
+    A turn is roll() then move(player) by the player whose turn it is (the
+    token is moved as a separate step, as clicking it is in the window).
+    Landing past FINISH forfeits the move. Seats in `bots` don't wait for
+    input: play_bot_turn() rolls and moves for them, and play_out() plays
+    every seat to the end. Pass a seeded random.Random for repeatable games."""
+
+    def __init__(self, players: int = 2, bots=(), rng: random.Random | None = None,
+                 snakes: dict = SNAKES, ladders: dict = LADDERS):
+        self.players = players
+        self.bots = set(bots)
+        self.rng = rng or random.Random()
+        self.snakes = snakes
+        self.ladders = ladders
+        self.listeners = []
+        self.reset(emit=False)
+
+    def subscribe(self, listener):
+        """Call `listener(event)` for every event from now on; returns a function that stops it"""
+        self.listeners.append(listener)
+        return lambda: self.listeners.remove(listener)
+
+    def emit(self, event):
+        for listener in list(self.listeners):
+            listener(event)
+
+    def reset(self, emit: bool = True):
+        self.positions = [0] * self.players
+        self.moves = [0] * self.players  # moves made (overshoots don't count), per player
+        self.current = 0
+        self.dice = None  # the roll waiting to be moved
+        self.winner = None
+        if emit:
+            self.emit(Reset())
+
+    def is_bot(self, player: int) -> bool:
+        return player in self.bots
+
+    def can_roll(self) -> bool:
+        return self.winner is None and self.dice is None
+
+    def roll(self, value: int | None = None) -> int:
+        """Roll for the player whose turn it is (`value` fixes the roll)"""
+        if not self.can_roll():
+            raise RuntimeError("the last roll hasn't been moved yet" if self.winner is None else "the game is over")
+        self.dice = value or self.rng.randint(1, 6)
+        self.emit(Rolled(self.current, self.dice))
+        return self.dice
+
+    def move(self, player: int) -> bool:
+        """Move `player` by the pending roll; False (and nothing happens) if it isn't theirs to move"""
+        if player != self.current or self.dice is None or self.winner is not None:
+            return False
+        value, self.dice = self.dice, None
+        start = self.positions[player]
+        end = start + value
+        if end > FINISH:
+            self.emit(Overshot(player, value))
+            self.next_turn()
+            return True
+
+        self.moves[player] += 1
+        self.positions[player] = end
+        self.emit(Moved(player, start, end))
+        target = self.ladders.get(end, self.snakes.get(end))
+        if target is not None:
+            self.positions[player] = target
+            self.emit(Slid(player, end, target, end in self.ladders))
+
+        if self.positions[player] == FINISH:
+            self.winner = player
+            self.emit(Won(player))
+        else:
+            self.next_turn()
+        return True
+
+    def next_turn(self):
+        self.current = (self.current + 1) % self.players
+        self.emit(TurnChanged(self.current))
+
+    def play_bot_turn(self) -> bool:
+        """Roll and move if it is a bot's turn; False otherwise"""
+        if self.winner is not None or not self.is_bot(self.current):
+            return False
+        if self.dice is None:
+            self.roll()
+        return self.move(self.current)
+
+    def play_out(self, max_turns: int = 100_000) -> int | None:
+        """Play every seat until someone wins; returns the winner (None if max_turns ran out)"""
+        for _ in range(max_turns):
+            if self.winner is not None:
+                break
+            if self.dice is None:
+                self.roll()
+            self.move(self.current)
+        return self.winner
@@ -0,0 +1,235 @@
+import types
+import typing
+from dataclasses import dataclass, fields
+
+# Game WebSocket protocol, shared by server and client.
+# Every message is a flat map: client actions are keyed by "action", server
+# events by "type". Each one has a model below; parse_action() / parse_event()
+# check a decoded frame against it and return the typed message, so handlers
+# never see a malformed dict. Each model gets its own generated parse function
+# (as dataclasses does for __init__), so a check costs one isinstance per field.
+#
+# On the multiplexed connection every message also has a "session" field.
+# Codes are the MessagePack row codes (see wire.py); field order is row order.
+# Bump VERSION when a change isn't backwards compatible.
+
+VERSION = 1
+
+# Longest strings accepted from clients
+MAX_NAME_LENGTH = 64
+MAX_AVATAR_LENGTH = 16
+MAX_SESSION_LENGTH = 64
+
+
+class ProtocolError(ValueError):
+    """A message that doesn't match its model"""
+
+
+ACTIONS: dict[str, type] = {}  # "action" value -> model
+EVENTS: dict[str, type] = {}  # "type" value -> model
+
+
+class Message:
+    __slots__ = ()
+    key: typing.ClassVar[str]  # "action" or "type"
+    name: typing.ClassVar[str]
+    code: typing.ClassVar[int | None]
+    wire_fields: typing.ClassVar[tuple[str, ...]]  # fields in row order, without "session"
+    _spec: typing.ClassVar[tuple]
+
+    @classmethod
+    def parse(cls, data: dict):
+        """Typed message from a decoded frame; ProtocolError if it doesn't match.
+
+        Reference version walking the spec; @message replaces it on every
+        model with a generated one that makes the same checks (see _compile_parse)."""
+        values = []
+        for name, accepted, required, limit in cls._spec:
+            value = data.get(name)
+            if value is None:
+                if required:
+                    raise ProtocolError(f"{cls.name}: missing {name}")
+            elif not isinstance(value, accepted):
+                raise ProtocolError(f"{cls.name}: {name} has the wrong type")
+            elif limit is not None and len(value) > limit:
+                raise ProtocolError(f"{cls.name}: {name} is too long")
+            values.append(value)
+        return cls(*values)
+
+    def to_dict(self) -> dict:
+        """Wire form; fields that are None are left out"""
+        message = {self.key: self.name}
+        for name, *_ in self._spec:
+            value = getattr(self, name)
+            if value is not None:
+                message[name] = value
+        return message
+
+
+def _accepted(annotation) -> tuple[type, ...]:
+    # `str | None` -> (str,): None is handled by `required`
+    if isinstance(annotation, types.UnionType):
+        return tuple(typing.get_origin(arg) or arg for arg in typing.get_args(annotation) if arg is not type(None))
+    return (typing.get_origin(annotation) or annotation,)
+
+
+def _compile_parse(cls):
+    """Generate `parse` for a model: straight-line checks, no loop over the spec"""
+    lines = ["def parse(cls, data):", "    get = data.get"]
+    namespace = {"ProtocolError": ProtocolError}
+    for i, (name, accepted, required, limit) in enumerate(cls._spec):
+        namespace[f"t{i}"] = accepted[0] if len(accepted) == 1 else accepted
+        lines.append(f"    v{i} = get({name!r})")
+        lines.append(f"    if v{i} is None:")
+        if required:
+            lines.append(f"        raise ProtocolError({f'{cls.name}: missing {name}'!r})")
+        else:
+            lines.append("        pass")
+        lines.append(f"    elif not isinstance(v{i}, t{i}):")
+        lines.append(f"        raise ProtocolError({f'{cls.name}: {name} has the wrong type'!r})")
+        if limit is not None:
+            lines.append(f"    elif len(v{i}) > {limit}:")
+            lines.append(f"        raise ProtocolError({f'{cls.name}: {name} is too long'!r})")
+    lines.append(f"    return cls({', '.join(f'v{i}' for i in range(len(cls._spec)))})")
+    exec("\n".join(lines), namespace)
+    return classmethod(namespace["parse"])
+
+
+def message(key: str, name: str, code: int | None = None, required: tuple[str, ...] = (),
+            limits: dict[str, int] | None = None):
+    """Register a model: every field defaults to None, `required` ones must be present"""
+    limits = {"session": MAX_SESSION_LENGTH, **(limits or {})}
+
+    def register(cls):
+        cls = dataclass(slots=True)(cls)
+        cls.key, cls.name, cls.code = key, name, code
+        cls.wire_fields = tuple(f.name for f in fields(cls) if f.name != "session")
+        cls._spec = tuple((f.name, _accepted(f.type), f.name in required, limits.get(f.name)) for f in fields(cls))
+        cls.parse = _compile_parse(cls)
+        (ACTIONS if key == "action" else EVENTS)[name] = cls
+        return cls
+    return register
+
+
+# ========= CLIENT ACTIONS ==========
+
+@message("action", "player_info", code=16,
+         limits={"display_name": MAX_NAME_LENGTH, "display_avatar": MAX_AVATAR_LENGTH})
+class PlayerInfo(Message):
+    display_name: str | None = None
+    display_avatar: str | None = None
+    session: str | None = None
+
+
+@message("action", "roll", code=17)
+class Roll(Message):
+    player: str | None = None  # informational, the server rolls for the connection's user (so no length limit)
+    session: str | None = None
+
+
+@message("action", "subscribe", required=("session",))
+class Subscribe(Message):
+    session: str | None = None
+    spectate: bool | None = None
+
+
+@message("action", "unsubscribe", required=("session",))
+class Unsubscribe(Message):
+    session: str | None = None
+
+
+@message("action", "subscribe_lobby")
+class SubscribeLobby(Message):
+    pass
+
+
+@message("action", "unsubscribe_lobby")
+class UnsubscribeLobby(Message):
+    pass
+
+
+# ========= SERVER EVENTS ==========
+
+@message("type", "game_state", code=1, required=("positions",))
+class GameState(Message):
+    positions: dict | None = None
+    players: dict | None = None
+    turn: str | None = None
+    session: str | None = None
+
+
+@message("type", "state_update", code=2, required=("positions", "last_roll", "player"))
+class StateUpdate(Message):
+    positions: dict | None = None
+    turn: str | None = None
+    last_roll: int | None = None
+    player: str | None = None
+    players: dict | None = None
+    session: str | None = None
+
+
+@message("type", "player_info_update", code=3, required=("players",))
+class PlayerInfoUpdate(Message):
+    players: dict | None = None
+    session: str | None = None
+
+
+@message("type", "notice", code=4, required=("message",))
+class Notice(Message):
+    message: str | None = None
+    positions: dict | None = None
+    turn: str | None = None
+    players: dict | None = None
+    session: str | None = None
+
+
+@message("type", "reset", code=5)
+class Reset(Message):
+    session: str | None = None
+
+
+@message("type", "error", required=("message",))
+class Error(Message):
+    message: str | None = None
+    session: str | None = None
+
+
+@message("type", "lobby_snapshot", required=("sessions",))
+class LobbySnapshot(Message):
+    version: int | None = None
+    sessions: list | None = None
+
+
+@message("type", "lobby_update", required=("upsert", "remove"))
+class LobbyUpdate(Message):
+    version: int | None = None
+    upsert: list | None = None
+    remove: list | None = None
+
+
+def parse_action(data) -> Message:
+    """Typed client action; ProtocolError if it is unknown or malformed"""
+    model = ACTIONS.get(data.get("action")) if isinstance(data, dict) else None
+    if model is None:
+        raise ProtocolError("unknown action")
+    return model.parse(data)
+
+
+def parse_event(data) -> Message:
+    """Typed server event; ProtocolError if it is unknown or malformed"""
+    model = EVENTS.get(data.get("type")) if isinstance(data, dict) else None
+    if model is None:
+        raise ProtocolError("unknown event")
+    return model.parse(data)
+
+
+def describe() -> dict:
+    """The protocol as data, for GET /protocol and third-party clients"""
+    def fields_of(model):
+        return {name: {"types": [t.__name__ for t in accepted], "required": required, "max_length": limit}
+                for name, accepted, required, limit in model._spec}
+    return {
+        "version": VERSION,
+        "actions": {name: {"code": model.code, "fields": fields_of(model)} for name, model in ACTIONS.items()},
+        "events": {name: {"code": model.code, "fields": fields_of(model)} for name, model in EVENTS.items()},
+    }
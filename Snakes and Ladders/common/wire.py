@@ -0,0 +1,206 @@
+import json
+import zlib
+from functools import lru_cache
+
+import protocol
+
+# Wire encodings for the game WebSocket, shared by server and client.
+# The encoding is negotiated through the Sec-WebSocket-Protocol header:
+#   stg.msgpack.v1 - binary MessagePack frames with positional fields (see SCHEMAS)
+#   stg.json.v1    - the original JSON text frames
+#   *.deflate.v1   - the same payloads in binary frames, deflated when large enough
+# A client that offers no subprotocol gets JSON, so old clients keep working.
+#
+# The deflate variants exist because websocket-client cannot negotiate the
+# permessage-deflate extension. Each frame is compressed on its own (against a
+# preset dictionary for JSON), so one encoding can be shared by every recipient.
+# A client that did agree permessage-deflate gets the plain variant instead, so
+# no frame is deflated twice.
+
+try:
+    import msgpack
+except ImportError:  # msgpack is optional, JSON is always available
+    msgpack = None
+
+SUBPROTOCOL_JSON = "stg.json.v1"
+SUBPROTOCOL_MSGPACK = "stg.msgpack.v1"
+SUBPROTOCOL_JSON_DEFLATE = "stg.json.deflate.v1"
+SUBPROTOCOL_MSGPACK_DEFLATE = "stg.msgpack.deflate.v1"
+
+# Payloads smaller than this are sent uncompressed
+COMPRESS_MIN_BYTES = 128
+# Upper bound for a decompressed frame, guards against deflate bombs
+MAX_DECOMPRESSED_BYTES = 1 << 20
+
+# Small window and memLevel: frames are a few hundred bytes at most
+_WBITS = 10
+_MEM_LEVEL = 4
+_RAW = b"\x00"
+_DEFLATED = b"\x01"
+
+# Preset dictionary for deflated JSON: the key names and fixed strings every frame repeats
+JSON_ZDICT = (
+    ' joined the game! left the game{"type":"notice","message":"{"type":"player_info_update",'
+    '{"type":"game_state","positions":{"display_name":"display_avatar":"🙂"},'
+    '"players":{"turn":null,"last_roll":"player":"{"type":"state_update","positions":{'
+).encode("utf-8")
+
+# code -> (discriminator key, discriminator value, field order), from the models in protocol.py
+# Binary frames are encoded as [code, field1, field2, ...]; a message with a key
+# outside its schema (or an unknown type) is sent as a plain MessagePack map instead.
+# On the multiplexed socket messages carry a "session" key; those rows are
+# [-code, session, field1, field2, ...].
+SCHEMAS = {model.code: (model.key, model.name, model.wire_fields)
+           for model in (*protocol.ACTIONS.values(), *protocol.EVENTS.values()) if model.code is not None}
+CODES = {(key, value): code for code, (key, value, _) in SCHEMAS.items()}
+
+
+def _pack_players(players: dict) -> dict:
+    # {username: {"display_name": ..., "display_avatar": ...}} -> {username: [name, avatar]}
+    return {username: [info.get("display_name"), info.get("display_avatar")] for username, info in players.items()}
+
+
+def _unpack_players(players: dict) -> dict:
+    return {username: {"display_name": name, "display_avatar": avatar}
+            for username, (name, avatar) in players.items()}
+
+
+class JsonCodec:
+    subprotocol = SUBPROTOCOL_JSON
+    binary = False
+
+    @staticmethod
+    def encode(message: dict) -> str:
+        return json.dumps(message, separators=(",", ":"), ensure_ascii=False)
+
+    @staticmethod
+    def decode(frame: str | bytes) -> dict:
+        return json.loads(frame)
+
+
+class MsgpackCodec:
+    subprotocol = SUBPROTOCOL_MSGPACK
+    binary = True
+
+    @staticmethod
+    def encode(message: dict) -> bytes:
+        code = CODES.get(("type", message.get("type"))) or CODES.get(("action", message.get("action")))
+        if code is None:
+            return msgpack.packb(message)
+        key, _, fields = SCHEMAS[code]
+        session = message.get("session")
+        extra = 2 if session is not None else 1
+        if (len(message) > len(fields) + extra
+                or any(k != key and k != "session" and k not in fields for k in message)):
+            return msgpack.packb(message)
+        row = [code] if session is None else [-code, session]
+        for field in fields:
+            value = message.get(field)
+            if field == "players" and value:
+                value = _pack_players(value)
+            row.append(value)
+        return msgpack.packb(row)
+
+    @staticmethod
+    def decode(frame: bytes) -> dict:
+        row = msgpack.unpackb(frame)
+        if isinstance(row, dict):
+            return row
+        if row[0] < 0:
+            key, value, fields = SCHEMAS[-row[0]]
+            message, values = {key: value, "session": row[1]}, row[2:]
+        else:
+            key, value, fields = SCHEMAS[row[0]]
+            message, values = {key: value}, row[1:]
+        # Absent and None fields are indistinguishable on the wire; readers use .get()
+        for field, field_value in zip(fields, values):
+            if field_value is None:
+                continue
+            if field == "players":
+                field_value = _unpack_players(field_value)
+            message[field] = field_value
+        return message
+
+
+class DeflateCodec:
+    """Wraps another codec; frames are one flag byte (raw / deflated) plus the payload"""
+    binary = True
+
+    def __init__(self, inner, subprotocol: str, zdict: bytes = b"", min_size: int = COMPRESS_MIN_BYTES,
+                 level: int = 6):
+        self.inner = inner
+        self.subprotocol = subprotocol
+        self.min_size = min_size
+        self.level = level
+        self._zdict = {"zdict": zdict} if zdict else {}
+
+    def encode(self, message: dict) -> bytes:
+        payload = self.inner.encode(message)
+        if isinstance(payload, str):
+            payload = payload.encode("utf-8")
+        if len(payload) < self.min_size:
+            return _RAW + payload
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED, -_WBITS, _MEM_LEVEL, **self._zdict)
+        data = compressor.compress(payload) + compressor.flush()
+        if len(data) >= len(payload):
+            return _RAW + payload
+        return _DEFLATED + data
+
+    def decode(self, frame: bytes) -> dict:
+        payload = frame[1:]
+        if frame[:1] == _DEFLATED:
+            decompressor = zlib.decompressobj(-15, **self._zdict)
+            payload = decompressor.decompress(payload, MAX_DECOMPRESSED_BYTES)
+            if decompressor.unconsumed_tail:
+                raise ValueError("decompressed frame too large")
+        return self.inner.decode(payload)
+
+
+JSON = JsonCodec()
+MSGPACK = MsgpackCodec() if msgpack is not None else None
+
+DEFLATE_SUBPROTOCOLS = {SUBPROTOCOL_MSGPACK_DEFLATE, SUBPROTOCOL_JSON_DEFLATE}
+
+# Subprotocols we can speak, in order of preference
+if MSGPACK:
+    SUBPROTOCOLS = [SUBPROTOCOL_MSGPACK_DEFLATE, SUBPROTOCOL_MSGPACK, SUBPROTOCOL_JSON_DEFLATE, SUBPROTOCOL_JSON]
+else:
+    SUBPROTOCOLS = [SUBPROTOCOL_JSON_DEFLATE, SUBPROTOCOL_JSON]
+UNCOMPRESSED_SUBPROTOCOLS = [p for p in SUBPROTOCOLS if p not in DEFLATE_SUBPROTOCOLS]
+
+
+def negotiate(offered: list[str], compression: bool = True, min_size: int = COMPRESS_MIN_BYTES,
+              permessage_deflate: bool = False):
+    """Pick the preferred codec among the subprotocols a client offered (server side).
+
+    `permessage_deflate`: the connection already compresses every message,
+    so the *.deflate subprotocols are skipped."""
+    for subprotocol in SUBPROTOCOLS if compression and not permessage_deflate else UNCOMPRESSED_SUBPROTOCOLS:
+        if subprotocol in offered:
+            return codec_for(subprotocol, min_size)
+    return JSON
+
+
+@lru_cache(maxsize=None)
+def codec_for(subprotocol: str | None, min_size: int = COMPRESS_MIN_BYTES):
+    """Codec for a negotiated subprotocol; JSON when none was agreed.
+
+    Codecs are stateless and cached, so callers can compare them by identity."""
+    if subprotocol == SUBPROTOCOL_MSGPACK and MSGPACK:
+        return MSGPACK
+    if subprotocol == SUBPROTOCOL_MSGPACK_DEFLATE and MSGPACK:
+        return DeflateCodec(MSGPACK, subprotocol, min_size=min_size)
+    if subprotocol == SUBPROTOCOL_JSON_DEFLATE:
+        return DeflateCodec(JSON, subprotocol, zdict=JSON_ZDICT, min_size=min_size)
+    return JSON
+
+
+def decode(frame: str | bytes, codec=None) -> dict:
+    """Decode a frame: text frames are always JSON, binary frames use the negotiated codec"""
+    if isinstance(frame, str):
+        return JSON.decode(frame)
+    if codec is not None and codec.binary:
+        return codec.decode(frame)
+    if MSGPACK is None:
+        raise ValueError("binary frame received but msgpack is not installed")
+    return MSGPACK.decode(frame)
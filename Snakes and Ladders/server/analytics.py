@@ -0,0 +1,219 @@
+# Daily summaries of online play, rolled up from the session event log (see eventlog.py).
+# The server runs an incremental pass every ANALYTICS_INTERVAL seconds; `python analytics.py`
+# runs one by hand against the same log and database.
+import os
+import sys
+import time
+from datetime import datetime, timezone
+
+import msgpack
+
+import eventlog
+import metrics
+
+# Board layout shared with the client lives in ../common
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "common"))
+from board import LADDERS, SNAKES  # noqa: E402
+
+# Analytics settings, overridable through the environment on the hosting platform
+ANALYTICS_INTERVAL = float(os.environ.get("ANALYTICS_INTERVAL", "300"))  # seconds between incremental passes
+MAX_EVENTS_PER_PASS = int(os.environ.get("ANALYTICS_MAX_EVENTS", "200000"))  # bounds one transaction
+STALE_SECONDS = 2 * 86400  # unfinished sessions this quiet are forgotten
+
+WATERMARK = "event_log"  # AnalyticsWatermark row of this job
+
+EVENTS_PROCESSED = metrics.Counter("analytics_events_total", "Event log entries folded into the daily summaries")
+PASS_SECONDS = metrics.Histogram("analytics_pass_seconds", "Time one incremental analytics pass took",
+                                 buckets=(0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60))
+PASS_ERRORS = metrics.Counter("analytics_pass_errors_total", "Analytics passes that failed (redone next time)")
+WATERMARK_RESETS = metrics.Counter("analytics_watermark_resets_total",
+                                   "Times the event log was replaced and the rollup started over from its first event")
+
+# Per-day counters the rollup adds up (DailyStats columns)
+COUNTERS = ("games", "total_duration", "first_player_wins", "rolls", "snake_hits", "ladder_hits")
+
+
+def day_of(ts: float) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).strftime("%Y-%m-%d")
+
+
+class Rollup:
+    """Folds events into per-day counter deltas.
+
+    A game is counted on the day it is won. Its duration runs from the first
+    roll to the winning one, and its first player is whoever rolled first.
+    The server doesn't move tokens along snakes and ladders, so a hit is a
+    roll that lands on a snake's head or a ladder's foot.
+
+    Sessions still being played are carried to the next pass in `sessions`
+    (saved with the watermark), so every pass only reads events it hasn't
+    seen yet."""
+
+    def __init__(self, sessions: dict | None = None):
+        # session_id -> {"started": ts of the first roll, "first": first roller, "bots": [...], "seen": ts, "done": bool}
+        self.sessions = sessions or {}
+        self.days: dict[str, dict] = {}  # day -> counter deltas
+        self.players: set[tuple[str, str]] = set()  # (day, username) of humans who joined or rolled
+
+    def apply(self, event: eventlog.Event):
+        kind, data = event.kind, event.data
+        if kind == "close":
+            self.sessions.pop(event.session_id, None)
+            return
+        if kind not in ("join", "roll"):
+            return
+        session = self.sessions.setdefault(event.session_id,
+                                           {"started": None, "first": None, "bots": [], "seen": 0, "done": False})
+        session["seen"] = event.ts
+        day, user = day_of(event.ts), data["user"]
+        if kind == "join":
+            if data.get("bot") is not None:
+                session["bots"].append(user)
+            else:
+                self.players.add((day, user))
+            return
+        if user not in session["bots"]:
+            self.players.add((day, user))
+        if session["done"]:
+            return  # rolls after the game was won don't change its result
+        counters = self.days.setdefault(day, dict.fromkeys(COUNTERS, 0))
+        counters["rolls"] += 1
+        landed = data["positions"].get(user)
+        if landed in SNAKES:
+            counters["snake_hits"] += 1
+        elif landed in LADDERS:
+            counters["ladder_hits"] += 1
+        if session["first"] is None:
+            session["first"], session["started"] = user, event.ts
+        if data.get("winner") is not None:
+            session["done"] = True
+            counters["games"] += 1
+            counters["total_duration"] += event.ts - session["started"]
+            if data["winner"] == session["first"]:
+                counters["first_player_wins"] += 1
+
+    def forget_stale(self, now: float):
+        for session_id in [s for s, session in self.sessions.items() if now - session["seen"] > STALE_SECONDS]:
+            del self.sessions[session_id]
+
+
+def saved_state(mark) -> tuple[str | None, dict | None]:
+    """(log epoch, carried-over sessions) saved with a watermark"""
+    state = msgpack.unpackb(mark.state) if mark.state else None
+    # Saved as [epoch, sessions]; watermarks from before epochs hold just the sessions
+    return tuple(state) if isinstance(state, list) else (None, state)
+
+
+def run_once(directory: str = eventlog.EVENT_LOG_DIR, limit: int = MAX_EVENTS_PER_PASS) -> int:
+    """Fold events after the watermark into the daily tables; returns how many were read.
+
+    The summaries, the new watermark and the carried-over sessions are
+    committed in one transaction, so a pass that fails is simply redone.
+    The watermark belongs to one log epoch: if the log was replaced, its
+    seqs start over, and the pass starts from the new log's first event."""
+    from database import AnalyticsWatermark, DailyPlayer, DailyStats, SessionLocal
+
+    start = time.perf_counter()
+    db = SessionLocal()
+    try:
+        mark = db.get(AnalyticsWatermark, WATERMARK)
+        if mark is None:
+            mark = AnalyticsWatermark(name=WATERMARK, seq=0, state=None)
+            db.add(mark)
+        log_epoch = eventlog.epoch(directory)
+        saved_epoch, sessions = saved_state(mark)
+        reset = saved_epoch is not None and saved_epoch != log_epoch
+        if reset:
+            # Events after the old seq in the new log would be read, and the ones before it skipped
+            mark.seq, sessions = 0, None
+        rollup = Rollup(sessions)
+        seq, count = mark.seq, 0
+        for event in eventlog.read(directory, after=mark.seq):
+            rollup.apply(event)
+            seq, count = event.seq, count + 1
+            if count >= limit:
+                break
+        if not count:
+            return 0
+        rollup.forget_stale(time.time())
+
+        rows = {}
+
+        def row_for(day: str):
+            # New rows aren't flushed (and so not found by db.get) until the commit
+            if day not in rows:
+                rows[day] = db.get(DailyStats, day)
+                if rows[day] is None:
+                    rows[day] = DailyStats(day=day, active_users=0, **dict.fromkeys(COUNTERS, 0))
+                    db.add(rows[day])
+            return rows[day]
+
+        for day, counters in rollup.days.items():
+            row = row_for(day)
+            for name, value in counters.items():
+                setattr(row, name, getattr(row, name) + value)
+        for day, username in rollup.players:
+            if db.get(DailyPlayer, (day, username)) is None:
+                db.add(DailyPlayer(day=day, username=username))
+                row_for(day).active_users += 1
+
+        mark.seq = seq
+        mark.state = msgpack.packb([log_epoch, rollup.sessions])
+        db.commit()
+    finally:
+        db.close()
+    if reset:
+        WATERMARK_RESETS.inc()
+    EVENTS_PROCESSED.inc(amount=count)
+    PASS_SECONDS.observe(time.perf_counter() - start)
+    return count
+
+
+def prune_log(directory: str = eventlog.EVENT_LOG_DIR, before: float | None = None) -> int:
+    """Delete event log segments already folded in and last written before `before`"""
+    from database import AnalyticsWatermark, SessionLocal
+
+    db = SessionLocal()
+    try:
+        mark = db.get(AnalyticsWatermark, WATERMARK)
+    finally:
+        db.close()
+    if mark is None or saved_state(mark)[0] != eventlog.epoch(directory):
+        return 0  # nothing folded in from this log yet
+    return eventlog.prune(directory, mark.seq, time.time() - eventlog.RETENTION_SECONDS if before is None else before)
+
+
+def summary(db, days: int) -> dict:
+    """The last `days` daily rows, newest first, with the derived rates"""
+    from database import AnalyticsWatermark, DailyStats
+
+    rows = db.query(DailyStats).order_by(DailyStats.day.desc()).limit(days).all()
+    mark = db.get(AnalyticsWatermark, WATERMARK)
+    return {
+        "watermark": mark.seq if mark else 0,
+        "days": [{
+            "day": row.day,
+            "games": row.games,
+            "active_users": row.active_users,
+            "average_duration": round(row.total_duration / row.games, 1) if row.games else None,
+            "first_player_win_rate": round(row.first_player_wins / row.games, 3) if row.games else None,
+            "rolls": row.rolls,
+            "snake_hits": row.snake_hits,
+            "ladder_hits": row.ladder_hits,
+        } for row in rows],
+    }
+
+
+def main():
+    from database import create_db
+
+    create_db()
+    directory = sys.argv[1] if len(sys.argv) > 1 else eventlog.EVENT_LOG_DIR
+    total = 0
+    while count := run_once(directory):
+        total += count
+    print(f"processed {total} events")
+
+
+if __name__ == "__main__":
+    main()
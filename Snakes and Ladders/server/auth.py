@@ -0,0 +1,40 @@
+import hashlib
+import hmac
+import os
+import secrets
+import time
+
+# Key for the tokens handed out by /login. Set it on the hosting platform so tokens
+# survive a restart; without it every process picks its own and clients log in again.
+AUTH_SECRET = os.environ.get("AUTH_SECRET", "").encode() or secrets.token_bytes(32)
+
+# Seconds a token stays valid, overridable through the environment on the hosting platform
+TOKEN_TTL = int(os.environ.get("AUTH_TOKEN_TTL", str(30 * 86400)))
+
+
+def _signature(user_id: int, username: str, issued_at: int) -> str:
+    return hmac.new(AUTH_SECRET, f"{user_id}.{issued_at}.{username}".encode(), hashlib.sha256).hexdigest()
+
+
+def session_token(user_id: int, username: str, issued_at: int | None = None) -> str:
+    """Token that proves a client logged in as `username` (used by the multiplexed WebSocket).
+
+    "<user id>.<issued at>.<signature>": it names the account, not just the
+    name, so the caller can check the name still belongs to that account."""
+    issued_at = int(time.time()) if issued_at is None else issued_at
+    return f"{user_id}.{issued_at}.{_signature(user_id, username, issued_at)}"
+
+
+def verify(username: str, token: str, now: float | None = None) -> int | None:
+    """Id of the account the token was issued to for `username`; None if it is forged, malformed or expired"""
+    try:
+        user_id, issued_at, signature = token.split(".")
+        user_id, issued_at = int(user_id), int(issued_at)
+    except ValueError:
+        return None
+    if not 0 <= (time.time() if now is None else now) - issued_at <= TOKEN_TTL:
+        return None
+    # As bytes: compare_digest rejects str with non-ASCII characters
+    if not hmac.compare_digest(_signature(user_id, username, issued_at).encode(), signature.encode()):
+        return None
+    return user_id
@@ -0,0 +1,98 @@
+import asyncio
+import uuid
+
+BOT_NAME = "Bot"
+BOT_AVATAR = "🤖"
+
+
+def new_bot_name() -> str:
+    return f"bot-{uuid.uuid4().hex[:6]}"
+
+
+class Bot:
+    """A server-hosted player: one sleeping coroutine, no connection"""
+    __slots__ = ("session_id", "username", "delay", "wakeup", "task")
+
+    def __init__(self, session_id: str, username: str, delay: float):
+        self.session_id = session_id
+        self.username = username
+        self.delay = delay
+        self.wakeup = asyncio.Event()
+        self.task: asyncio.Task | None = None
+
+
+class BotManager:
+    """Seats bots in sessions and rolls for them on their turn.
+
+    `games` is the server's session_id -> game state dict and `roll` the
+    coroutine that applies and broadcasts a roll (server.play_roll). Bots
+    sleep on an Event until notify() reports a state change for their
+    session, so an idle bot costs nothing but its memory. Seats are reported
+    through `record(session_id, kind, **data)` (server.event_log.append)."""
+
+    def __init__(self, games: dict, roll, record=None):
+        self.games = games
+        self.roll = roll
+        self.record = record or (lambda session_id, kind, **data: None)
+        self.sessions: dict[str, list[Bot]] = {}
+
+    def add(self, session_id: str, delay: float = 1.0, username: str | None = None) -> Bot:
+        """Seat a new bot in an existing session and start its task"""
+        game = self.games[session_id]
+        username = username or new_bot_name()
+        game["positions"][username] = 0
+        game["players"][username] = {"display_name": BOT_NAME, "display_avatar": BOT_AVATAR}
+        self.record(session_id, "join", user=username, bot=delay)
+        self.record(session_id, "player_info", user=username, name=BOT_NAME, avatar=BOT_AVATAR)
+        return self.resume(session_id, username, delay)
+
+    def resume(self, session_id: str, username: str, delay: float = 1.0) -> Bot:
+        """Start a bot for a seat that already exists (e.g. one restored from a snapshot)"""
+        bot = Bot(session_id, username, delay)
+        self.sessions.setdefault(session_id, []).append(bot)
+        bot.task = asyncio.create_task(self._run(bot))
+        bot.wakeup.set()
+        return bot
+
+    def notify(self, session_id: str):
+        """Wake the bots of a session after its state changed"""
+        for bot in self.sessions.get(session_id, ()):
+            bot.wakeup.set()
+
+    def remove_session(self, session_id: str):
+        for bot in self.sessions.pop(session_id, ()):
+            bot.task.cancel()
+
+    def count(self) -> int:
+        return sum(len(bots) for bots in self.sessions.values())
+
+    def _is_turn(self, game: dict, username: str) -> bool:
+        positions = game["positions"]
+        if len(positions) < 2:
+            return False
+        turn = game["turn"]
+        # Before the first roll the first seated player starts
+        return turn == username or (turn is None and next(iter(positions)) == username)
+
+    async def _run(self, bot: Bot):
+        try:
+            while True:
+                await bot.wakeup.wait()
+                bot.wakeup.clear()
+                game = self.games.get(bot.session_id)
+                if game is None or game.get("winner"):
+                    return
+                if not self._is_turn(game, bot.username):
+                    continue
+                if bot.delay:
+                    await asyncio.sleep(bot.delay)
+                    # The session may have ended while we were "thinking"
+                    if self.games.get(bot.session_id) is not game:
+                        return
+                await self.roll(bot.session_id, bot.username)
+        finally:
+            bots = self.sessions.get(bot.session_id)
+            if bots and bot in bots:
+                bots.remove(bot)
+                if not bots:
+                    del self.sessions[bot.session_id]
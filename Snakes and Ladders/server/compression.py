@@ -0,0 +1,70 @@
+import os
+
+from websockets.extensions.permessage_deflate import PerMessageDeflate, ServerPerMessageDeflateFactory
+from websockets.frames import CONT
+
+try:
+    # Private to uvicorn (pinned in requirements.txt), so it may move in another release
+    from uvicorn.protocols.websockets.websockets_sansio_impl import WebSocketsSansIOProtocol
+except ImportError:
+    WebSocketsSansIOProtocol = None
+
+# Compression settings, overridable through the environment on the hosting platform
+WS_COMPRESSION = os.environ.get("WS_COMPRESSION", "1") != "0"  # permessage-deflate and *.deflate subprotocols
+WS_COMPRESS_MIN_BYTES = int(os.environ.get("WS_COMPRESS_MIN_BYTES", "128"))  # smaller frames go out raw
+GZIP_MIN_BYTES = int(os.environ.get("GZIP_MIN_BYTES", "1024"))  # REST responses below this aren't gzipped
+
+
+class ThresholdPerMessageDeflate(PerMessageDeflate):
+    """permessage-deflate that sends small messages uncompressed.
+
+    RFC 7692 lets the sender leave RSV1 unset on any message; uncompressed
+    messages never touch the compressor, so context takeover stays intact."""
+
+    def __init__(self, *args, min_size: int = WS_COMPRESS_MIN_BYTES, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.min_size = min_size
+
+    def encode(self, frame):
+        if frame.fin and frame.opcode is not CONT and len(frame.data) < self.min_size:
+            return frame
+        return super().encode(frame)
+
+
+class ThresholdDeflateFactory(ServerPerMessageDeflateFactory):
+    def __init__(self, *args, min_size: int = WS_COMPRESS_MIN_BYTES, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.min_size = min_size
+
+    def process_request_params(self, params, accepted_extensions):
+        response_params, extension = super().process_request_params(params, accepted_extensions)
+        return response_params, ThresholdPerMessageDeflate(
+            extension.remote_no_context_takeover,
+            extension.local_no_context_takeover,
+            extension.remote_max_window_bits,
+            extension.local_max_window_bits,
+            extension.compress_settings,
+            min_size=self.min_size,
+        )
+
+
+if WebSocketsSansIOProtocol is not None:
+    class CompressedWebSocketProtocol(WebSocketsSansIOProtocol):
+        """uvicorn WebSocket protocol using ThresholdDeflateFactory.
+
+        Select it with `uvicorn server:app --ws compression:CompressedWebSocketProtocol`."""
+
+        def __init__(self, config, *args, **kwargs):
+            super().__init__(config, *args, **kwargs)
+            if WS_COMPRESSION and config.ws_per_message_deflate:
+                # Same window settings uvicorn uses, plus the size threshold
+                self.conn.available_extensions = [ThresholdDeflateFactory(
+                    server_max_window_bits=12,
+                    client_max_window_bits=12,
+                    compress_settings={"memLevel": 5},
+                )]
+            else:
+                self.conn.available_extensions = []
+else:
+    # uvicorn's stock protocol: permessage-deflate still works, without the size threshold
+    from uvicorn.protocols.websockets.auto import AutoWebSocketsProtocol as CompressedWebSocketProtocol  # noqa: F401
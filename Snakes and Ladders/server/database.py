@@ -1,5 +1,5 @@
 # Import SQLAlchemy core components for defining tables and connecting to the DB
-from sqlalchemy import Column, Integer, String, create_engine
+from sqlalchemy import Column, Float, Integer, LargeBinary, String, create_engine
 # Import ORM helpers: base class generator and session factory
 from sqlalchemy.orm import declarative_base, sessionmaker
 
@@ -49,8 +49,107 @@ class User(Base):
     fastest_win_seconds = Column(Integer, default=9999)
 
 
+# Define the Tournament model → one row per bracket
+class Tournament(Base):
+    __tablename__ = "tournaments"
+
+    # Tournament id (uuid string, also used in the API)
+    id = Column(String, primary_key=True)
+
+    # Bracket size: number of entrants rounded up to a power of two
+    size = Column(Integer, nullable=False)
+
+    # Comma separated usernames of the entrants played by server bots
+    bots = Column(String, default="")
+
+    # Seconds a bot waits before each roll
+    bot_delay = Column(Float, default=1.0)
+
+    # "running" or "finished" → running tournaments are resumed after a restart
+    status = Column(String, default="running", index=True)
+
+    # Username of the champion once the final is played
+    winner = Column(String, nullable=True)
+
+
+# Define the TournamentMatch model → one row per bracket slot
+class TournamentMatch(Base):
+    __tablename__ = "tournament_matches"
+
+    # (tournament, round, slot) identifies a match; round 0 is the first round
+    tournament_id = Column(String, primary_key=True)
+    round = Column(Integer, primary_key=True)
+    slot = Column(Integer, primary_key=True)
+
+    # The two players; player_b is empty for a first-round bye
+    player_a = Column(String, nullable=True)
+    player_b = Column(String, nullable=True)
+
+    # Username of the player who advanced
+    winner = Column(String, nullable=True)
+
+
+# Define the UserSketch model → one row per (user, metric), see sketch.py
+class UserSketch(Base):
+    __tablename__ = "user_sketches"
+
+    # Keyed by users.id so a renamed user keeps their history
+    user_id = Column(Integer, primary_key=True)
+
+    # "duration" (seconds, every finished game) or "win_moves" (moves to win)
+    metric = Column(String, primary_key=True)
+
+    # QuantileSketch.to_bytes(): a few hundred bytes however many games were played
+    data = Column(LargeBinary, nullable=False)
+
+
+# Define the DailyStats model → one row per UTC day, rolled up from the event log (see analytics.py)
+class DailyStats(Base):
+    __tablename__ = "daily_stats"
+
+    # "YYYY-MM-DD"
+    day = Column(String, primary_key=True)
+
+    # Online games won that day, and their summed length in seconds (first roll to winning roll)
+    games = Column(Integer, default=0)
+    total_duration = Column(Float, default=0.0)
+
+    # Games won by the player who rolled first
+    first_player_wins = Column(Integer, default=0)
+
+    # Rolls, and those that landed on a snake's head or a ladder's foot
+    rolls = Column(Integer, default=0)
+    snake_hits = Column(Integer, default=0)
+    ladder_hits = Column(Integer, default=0)
+
+    # Distinct human players that joined or rolled (rows in daily_players)
+    active_users = Column(Integer, default=0)
+
+
+# Define the DailyPlayer model → who was active on which day, so active_users counts each player once
+class DailyPlayer(Base):
+    __tablename__ = "daily_players"
+
+    day = Column(String, primary_key=True)
+    username = Column(String, primary_key=True)
+
+
+# Define the AnalyticsWatermark model → how far an incremental job has read the event log
+class AnalyticsWatermark(Base):
+    __tablename__ = "analytics_watermarks"
+
+    # Job name
+    name = Column(String, primary_key=True)
+
+    # Sequence number of the last event folded in
+    seq = Column(Integer, default=0)
+
+    # MessagePack of the sessions still being played at that point
+    state = Column(LargeBinary, nullable=True)
+
+
 # Function to create the database and tables (if they don’t exist yet)
 def create_db():
-    # Create all tables defined on Base (currently just "users")
+    # Create all tables defined on Base (users, sketches, analytics and tournaments)
     # Does nothing if tables already exist
     Base.metadata.create_all(bind=engine)
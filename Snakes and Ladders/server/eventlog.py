@@ -0,0 +1,357 @@
+# Append-only log of everything that happens to a session (see EventLog).
+# `python eventlog.py [directory] [--after SEQ] [--follow]` prints it as JSON lines,
+# so analytics jobs can read it from disk without touching the live server.
+import argparse
+import asyncio
+import json
+import os
+import struct
+import sys
+import time
+import uuid
+import zlib
+from typing import Iterator, NamedTuple
+
+import msgpack
+
+import metrics
+
+# Event log settings, overridable through the environment on the hosting platform
+EVENT_LOG_DIR = os.environ.get("EVENT_LOG_DIR", "events")
+SEGMENT_BYTES = int(os.environ.get("EVENT_LOG_SEGMENT_BYTES", str(16 << 20)))  # start a new segment after this
+COMMIT_DELAY = float(os.environ.get("EVENT_LOG_COMMIT_DELAY", "0"))  # extra wait to grow batches, in seconds
+MAX_PENDING = int(os.environ.get("EVENT_LOG_MAX_PENDING", "100000"))  # events held while the disk is failing
+SHUTDOWN_RETRIES = int(os.environ.get("EVENT_LOG_SHUTDOWN_RETRIES", "3"))  # failed commits after stop() before giving up
+RETENTION_SECONDS = float(os.environ.get("EVENT_LOG_RETENTION_SECONDS", str(7 * 86400)))  # keep read segments this long
+
+MAX_FRAME_BYTES = 1 << 20  # a longer length field can only be corruption
+HEADER = struct.Struct("<IIQ")  # payload length, CRC-32 of sequence number + payload, sequence number
+SEQ = struct.Struct("<Q")
+SHUTDOWN = "shutdown"  # kind of the marker a clean stop appends (session_id "")
+EPOCH_FILE = "EPOCH"  # random id of the log, see epoch()
+
+EVENTS_APPENDED = metrics.Counter("event_log_events_total", "Events appended to the session event log")
+EVENTS_DROPPED = metrics.Counter("event_log_dropped_total", "Events dropped because too many were pending")
+COMMIT_SECONDS = metrics.Histogram("event_log_commit_seconds", "Time to write and fsync one batch of events")
+COMMIT_EVENTS = metrics.Histogram("event_log_commit_events", "Events per group commit",
+                                  buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 5000))
+COMMIT_ERRORS = metrics.Counter("event_log_commit_errors_total", "Failed event log writes (retried)")
+SEGMENTS_PRUNED = metrics.Counter("event_log_segments_pruned_total", "Old event log segments deleted")
+
+
+class Event(NamedTuple):
+    seq: int
+    ts: float
+    session_id: str
+    kind: str
+    data: dict
+
+
+def segment_paths(directory: str) -> list[str]:
+    try:
+        names = sorted(name for name in os.listdir(directory) if name.endswith(".log"))
+    except FileNotFoundError:
+        return []
+    return [os.path.join(directory, name) for name in names]
+
+
+def epoch(directory: str) -> str | None:
+    """Id written when the log directory is first used; None before the writer has opened it.
+
+    Sequence numbers only mean something within one epoch: if the directory is
+    lost, the next writer starts over at 1 under a new id, so a reader that
+    saved a watermark can tell its seq belongs to a log that no longer exists."""
+    try:
+        with open(os.path.join(directory, EPOCH_FILE)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def _first_seq(path: str) -> int:
+    return int(os.path.basename(path)[:-len(".log")])
+
+
+def _frames(f, offset: int = 0) -> Iterator[tuple[int, Event]]:
+    """(end offset, event) for each complete, intact frame from `offset` on"""
+    f.seek(offset)
+    while True:
+        header = f.read(HEADER.size)
+        if len(header) < HEADER.size:
+            return
+        length, crc, seq = HEADER.unpack(header)
+        if length > MAX_FRAME_BYTES:
+            return
+        payload = f.read(length)
+        if len(payload) < length or zlib.crc32(payload, zlib.crc32(SEQ.pack(seq))) != crc:
+            return  # torn or corrupt: nothing valid follows in this segment
+        offset += HEADER.size + length
+        ts, session_id, kind, data = msgpack.unpackb(payload)
+        yield offset, Event(seq, ts, session_id, kind, data)
+
+
+def read(directory: str = EVENT_LOG_DIR, after: int = 0, follow: bool = False,
+         poll: float = 1.0) -> Iterator[Event]:
+    """Events with a sequence number above `after`, oldest first.
+
+    With `follow`, keeps waiting for new events (like `tail -f`); a reader can
+    save the last seq it processed as its watermark and resume from it."""
+    path, offset = None, 0
+    while True:
+        paths = segment_paths(directory)
+        if path is None:
+            # Start in the last segment that begins at or before the first wanted event
+            start = [p for p in paths if _first_seq(p) <= after + 1]
+            path = start[-1] if start else (paths[0] if paths else None)
+        if path is not None:
+            with open(path, "rb") as f:
+                for offset, event in _frames(f, offset):
+                    if event.seq > after:
+                        after = event.seq
+                        yield event
+            later = [p for p in paths if p > path]
+            if later:
+                path, offset = later[0], 0
+                continue
+        if not follow:
+            return
+        time.sleep(poll)
+
+
+def prune(directory: str, upto: int, before: float) -> int:
+    """Delete the oldest segments whose events all have seq <= `upto` and that
+    weren't written to since `before`; returns how many were deleted.
+
+    The newest segment is always kept: the writer numbers events on from its last one."""
+    paths = segment_paths(directory)
+    removed = 0
+    for path, following in zip(paths, paths[1:]):
+        if _first_seq(following) - 1 > upto or os.path.getmtime(path) >= before:
+            break  # only from the front, so the log never has a gap
+        os.remove(path)
+        removed += 1
+    SEGMENTS_PRUNED.inc(amount=removed)
+    return removed
+
+
+def apply(games: dict, event: Event):
+    """Fold one event into a `games` dict shaped like the server's"""
+    kind, data = event.kind, event.data
+    if kind == "close":
+        games.pop(event.session_id, None)
+        return
+    if kind not in ("join", "player_info", "roll", "leave"):
+        return
+    game = games.setdefault(event.session_id, {"positions": {}, "turn": None, "players": {}, "winner": None})
+    if kind == "join":
+        game["positions"].setdefault(data["user"], 0)
+    elif kind == "player_info":
+        game["players"][data["user"]] = {"display_name": data["name"], "display_avatar": data["avatar"]}
+    elif kind == "roll":
+        game["positions"] = dict(data["positions"])
+        game["turn"] = data["turn"]
+        if data.get("winner") is not None:
+            game["winner"] = data["winner"]
+    else:
+        game["positions"].pop(data["user"], None)
+        game["players"].pop(data["user"], None)
+
+
+def replay(directory: str = EVENT_LOG_DIR, since: float = 0.0) -> dict:
+    """Unfinished sessions active since `since`, in the snapshot format (with their bots).
+
+    Only segments written to since then are read, and roll events carry every
+    position, so a session active in that window comes back where it was.
+    Returns {} when the log ends with a clean shutdown (the snapshot covers it)."""
+    games, bots, last_seen, matches = {}, {}, {}, set()
+    last = None
+    for path in segment_paths(directory):
+        if os.path.getmtime(path) < since:
+            continue
+        with open(path, "rb") as f:
+            for _, event in _frames(f):
+                last = event
+                apply(games, event)
+                last_seen[event.session_id] = event.ts
+                if event.kind == "join" and event.data.get("bot") is not None:
+                    bots.setdefault(event.session_id, {})[event.data["user"]] = event.data["bot"]
+                elif event.kind == "leave":
+                    bots.get(event.session_id, {}).pop(event.data["user"], None)
+                elif event.kind == "match":
+                    # Tournament matches are rebuilt from the database instead
+                    matches.add(event.session_id)
+    if last is None or last.kind == SHUTDOWN:
+        return {}
+    sessions = {}
+    for session_id, game in games.items():
+        if (session_id in matches or game["winner"] is not None or not game["positions"]
+                or last_seen[session_id] < since):
+            continue
+        seated_bots = [[username, delay] for username, delay in bots.get(session_id, {}).items()
+                       if username in game["positions"]]
+        sessions[session_id] = {**game, "bots": seated_bots}
+    return sessions
+
+
+class EventLog:
+    """Durable, append-only record of every session's state changes.
+
+    The server appends an event for each change it makes to `games` (join,
+    player_info, roll, leave, close), so `games` is a projection of the log:
+    apply() folds events into the same structure and replay() rebuilds the
+    sessions of a crashed process.
+
+    On disk the log is a directory of segments named after the sequence number
+    of their first event; each record is a frame of length, CRC-32 and sequence
+    number, then the MessagePack-encoded [timestamp, session_id, kind, data].
+    Every process starts a new segment, so a torn frame left by a crash can only
+    be at the end of one, and readers skip to the next.
+
+    Appends are group-committed: append() encodes and queues the event, and the
+    writer task writes and fsyncs whatever queued up while the previous batch
+    was syncing, so under load many events share one fsync. A failed commit is
+    retried every second; once stop() was called it is retried SHUTDOWN_RETRIES
+    times and then dropped, so a broken disk can't hold up the shutdown."""
+
+    def __init__(self, directory: str = EVENT_LOG_DIR, segment_bytes: int = SEGMENT_BYTES):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.seq = None  # last sequence number written, known once the writer has opened the log
+        self._pending: list[bytes] = []
+        self._appended = 0  # events queued since start (dropped ones included)
+        self._durable = 0  # of those, events written and synced (or dropped)
+        self._dirty = asyncio.Event()
+        self._committed = asyncio.Event()
+        self._stopping = False
+        self._stop_failures = 0  # failed commits since stop()
+        self._file = None
+
+    def append(self, session_id: str, kind: str, **data):
+        """Queue an event; it is durable after the next commit (see sync())"""
+        if len(self._pending) >= MAX_PENDING:
+            self._drop(1)
+        self._pending.append(msgpack.packb([time.time(), session_id, kind, data]))
+        self._appended += 1
+        EVENTS_APPENDED.inc()
+        self._dirty.set()
+
+    def pending(self) -> int:
+        return len(self._pending)
+
+    async def sync(self):
+        """Wait until everything appended so far is on disk"""
+        target = self._appended
+        while self._durable < target:
+            self._committed.clear()
+            await self._committed.wait()
+
+    def _drop(self, count: int):
+        # Oldest first; they count as settled so sync() doesn't wait for them forever
+        del self._pending[:count]
+        self._durable += count
+        EVENTS_DROPPED.inc(amount=count)
+
+    async def run_writer(self):
+        """Background task: commit queued events until stop(), then close the segment"""
+        try:
+            while not self._stopping or self._pending:
+                await self._dirty.wait()
+                if COMMIT_DELAY:
+                    await asyncio.sleep(COMMIT_DELAY)
+                await self.commit()
+        finally:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def stop(self):
+        """Append the clean-shutdown marker and let the writer finish"""
+        self.append("", SHUTDOWN)
+        self._stopping = True
+
+    async def commit(self):
+        self._dirty.clear()
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        try:
+            await asyncio.to_thread(self._write, batch)
+        except Exception:
+            COMMIT_ERRORS.inc()
+            # Keep the batch ahead of anything queued meanwhile and retry after a pause
+            self._pending[:0] = batch
+            if len(self._pending) > MAX_PENDING:
+                self._drop(len(self._pending) - MAX_PENDING)
+            if self._stopping:
+                self._stop_failures += 1
+                if self._stop_failures > SHUTDOWN_RETRIES:
+                    # The snapshot still has to be written: give up on what's left
+                    self._drop(len(self._pending))
+                    self._committed.set()
+                    return
+            await asyncio.sleep(1.0)
+            self._dirty.set()
+            return
+        self._durable += len(batch)
+        self._committed.set()
+
+    def _open(self):
+        os.makedirs(self.directory, exist_ok=True)
+        if epoch(self.directory) is None:
+            path = os.path.join(self.directory, EPOCH_FILE)
+            with open(f"{path}.tmp", "w") as f:
+                f.write(uuid.uuid4().hex)
+            os.replace(f"{path}.tmp", path)
+        if self.seq is None:
+            self.seq = 0
+            paths = segment_paths(self.directory)
+            if paths:
+                self.seq = _first_seq(paths[-1]) - 1
+                with open(paths[-1], "rb") as f:
+                    for _, event in _frames(f):
+                        self.seq = event.seq
+        self._file = open(os.path.join(self.directory, f"{self.seq + 1:016d}.log"), "ab")
+
+    def _write(self, batch: list[bytes]):
+        start = time.perf_counter()
+        if self._file is None:
+            self._open()
+        seq = self.seq
+        frames = []
+        for payload in batch:
+            seq += 1
+            frames.append(HEADER.pack(len(payload), zlib.crc32(payload, zlib.crc32(SEQ.pack(seq))), seq))
+            frames.append(payload)
+        offset = self._file.tell()
+        try:
+            self._file.write(b"".join(frames))
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        except OSError:
+            # Don't leave half a batch behind: it would hide the retry from readers
+            self._file.truncate(offset)
+            raise
+        self.seq = seq
+        if self._file.tell() >= self.segment_bytes:
+            self._file.close()
+            self._file = None  # the next batch starts a new segment
+        COMMIT_SECONDS.observe(time.perf_counter() - start)
+        COMMIT_EVENTS.observe(len(batch))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Print the session event log as JSON lines")
+    parser.add_argument("directory", nargs="?", default=EVENT_LOG_DIR)
+    parser.add_argument("--after", type=int, default=0, help="only events with a higher sequence number")
+    parser.add_argument("--follow", action="store_true", help="keep printing new events as they are written")
+    args = parser.parse_args()
+    try:
+        for event in read(args.directory, args.after, args.follow):
+            sys.stdout.write(json.dumps(event._asdict(), ensure_ascii=False) + "\n")
+            sys.stdout.flush()
+    except (KeyboardInterrupt, BrokenPipeError):
+        pass
+
+
+if __name__ == "__main__":
+    main()
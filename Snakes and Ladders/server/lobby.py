@@ -0,0 +1,141 @@
+import asyncio
+import json
+import os
+from contextlib import aclosing
+from itertools import islice
+
+# Lobby stream settings, overridable through the environment on the hosting platform
+LOBBY_COALESCE_SECONDS = float(os.environ.get("LOBBY_COALESCE_SECONDS", "0.25"))  # changes within this window share one event
+LOBBY_HEARTBEAT_SECONDS = 15.0  # keeps proxies from closing an idle stream
+SUBSCRIBER_BACKLOG = 8  # events a slow subscriber may fall behind before it is resynced
+
+
+def sse(event: str, data: dict, event_id: int | None = None) -> str:
+    """Format one server-sent event"""
+    head = f"event: {event}\n" + (f"id: {event_id}\n" if event_id is not None else "")
+    return f"{head}data: {json.dumps(data, separators=(',', ':'), ensure_ascii=False)}\n\n"
+
+
+class LobbyEvent:
+    """One published change, encoded at most once per format however many subscribers get it"""
+    __slots__ = ("name", "data", "version", "_sse", "_frames")
+
+    def __init__(self, name: str, data: dict, version: int):
+        self.name = name
+        self.data = data
+        self.version = version
+        self._sse = None
+        self._frames = {}
+
+    def sse(self) -> str:
+        if self._sse is None:
+            self._sse = sse(self.name, self.data, self.version)
+        return self._sse
+
+    def frame(self, codec) -> str | bytes:
+        """WebSocket frame for a wire codec: {"type": "lobby_<name>", "version": ..., **data}"""
+        frame = self._frames.get(codec)
+        if frame is None:
+            frame = self._frames[codec] = codec.encode({"type": f"lobby_{self.name}", "version": self.version,
+                                                         **self.data})
+        return frame
+
+
+class Lobby:
+    """Index of sessions waiting for players, plus a coalesced change stream.
+
+    The server calls put()/remove() whenever a session's seats change, so
+    listing the lobby never scans `games`. Changes are collected per session
+    (the latest one wins) and published by run_publisher() at most once per
+    LOBBY_COALESCE_SECONDS, encoded once and shared by every subscriber."""
+
+    def __init__(self):
+        self.sessions: dict[str, dict] = {}  # session_id -> entry, oldest first
+        self.version = 0
+        self._changes: dict[str, dict | None] = {}  # session_id -> entry, None when removed
+        self._dirty = asyncio.Event()
+        self._subscribers: set[asyncio.Queue] = set()
+        self._closed = False
+
+    def put(self, session_id: str, entry: dict):
+        if self.sessions.get(session_id) == entry:
+            return
+        self.sessions[session_id] = entry
+        self._changed(session_id, entry)
+
+    def remove(self, session_id: str):
+        if self.sessions.pop(session_id, None) is not None:
+            self._changed(session_id, None)
+
+    def _changed(self, session_id: str, entry: dict | None):
+        self.version += 1
+        # Without subscribers there is nobody to tell; a new one starts from a snapshot
+        if self._subscribers:
+            self._changes[session_id] = entry
+            self._dirty.set()
+
+    def listing(self, limit: int | None = None) -> list[dict]:
+        """Waiting sessions, the ones waiting longest first"""
+        return list(islice(self.sessions.values(), limit))
+
+    def snapshot_event(self) -> LobbyEvent:
+        return LobbyEvent("snapshot", {"sessions": self.listing()}, self.version)
+
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    async def run_publisher(self):
+        """Background task: turn each burst of changes into one update event"""
+        while True:
+            await self._dirty.wait()
+            await asyncio.sleep(LOBBY_COALESCE_SECONDS)
+            self._dirty.clear()
+            changes, self._changes = self._changes, {}
+            event = LobbyEvent("update", {
+                "upsert": [entry for entry in changes.values() if entry is not None],
+                "remove": [session_id for session_id, entry in changes.items() if entry is None],
+            }, self.version)
+            for queue in self._subscribers:
+                if queue.full():
+                    # Too far behind to catch up with deltas: replace its backlog with the current listing
+                    while not queue.empty():
+                        queue.get_nowait()
+                    queue.put_nowait(self.snapshot_event())
+                else:
+                    queue.put_nowait(event)
+
+    def close(self):
+        """End every stream: the server waits for open responses before it can shut down"""
+        self._closed = True
+        for queue in self._subscribers:
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait(None)
+
+    async def events(self, heartbeat: float | None = None):
+        """Async generator of LobbyEvents: a snapshot first, then coalesced updates.
+
+        With a heartbeat, None is yielded after that many idle seconds."""
+        if self._closed:
+            return
+        queue = asyncio.Queue(SUBSCRIBER_BACKLOG)
+        self._subscribers.add(queue)
+        try:
+            yield self.snapshot_event()
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), heartbeat)
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                if event is None:
+                    return
+                yield event
+        finally:
+            self._subscribers.discard(queue)
+
+    async def subscribe(self):
+        """Async generator of SSE text, with a comment line as heartbeat"""
+        async with aclosing(self.events(LOBBY_HEARTBEAT_SECONDS)) as events:
+            async for event in events:
+                yield ": ping\n\n" if event is None else event.sse()
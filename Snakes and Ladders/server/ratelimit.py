@@ -0,0 +1,100 @@
+import os
+from time import monotonic
+
+# Rate limits, overridable through the environment on the hosting platform
+WS_RATE = float(os.environ.get("WS_RATE", "5"))  # actions per second per connection
+WS_BURST = float(os.environ.get("WS_BURST", "10"))
+WS_IP_RATE = float(os.environ.get("WS_IP_RATE", "20"))  # actions per second across all connections of an IP
+WS_IP_BURST = float(os.environ.get("WS_IP_BURST", "40"))
+AUTH_RATE = float(os.environ.get("AUTH_RATE", "0.2"))  # /register and /login attempts per second per IP
+AUTH_BURST = float(os.environ.get("AUTH_BURST", "5"))
+
+
+class TokenBucket:
+    """Classic token bucket: `rate` tokens per second, at most `capacity` stored"""
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = monotonic()
+
+    def allow(self, now: float | None = None) -> bool:
+        """Take one token if available"""
+        if now is None:
+            now = monotonic()
+        tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if tokens < 1:
+            self.tokens = tokens
+            return False
+        self.tokens = tokens - 1
+        return True
+
+    def is_full(self, now: float) -> bool:
+        return self.tokens + (now - self.updated) * self.rate >= self.capacity
+
+
+class SharedBuckets:
+    """Buckets shared by every connection from the same key (client IP).
+
+    An entry lives exactly as long as a connection holds it: acquire() on
+    connect, release() on disconnect, so state stays O(1) per connection."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._entries: dict[str, list] = {}  # key -> [bucket, holders]
+
+    def acquire(self, key: str) -> TokenBucket:
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._entries[key] = [TokenBucket(self.rate, self.capacity), 0]
+        entry[1] += 1
+        return entry[0]
+
+    def release(self, key: str):
+        entry = self._entries.get(key)
+        if entry is not None:
+            entry[1] -= 1
+            if entry[1] <= 0:
+                del self._entries[key]
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class KeyedLimiter:
+    """Per-key buckets for stateless requests (REST).
+
+    A bucket that has refilled completely is indistinguishable from a new
+    one, so full buckets are dropped whenever the table grows past
+    `prune_at`; memory is bounded by the number of recently active keys."""
+
+    def __init__(self, rate: float, capacity: float, prune_at: int = 10000):
+        self.rate = rate
+        self.capacity = capacity
+        self.prune_at = prune_at
+        self._next_prune = prune_at
+        self._buckets: dict[str, TokenBucket] = {}
+
+    def allow(self, key: str) -> bool:
+        now = monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= self._next_prune:
+                self.prune(now)
+            bucket = self._buckets[key] = TokenBucket(self.rate, self.capacity)
+        return bucket.allow(now)
+
+    def prune(self, now: float | None = None):
+        if now is None:
+            now = monotonic()
+        for key in [key for key, bucket in self._buckets.items() if bucket.is_full(now)]:
+            del self._buckets[key]
+        # If most keys are still active, wait for the table to double before scanning again
+        self._next_prune = max(self.prune_at, 2 * len(self._buckets))
+
+    def __len__(self):
+        return len(self._buckets)
@@ -1,17 +1,148 @@
+import asyncio
+import logging
+import os
+import signal
+import sys
 import uuid
-import uvicorn
 import random
+import time
+from contextlib import aclosing, asynccontextmanager, contextmanager
+from time import perf_counter
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Request
 from fastapi.middleware.cors import CORSMiddleware
-from database import SessionLocal, create_db, User  # Your DB setup
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from compression import GZIP_MIN_BYTES, WS_COMPRESSION, WS_COMPRESS_MIN_BYTES
+import analytics
+import auth
+import bots
+import eventlog
+import lobby
+import metrics
+import ratelimit
+import sketch
+import snapshot
+import tournament
 
-app = FastAPI(title="Snake & Ladder Server")
+# Wire encodings shared with the client live in ../common
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "common"))
+import protocol  # noqa: E402
+import wire  # noqa: E402
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    install_drain_handler()
+    restored = restore_sessions()
+    # After a crash there is no snapshot: recent sessions are rebuilt from the event log instead
+    event_writer = asyncio.create_task(start_event_log(replay=not restored))
+    expiry = asyncio.create_task(expire_restored())
+    lag_monitor = asyncio.create_task(metrics.monitor_event_loop_lag())
+    # The DB comes up in the background: sessions and WebSockets don't wait for it
+    init = asyncio.create_task(initialize())
+    tournament_writer = asyncio.create_task(tournament_engine.run_writer())
+    lobby_publisher = asyncio.create_task(waiting_room.run_publisher())
+    analytics_job = asyncio.create_task(run_analytics())
+    yield
+    analytics_job.cancel()
+    lag_monitor.cancel()
+    init.cancel()
+    tournament_writer.cancel()
+    lobby_publisher.cancel()
+    expiry.cancel()
+    await tournament_engine.flush()
+    event_log.stop()
+    await event_writer
+    # Connections were closed with 1012 before this runs, and their seats kept
+    snapshot.save(snapshot_sessions())
+
+
+app = FastAPI(title="Snake & Ladder Server", lifespan=lifespan)
 
 # Track connected clients per session
 clients: dict[str, list[WebSocket]] = {}
 
 # Track game states per session - now includes player info
-games: dict[str, dict] = {}  # session_id -> {"positions": {}, "turn": str | None, "players": {}}
+games: dict[str, dict] = {}  # session_id -> {"positions": {}, "turn": str | None, "players": {}, "winner": str | None}
+
+# Seats a session can hold, humans and bots together
+MAX_SEATS = 2
+
+# Close code uvicorn sends to open WebSockets when the server shuts down
+SERVICE_RESTART = 1012
+
+# Close code recorded for a connection that ended without a close frame (an error on our side)
+ABNORMAL_CLOSURE = 1006
+
+# Close code for a multiplexed connection with a bad token (uvicorn turns it into HTTP 403)
+UNAUTHORIZED = 4401
+
+# Proxies in front of the server that append to X-Forwarded-For (1 on the hosting platform, see the Procfile);
+# with 0 the header is ignored, as anyone can send it
+TRUSTED_PROXY_HOPS = int(os.environ.get("TRUSTED_PROXY_HOPS", "0"))
+
+# Sessions one multiplexed connection may play or watch at once
+MUX_MAX_SESSIONS = int(os.environ.get("MUX_MAX_SESSIONS", "16"))
+
+# Multiplexed connections: their game messages are tagged with the session they belong to
+mux_sockets: set[WebSocket] = set()
+
+# Connections watching a session without a seat (multiplexed only)
+spectators: dict[str, set[WebSocket]] = {}
+
+# Set on SIGTERM: no new sessions are handed out while the process drains
+draining = False
+
+# Players of sessions restored from a snapshot who haven't reconnected yet
+restored_seats: dict[str, set[str]] = {}
+
+# Wire codec negotiated by each connection (JSON unless the client offered MessagePack)
+codecs: dict[WebSocket, object] = {}
+
+# Metrics exposed on /metrics
+ACTIVE_SESSIONS = metrics.Gauge("active_sessions", "Sessions with at least one connected client",
+                                function=lambda: len(games))
+ACTIVE_CONNECTIONS = metrics.Gauge("active_connections", "Open game WebSocket connections")
+MUX_CONNECTIONS = metrics.Gauge("mux_connections", "Open multiplexed WebSocket connections",
+                                function=lambda: len(mux_sockets))
+SPECTATORS = metrics.Gauge("spectators", "Connections watching a session without a seat",
+                           function=lambda: sum(len(watching) for watching in spectators.values()))
+MESSAGES_IN = metrics.Counter("ws_messages_in_total", "WebSocket messages received per action", ("action",))
+MESSAGES_OUT = metrics.Counter("ws_messages_out_total", "WebSocket messages sent per type", ("type",))
+BROADCAST_SECONDS = metrics.Histogram("broadcast_seconds", "Time to fan a message out to a session", ("type",))
+DB_SECONDS = metrics.Histogram("db_session_seconds", "Time a DB session was held per endpoint", ("endpoint",))
+
+RATE_LIMITED = metrics.Counter("rate_limited_total", "Messages and requests dropped by rate limiting", ("scope",))
+INVALID_MESSAGES = metrics.Counter("ws_messages_invalid_total", "WebSocket messages dropped for not matching the protocol")
+
+# Client-supplied actions we label by name; anything else is counted as "other"
+KNOWN_ACTIONS = set(protocol.ACTIONS)
+
+# Rate limiting: one bucket per connection (local to each WebSocket endpoint) plus these per-IP tables
+ws_ip_buckets = ratelimit.SharedBuckets(ratelimit.WS_IP_RATE, ratelimit.WS_IP_BURST)
+auth_limiter = ratelimit.KeyedLimiter(ratelimit.AUTH_RATE, ratelimit.AUTH_BURST)
+RATE_LIMIT_KEYS = metrics.Gauge("rate_limit_ip_buckets", "Client IPs with an active WebSocket bucket",
+                                function=lambda: len(ws_ip_buckets))
+
+# Every change to `games` is also appended here (see eventlog.py)
+event_log = eventlog.EventLog()
+PENDING_EVENTS = metrics.Gauge("event_log_pending", "Events waiting for the next group commit",
+                               function=event_log.pending)
+
+# Server-hosted bots, woken through bot_manager.notify() whenever their session changes
+bot_manager = bots.BotManager(games, lambda session_id, username: play_roll(session_id, username),
+                              event_log.append)
+ACTIVE_BOTS = metrics.Gauge("active_bots", "Bots seated in sessions", function=bot_manager.count)
+
+# Brackets whose matches are ordinary sessions (see tournament.py)
+tournament_engine = tournament.TournamentEngine(games, clients, bot_manager, event_log.append)
+
+# Sessions with a free seat, kept up to date by update_lobby() (see lobby.py)
+waiting_room = lobby.Lobby()
+LOBBY_SESSIONS = metrics.Gauge("lobby_sessions", "Sessions waiting for players",
+                               function=lambda: len(waiting_room.sessions))
+LOBBY_SUBSCRIBERS = metrics.Gauge("lobby_subscribers", "Open lobby event streams",
+                                  function=waiting_room.subscriber_count)
 
 # Enable CORS
 app.add_middleware(
@@ -22,30 +153,231 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Ensure DB exists
-create_db()
+# Gzip REST responses that are big enough to benefit
+app.add_middleware(GZipMiddleware, minimum_size=GZIP_MIN_BYTES)
 
+# Bound by init_database(): SQLAlchemy is the slowest import, so it stays off the startup path
+SessionLocal = User = UserSketch = None
 
-# ========= REST API ==========
+# Set once the DB is importable and its tables exist; endpoints that use it wait for it
+db_ready = asyncio.Event()
 
-@app.post("/register")
-async def register(username: str, password: str, avatar: str = "🙂"):
+# Set when initialize() has finished, whether or not it worked; db_error says why it didn't
+db_settled = asyncio.Event()
+db_error: str | None = None
+
+# How long a request waits for the DB to come up before getting a 503, overridable through the environment on the hosting platform
+DB_WAIT_SECONDS = float(os.environ.get("DB_WAIT_SECONDS", "10"))
+
+STARTUP_ERRORS = metrics.Counter("startup_errors_total", "Deferred startups (DB setup, tournament recovery) that failed")
+
+log = logging.getLogger("uvicorn.error")
+
+
+@contextmanager
+def db_session(endpoint: str):
+    """Open a DB session for one request and record how long it was held"""
+    start = perf_counter()
     db = SessionLocal()
     try:
+        yield db
+    finally:
+        db.close()
+        DB_SECONDS.observe(perf_counter() - start, endpoint)
+
+
+def client_ip(connection: Request | WebSocket) -> str:
+    """Address rate limits are keyed by.
+
+    Behind TRUSTED_PROXY_HOPS proxies it is the X-Forwarded-For entry the
+    outermost one appended, counted from the right: everything left of it
+    was sent by the client and can be anything."""
+    if TRUSTED_PROXY_HOPS:
+        hops = [hop.strip() for value in connection.headers.getlist("x-forwarded-for") for hop in value.split(",")]
+        if len(hops) >= TRUSTED_PROXY_HOPS:
+            return hops[-TRUSTED_PROXY_HOPS]
+    return connection.client.host if connection.client else "unknown"
+
+
+def too_many_requests() -> JSONResponse:
+    RATE_LIMITED.inc("auth")
+    return JSONResponse({"status": "error", "message": "Too many attempts, try again later."}, status_code=429)
+
+
+def restarting() -> JSONResponse:
+    return JSONResponse({"status": "error", "message": "Server is restarting, try again shortly."}, status_code=503)
+
+
+def db_unavailable() -> JSONResponse:
+    return JSONResponse({"status": "error", "message": "Database unavailable, try again shortly."}, status_code=503)
+
+
+async def wait_for_db() -> bool:
+    """Wait up to DB_WAIT_SECONDS for the deferred startup; False if it failed or is still running"""
+    if not db_settled.is_set():
+        try:
+            await asyncio.wait_for(db_settled.wait(), DB_WAIT_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+    return db_ready.is_set()
+
+
+# ========= STARTUP ==========
+
+def init_database():
+    """Import the DB layer and ensure the tables exist"""
+    global SessionLocal, User, UserSketch
+    from database import SessionLocal, User, UserSketch, create_db  # Your DB setup
+    create_db()
+
+
+async def initialize():
+    """Deferred startup, run once the server is already accepting connections"""
+    global db_error
+    try:
+        await asyncio.to_thread(init_database)
+        await tournament_engine.recover()
+    except Exception as e:
+        # DB requests get a 503 and /ready says why, rather than waiting for a DB that never comes
+        db_error = f"{type(e).__name__}: {e}"
+        STARTUP_ERRORS.inc()
+        log.exception("Deferred startup failed")
+    else:
+        db_ready.set()
+    finally:
+        db_settled.set()
+
+
+# ========= SHUTDOWN & RESTORE ==========
+
+def install_drain_handler():
+    """Chain onto the server's SIGTERM handler to stop handing out new sessions"""
+    previous = signal.getsignal(signal.SIGTERM)
+    if not callable(previous):
+        return
+    loop = asyncio.get_running_loop()
+
+    def on_sigterm(signum, frame):
+        global draining
+        draining = True
+        # Lobby streams never end on their own and would hold up the shutdown
+        loop.call_soon_threadsafe(waiting_room.close)
+        previous(signum, frame)
+
+    try:
+        signal.signal(signal.SIGTERM, on_sigterm)
+    except ValueError:
+        # Only the main thread may set signal handlers (not the case under a test client)
+        pass
+
+
+def snapshot_sessions() -> dict:
+    """State of every unfinished session, with the bots seated in it"""
+    sessions = {}
+    for session_id, game in games.items():
+        # Tournament matches are rebuilt from the database instead
+        if session_id in tournament_engine.matches or game.get("winner") or not game["positions"]:
+            continue
+        seated_bots = [[bot.username, bot.delay] for bot in bot_manager.sessions.get(session_id, ())]
+        sessions[session_id] = {**game, "bots": seated_bots}
+    return sessions
+
+
+def restore_sessions() -> int:
+    """Load the snapshot left by the previous process and restart its bots"""
+    return install_sessions(snapshot.load())
+
+
+async def start_event_log(replay: bool):
+    """Rebuild the sessions of a crashed process from the event log, then run its writer"""
+    if replay:
+        since = time.time() - snapshot.SNAPSHOT_TTL
+        sessions = await asyncio.to_thread(eventlog.replay, event_log.directory, since)
+        # Players may have reconnected (to a fresh session) while the log was being read
+        install_sessions({session_id: state for session_id, state in sessions.items() if session_id not in games})
+    await event_log.run_writer()
+
+
+def install_sessions(sessions: dict) -> int:
+    """Seat restored sessions (snapshot format) whose players get SNAPSHOT_TTL to reconnect"""
+    for session_id, state in sessions.items():
+        seated_bots = state.pop("bots", [])
+        games[session_id] = state
+        restored_seats[session_id] = set(state["positions"]) - {username for username, _ in seated_bots}
+        for username, delay in seated_bots:
+            bot_manager.resume(session_id, username, delay)
+    return len(sessions)
+
+
+async def expire_restored():
+    """Give restored players SNAPSHOT_TTL seconds to reconnect, then free their seats"""
+    await asyncio.sleep(snapshot.SNAPSHOT_TTL)
+    for session_id, usernames in restored_seats.items():
+        game = games.get(session_id)
+        if game is None:
+            continue
+        if not clients.get(session_id):
+            clients.pop(session_id, None)
+            games.pop(session_id, None)
+            event_log.append(session_id, "close")
+            bot_manager.remove_session(session_id)
+            update_lobby(session_id)
+            continue
+        for username in usernames:
+            game["positions"].pop(username, None)
+            game["players"].pop(username, None)
+            event_log.append(session_id, "leave", user=username)
+        update_lobby(session_id)
+        if usernames:
+            await broadcast_state(session_id, f"{', '.join(sorted(usernames))} left the game")
+            bot_manager.notify(session_id)
+    restored_seats.clear()
+
+
+# ========= ANALYTICS ==========
+
+async def run_analytics():
+    """Background task: every ANALYTICS_INTERVAL, fold new event log entries into the daily tables and prune the log"""
+    await db_settled.wait()
+    if not db_ready.is_set():
+        return
+    while True:
+        try:
+            # Catch up in bounded passes; each one is a single transaction
+            while await asyncio.to_thread(analytics.run_once, event_log.directory):
+                pass
+            # Segments the rollup has read, once replay() can't need them after a crash either
+            keep = max(eventlog.RETENTION_SECONDS, snapshot.SNAPSHOT_TTL)
+            await asyncio.to_thread(analytics.prune_log, event_log.directory, time.time() - keep)
+        except Exception:
+            analytics.PASS_ERRORS.inc()  # the watermark didn't move: the next pass redoes it
+        await asyncio.sleep(analytics.ANALYTICS_INTERVAL)
+
+
+# ========= REST API ==========
+
+@app.post("/register")
+async def register(request: Request, username: str, password: str, avatar: str = "🙂"):
+    if not auth_limiter.allow(client_ip(request)):
+        return too_many_requests()
+    if not await wait_for_db():
+        return db_unavailable()
+    with db_session("register") as db:
         if db.query(User).filter(User.username == username).first():
             return {"status": "error", "message": "Username taken."}
         user = User(username=username, password=password, avatar=avatar)
         db.add(user)
         db.commit()
         return {"status": "success"}
-    finally:
-        db.close()
 
 
 @app.post("/login")
-async def login(username: str, password: str):
-    db = SessionLocal()
-    try:
+async def login(request: Request, username: str, password: str):
+    if not auth_limiter.allow(client_ip(request)):
+        return too_many_requests()
+    if not await wait_for_db():
+        return db_unavailable()
+    with db_session("login") as db:
         user = db.query(User).filter(User.username == username, User.password == password).first()
         if user:
             return {
@@ -53,184 +385,642 @@ async def login(username: str, password: str):
                 "user_id": user.id,
                 "avatar": user.avatar,
                 "username": user.username,
+                "token": auth.session_token(user.id, user.username),
             }
         return {"status": "error", "message": "Invalid credentials."}
-    finally:
-        db.close()
 
 
 @app.post("/create_session")
 async def create_session(request: Request):
+    if draining:
+        return restarting()
     session_id = str(uuid.uuid4())
     base_url = str(request.base_url).rstrip("/")
     return {"session_id": session_id, "invite_link": f"{base_url}/join/{session_id}"}
 
 
+# Per-user distributions kept as quantile sketches (see sketch.py)
+SKETCH_METRICS = ("duration", "win_moves")
+UNREADABLE_SKETCHES = metrics.Counter("sketch_rows_unreadable_total",
+                                      "Stored sketches left out of /stats responses for being in another format")
+
+
+def read_sketch(data: bytes | None) -> sketch.QuantileSketch | None:
+    """A stored sketch, or None (and counted) if it is in a format this server can't read"""
+    try:
+        return sketch.QuantileSketch.from_bytes(data)
+    except ValueError:
+        UNREADABLE_SKETCHES.inc()
+        return None
+
+
+def add_to_sketch(db, user_id: int, metric: str, value: int):
+    """Fold one game into a user's sketch row (committed with the rest of the request)"""
+    row = db.get(UserSketch, (user_id, metric))
+    if row is None:
+        row = UserSketch(user_id=user_id, metric=metric)
+        db.add(row)
+    user_sketch = sketch.QuantileSketch.from_bytes(row.data)
+    user_sketch.add(value)
+    row.data = user_sketch.to_bytes()
+
+
 @app.post("/update_stats")
-async def update_stats(username: str, result: str, duration: int = 0):
+async def update_stats(username: str, result: str, duration: int = 0, moves: int = 0):
     """Update player statistics"""
-    db = SessionLocal()
-    try:
-        user = db.query(User).filter(User.username == username).first()
-        if not user:
-            return {"status": "error", "message": "User not found"}
+    if not await wait_for_db():
+        return db_unavailable()
+    with db_session("update_stats") as db:
+        try:
+            user = db.query(User).filter(User.username == username).first()
+            if not user:
+                return {"status": "error", "message": "User not found"}
 
-        if result == "win":
-            user.wins = (user.wins or 0) + 1
-            if duration > 0 and (user.fastest_win_seconds is None or duration < user.fastest_win_seconds):
-                user.fastest_win_seconds = duration
-        elif result == "loss":
-            user.losses = (user.losses or 0) + 1
+            if result == "win":
+                user.wins = (user.wins or 0) + 1
+                if duration > 0 and (user.fastest_win_seconds is None or duration < user.fastest_win_seconds):
+                    user.fastest_win_seconds = duration
+                if moves > 0:
+                    add_to_sketch(db, user.id, "win_moves", moves)
+            elif result == "loss":
+                user.losses = (user.losses or 0) + 1
+            if result in ("win", "loss") and duration > 0:
+                add_to_sketch(db, user.id, "duration", duration)
 
-        db.commit()
-        return {"status": "success"}
-    except Exception as e:
-        return {"status": "error", "message": str(e)}
-    finally:
-        db.close()
+            db.commit()
+            return {"status": "success"}
+        except Exception as e:
+            return {"status": "error", "message": str(e)}
 
 
 @app.get("/stats")
 async def get_stats(username: str):
     """Get player statistics"""
-    db = SessionLocal()
-    try:
-        user = db.query(User).filter(User.username == username).first()
-        if not user:
-            return {"status": "error", "message": "User not found"}
-
-        return {
-            "wins": user.wins or 0,
-            "losses": user.losses or 0,
-            "fastest_win_seconds": user.fastest_win_seconds or 9999
-        }
-    except Exception as e:
-        return {"status": "error", "message": str(e)}
-    finally:
-        db.close()
+    if not await wait_for_db():
+        return db_unavailable()
+    with db_session("stats") as db:
+        try:
+            user = db.query(User).filter(User.username == username).first()
+            if not user:
+                return {"status": "error", "message": "User not found"}
+
+            sketches = {row.metric: user_sketch for row in db.query(UserSketch).filter(UserSketch.user_id == user.id)
+                        if (user_sketch := read_sketch(row.data)) is not None}
+            return {
+                "wins": user.wins or 0,
+                "losses": user.losses or 0,
+                "fastest_win_seconds": user.fastest_win_seconds or 9999,
+                **{metric: sketches.get(metric, sketch.QuantileSketch()).summary() for metric in SKETCH_METRICS},
+            }
+        except Exception as e:
+            return {"status": "error", "message": str(e)}
+
+
+@app.get("/stats/global")
+async def get_global_stats():
+    """Game duration and moves-to-win over every player, merged from the per-user sketches"""
+    if not await wait_for_db():
+        return db_unavailable()
+    with db_session("stats_global") as db:
+        merged = {metric: sketch.QuantileSketch() for metric in SKETCH_METRICS}
+        for metric, data in db.query(UserSketch.metric, UserSketch.data):
+            user_sketch = read_sketch(data) if metric in merged else None
+            if user_sketch is not None:
+                merged[metric].merge(user_sketch)
+        return {metric: merged_sketch.summary() for metric, merged_sketch in merged.items()}
+
+
+@app.get("/analytics")
+async def get_analytics(days: int = 30):
+    """Daily games, active users, average duration, first-player win rate and snake/ladder hits"""
+    if not await wait_for_db():
+        return db_unavailable()
+    with db_session("analytics") as db:
+        return analytics.summary(db, max(1, min(days, 366)))
 
 
 @app.post("/update_profile")
 async def update_profile(username: str, new_name: str, avatar: str):
     """Update user profile"""
-    db = SessionLocal()
-    try:
-        user = db.query(User).filter(User.username == username).first()
-        if not user:
-            return {"status": "error", "message": "User not found"}
-
-        # Check if new username is already taken (if different from current)
-        if new_name != username:
-            existing = db.query(User).filter(User.username == new_name).first()
-            if existing:
-                return {"status": "error", "message": "Username already taken"}
-
-        user.username = new_name
-        user.avatar = avatar
-        db.commit()
+    if not await wait_for_db():
+        return db_unavailable()
+    with db_session("update_profile") as db:
+        try:
+            user = db.query(User).filter(User.username == username).first()
+            if not user:
+                return {"status": "error", "message": "User not found"}
 
-        return {
-            "status": "success",
-            "username": new_name,
-            "avatar": avatar
-        }
-    except Exception as e:
+            # Check if new username is already taken (if different from current)
+            if new_name != username:
+                existing = db.query(User).filter(User.username == new_name).first()
+                if existing:
+                    return {"status": "error", "message": "Username already taken"}
+
+            user.username = new_name
+            user.avatar = avatar
+            db.commit()
+
+            return {
+                "status": "success",
+                "username": new_name,
+                "avatar": avatar,
+                "token": auth.session_token(user.id, new_name),
+            }
+        except Exception as e:
+            return {"status": "error", "message": str(e)}
+
+
+@app.post("/add_bot")
+async def add_bot(session_id: str, delay: float = 1.0):
+    """Seat a server-side bot in a session someone is connected to"""
+    if session_id not in clients:
+        return {"status": "error", "message": "Session not found"}
+    if len(games[session_id]["positions"]) >= MAX_SEATS:
+        return {"status": "error", "message": "Session is full"}
+    bot = bot_manager.add(session_id, delay=max(0.0, delay))
+    update_lobby(session_id)
+    await broadcast_state(session_id, f"{bots.BOT_NAME} joined the game!")
+    return {"status": "success", "username": bot.username}
+
+
+@app.post("/tournaments")
+async def create_tournament(entrants: int, players: str = "", bot_delay: float = 1.0):
+    """Start a knockout tournament; seats not taken by `players` (comma separated) go to bots"""
+    if draining:
+        return restarting()
+    if not await wait_for_db():
+        return db_unavailable()
+    usernames = [name.strip() for name in players.split(",") if name.strip()]
+    try:
+        bracket = await tournament_engine.create(usernames, entrants, bot_delay=max(0.0, bot_delay))
+    except ValueError as e:
         return {"status": "error", "message": str(e)}
-    finally:
-        db.close()
+    return {"status": "success", **bracket.to_dict()}
+
+
+@app.get("/tournaments/{tournament_id}")
+async def get_tournament(tournament_id: str):
+    """Bracket, winners and the session id of every match being played"""
+    if not await wait_for_db():
+        return db_unavailable()
+    bracket = tournament_engine.get(tournament_id)
+    if bracket is None:
+        return {"status": "error", "message": "Tournament not found"}
+    return {"status": "success", **bracket}
+
+
+@app.get("/lobby")
+async def get_lobby(limit: int = 50):
+    """Sessions waiting for players, the ones waiting longest first"""
+    return {"sessions": waiting_room.listing(max(1, min(limit, 500))), "version": waiting_room.version}
+
+
+@app.get("/lobby/events")
+async def lobby_events():
+    """Server-sent events: a `snapshot` of the lobby, then coalesced `update`s"""
+    return StreamingResponse(waiting_room.subscribe(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@app.get("/protocol")
+async def get_protocol():
+    """Message models of the game WebSocket (see common/protocol.py)"""
+    return protocol.describe()
+
+
+@app.get("/ready")
+async def ready():
+    """Readiness probe: 200 once the DB is up, 503 while starting, draining or after a failed startup"""
+    if draining:
+        return JSONResponse({"status": "draining"}, status_code=503)
+    if db_error is not None:
+        return JSONResponse({"status": "failed", "error": db_error}, status_code=503)
+    if not db_ready.is_set():
+        return JSONResponse({"status": "starting"}, status_code=503)
+    return {"status": "ready"}
+
+
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus-style metrics"""
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
 
 
 # ========= GAME WEBSOCKET ==========
 
 @app.websocket("/ws/{session_id}/{username}")
 async def websocket_endpoint(websocket: WebSocket, session_id: str, username: str):
-    await websocket.accept()
+    offered = websocket.scope.get("subprotocols", [])
+    codec = negotiate_codec(websocket)
+    # Only echo a subprotocol the client offered (JSON is the fallback for anything else)
+    await websocket.accept(subprotocol=codec.subprotocol if codec.subprotocol in offered else None)
+    codecs[websocket] = codec
+    ACTIVE_CONNECTIONS.inc()
+
+    # Every action costs a token from this connection's bucket and from its IP's shared bucket
+    ip = client_ip(websocket)
+    connection_bucket = ratelimit.TokenBucket(ratelimit.WS_RATE, ratelimit.WS_BURST)
+    ip_bucket = ws_ip_buckets.acquire(ip)
+
+    code = ABNORMAL_CLOSURE  # unless the client closes the connection itself
+    try:
+        await join_session(websocket, codec, session_id, username)
+
+        while True:
+            data = await receive_message(websocket)
+            if data is None or not allowed(data, connection_bucket, ip_bucket):
+                continue
+            message = parse_action(data)
+            handler = GAME_ACTIONS.get(type(message))
+            if handler is not None:
+                await handler(session_id, username, message)
+
+    except WebSocketDisconnect as e:
+        code = e.code
+    finally:
+        ACTIVE_CONNECTIONS.dec()
+        codecs.pop(websocket, None)
+        ws_ip_buckets.release(ip)
+        await leave_session(websocket, session_id, username, code)
+
+
+@app.websocket("/ws")
+async def multiplexed_endpoint(websocket: WebSocket, username: str = "", token: str = ""):
+    """One connection per client, shared by every session it plays or watches and the lobby.
+
+    Client frames: {"action": "subscribe", "session": id, "spectate": bool},
+    {"action": "unsubscribe", "session": id}, {"action": "subscribe_lobby"},
+    {"action": "unsubscribe_lobby"}, and the usual game actions with a "session" key.
+    Game messages from the server carry the "session" they belong to; lobby events
+    arrive as lobby_snapshot / lobby_update messages."""
+    user_id = auth.verify(username, token)
+    if user_id is None or not await owns_username(user_id, username):
+        # Closing before accept rejects the handshake
+        await websocket.close(code=UNAUTHORIZED)
+        return
+    offered = websocket.scope.get("subprotocols", [])
+    codec = negotiate_codec(websocket)
+    # Only echo a subprotocol the client offered (JSON is the fallback for anything else)
+    await websocket.accept(subprotocol=codec.subprotocol if codec.subprotocol in offered else None)
+    codecs[websocket] = codec
+    mux_sockets.add(websocket)
+    ACTIVE_CONNECTIONS.inc()
+
+    ip = client_ip(websocket)
+    connection_bucket = ratelimit.TokenBucket(ratelimit.WS_RATE, ratelimit.WS_BURST)
+    ip_bucket = ws_ip_buckets.acquire(ip)
+    connection = MuxConnection(websocket, codec, username)
+
+    code = ABNORMAL_CLOSURE
+    try:
+        while True:
+            data = await receive_message(websocket)
+            if data is None or not allowed(data, connection_bucket, ip_bucket):
+                continue
+            message = parse_action(data)
+            if message is None:
+                continue
+            handler = MUX_ACTIONS.get(type(message))
+            if handler is not None:
+                await handler(connection, message)
+            elif connection.subscriptions.get(message.session):
+                # Game actions only count for sessions this connection is seated in
+                await GAME_ACTIONS[type(message)](message.session, username, message)
+
+    except WebSocketDisconnect as e:
+        code = e.code
+    finally:
+        ACTIVE_CONNECTIONS.dec()
+        codecs.pop(websocket, None)
+        mux_sockets.discard(websocket)
+        connection.stop_lobby_feed()
+        ws_ip_buckets.release(ip)
+        await connection.close(code)
+
+
+async def owns_username(user_id: int, username: str) -> bool:
+    """The account a token was issued to is still called `username` (a rename frees the name for someone else)"""
+    if not await wait_for_db():
+        return False
+    with db_session("ws_auth") as db:
+        user = db.get(User, user_id)
+        return user is not None and user.username == username
+
+
+def negotiate_codec(websocket: WebSocket):
+    """Codec for the subprotocols a client offered; the in-band deflate ones only without permessage-deflate"""
+    extensions = websocket.headers.get("sec-websocket-extensions", "")
+    return wire.negotiate(websocket.scope.get("subprotocols", []), compression=WS_COMPRESSION,
+                          min_size=WS_COMPRESS_MIN_BYTES,
+                          permessage_deflate=WS_COMPRESSION and "permessage-deflate" in extensions)
+
+
+def allowed(data: dict, connection_bucket: ratelimit.TokenBucket, ip_bucket: ratelimit.TokenBucket) -> bool:
+    """Count an incoming action and charge it to the rate limits; over-limit ones are dropped without a reply"""
+    action = data.get("action")
+    MESSAGES_IN.inc(action if action in KNOWN_ACTIONS else "other")
+    if not connection_bucket.allow():
+        RATE_LIMITED.inc("ws_connection")
+        return False
+    if not ip_bucket.allow():
+        RATE_LIMITED.inc("ws_ip")
+        return False
+    return True
+
+
+def parse_action(data: dict) -> protocol.Message | None:
+    """Typed action, or None (and counted) when the message doesn't match the protocol"""
+    try:
+        return protocol.parse_action(data)
+    except protocol.ProtocolError:
+        INVALID_MESSAGES.inc()
+        return None
+
 
-    # Register client
+async def join_session(websocket: WebSocket, codec, session_id: str, username: str):
+    """Seat a player (or take back their seat) and tell the session"""
+    # Register client (tournament sessions already have their game state)
     if session_id not in clients:
         clients[session_id] = []
-        games[session_id] = {"positions": {}, "turn": None, "players": {}}
+        games.setdefault(session_id, {"positions": {}, "turn": None, "players": {}, "winner": None})
 
     clients[session_id].append(websocket)
     games[session_id]["positions"].setdefault(username, 0)
+    event_log.append(session_id, "join", user=username)
+    restored_seats.get(session_id, set()).discard(username)
+    tournament_engine.player_joined(session_id, username)
+    update_lobby(session_id)
 
-    try:
-        # Send current game state to the new player
-        await websocket.send_json({
-            "type": "game_state",
-            "positions": games[session_id]["positions"],
-            "players": games[session_id]["players"],
-            "turn": games[session_id]["turn"]
-        })
+    # Send current game state to the new player
+    await send_game_state(websocket, codec, session_id)
 
-        # Notify everyone that a player joined
-        await broadcast_state(session_id, f"{username} joined the game!")
+    # Notify everyone that a player joined
+    await broadcast_state(session_id, f"{username} joined the game!")
+    bot_manager.notify(session_id)
 
-        while True:
-            data = await websocket.receive_json()
-            action = data.get("action")
-
-            if action == "player_info":
-                # Store player information
-                display_name = data.get("display_name", username)
-                display_avatar = data.get("display_avatar", "🙂")
-                games[session_id]["players"][username] = {
-                    "display_name": display_name,
-                    "display_avatar": display_avatar
-                }
-
-                # Broadcast updated player info to all clients
-                await broadcast(session_id, {
-                    "type": "player_info_update",
-                    "players": games[session_id]["players"]
-                })
-
-            elif action == "roll":
-                roll = random.randint(1, 6)
-                pos = games[session_id]["positions"].get(username, 0)
-                new_pos = min(pos + roll, 100)
-                games[session_id]["positions"][username] = new_pos
-
-                # Switch turns
-                players = list(games[session_id]["positions"].keys())
-                if games[session_id]["turn"] is None:
-                    games[session_id]["turn"] = players[0]
-                else:
-                    current_idx = players.index(username)
-                    games[session_id]["turn"] = players[(current_idx + 1) % len(players)]
-
-                # Build update message
-                message = {
-                    "type": "state_update",
-                    "positions": games[session_id]["positions"],
-                    "turn": games[session_id]["turn"],
-                    "last_roll": roll,
-                    "player": username,
-                    "players": games[session_id]["players"]
-                }
-                await broadcast(session_id, message)
-
-    except WebSocketDisconnect:
-        clients[session_id].remove(websocket)
-        if username in games[session_id]["positions"]:
-            del games[session_id]["positions"][username]
-        if username in games[session_id]["players"]:
-            del games[session_id]["players"][username]
-
-        if not clients[session_id]:
-            clients.pop(session_id, None)
-            games.pop(session_id, None)
+
+async def on_player_info(session_id: str, username: str, message: protocol.PlayerInfo):
+    # Store player information
+    info = games[session_id]["players"][username] = {
+        "display_name": message.display_name or username,
+        "display_avatar": message.display_avatar or "🙂"
+    }
+    event_log.append(session_id, "player_info", user=username, name=info["display_name"],
+                     avatar=info["display_avatar"])
+    update_lobby(session_id)
+
+    # Broadcast updated player info to all clients
+    await broadcast(session_id, {
+        "type": "player_info_update",
+        "players": games[session_id]["players"]
+    })
+
+
+async def on_roll(session_id: str, username: str, message: protocol.Roll):
+    await play_roll(session_id, username)
+
+
+# Game actions by model: handler(session_id, username, message)
+GAME_ACTIONS = {
+    protocol.PlayerInfo: on_player_info,
+    protocol.Roll: on_roll,
+}
+
+
+async def leave_session(websocket: WebSocket, session_id: str, username: str, code: int = 1000):
+    """Remove a player's connection from a session, and their seat unless the server is restarting"""
+    if websocket not in clients.get(session_id, ()):
+        return
+    clients[session_id].remove(websocket)
+    if code == SERVICE_RESTART:
+        # The server is going down: keep the seat so the snapshot can restore it
+        return
+    if username in games[session_id]["positions"]:
+        del games[session_id]["positions"][username]
+    if username in games[session_id]["players"]:
+        del games[session_id]["players"][username]
+    event_log.append(session_id, "leave", user=username)
+
+    if not clients[session_id]:
+        clients.pop(session_id, None)
+        games.pop(session_id, None)
+        event_log.append(session_id, "close")
+        spectators.pop(session_id, None)
+        bot_manager.remove_session(session_id)
+        tournament_engine.session_closed(session_id, username)
+    else:
+        # Broadcast player disconnection
+        await broadcast_state(session_id, f"{username} left the game")
+        bot_manager.notify(session_id)
+    update_lobby(session_id)
+
+
+def stop_spectating(websocket: WebSocket, session_id: str):
+    watching = spectators.get(session_id)
+    if watching is not None:
+        watching.discard(websocket)
+        if not watching:
+            del spectators[session_id]
+
+
+class MuxConnection:
+    """What one multiplexed connection is subscribed to"""
+    __slots__ = ("websocket", "codec", "username", "subscriptions", "lobby_feed")
+
+    def __init__(self, websocket: WebSocket, codec, username: str):
+        self.websocket = websocket
+        self.codec = codec
+        self.username = username
+        self.subscriptions: dict[str, bool] = {}  # session_id -> True when seated, False when spectating
+        self.lobby_feed: asyncio.Task | None = None
+
+    async def subscribe(self, message: protocol.Subscribe):
+        session_id = message.session
+        if session_id in self.subscriptions:
+            return
+        if len(self.subscriptions) >= MUX_MAX_SESSIONS:
+            await send_error(self.websocket, self.codec, session_id, "Too many sessions on one connection")
+        elif message.spectate:
+            if session_id not in games:
+                await send_error(self.websocket, self.codec, session_id, "Session not found")
+                return
+            self.subscriptions[session_id] = False
+            spectators.setdefault(session_id, set()).add(self.websocket)
+            await send_game_state(self.websocket, self.codec, session_id)
+        else:
+            self.subscriptions[session_id] = True
+            await join_session(self.websocket, self.codec, session_id, self.username)
+
+    async def unsubscribe(self, message: protocol.Unsubscribe):
+        if message.session in self.subscriptions:
+            await self.leave(message.session, self.subscriptions.pop(message.session))
+
+    async def leave(self, session_id: str, seated: bool, code: int = 1000):
+        if seated:
+            await leave_session(self.websocket, session_id, self.username, code)
         else:
-            # Broadcast player disconnection
-            await broadcast_state(session_id, f"{username} left the game")
+            stop_spectating(self.websocket, session_id)
+
+    async def subscribe_lobby(self, message: protocol.SubscribeLobby):
+        if self.lobby_feed is None or self.lobby_feed.done():
+            self.lobby_feed = asyncio.create_task(forward_lobby(self.websocket, self.codec))
+
+    async def unsubscribe_lobby(self, message: protocol.UnsubscribeLobby):
+        self.stop_lobby_feed()
+
+    def stop_lobby_feed(self):
+        if self.lobby_feed is not None:
+            self.lobby_feed.cancel()
+            self.lobby_feed = None
+
+    async def close(self, code: int):
+        """The connection dropped: leave (or, on a restart, keep) every seat"""
+        for session_id, seated in self.subscriptions.items():
+            await self.leave(session_id, seated, code)
+        self.subscriptions.clear()
+
+
+# Connection-level actions of the multiplexed endpoint: handler(connection, message)
+MUX_ACTIONS = {
+    protocol.Subscribe: MuxConnection.subscribe,
+    protocol.Unsubscribe: MuxConnection.unsubscribe,
+    protocol.SubscribeLobby: MuxConnection.subscribe_lobby,
+    protocol.UnsubscribeLobby: MuxConnection.unsubscribe_lobby,
+}
+
+
+async def forward_lobby(websocket: WebSocket, codec):
+    """Relay lobby events to a multiplexed connection until it unsubscribes or the lobby closes"""
+    async with aclosing(waiting_room.events()) as events:
+        async for event in events:
+            try:
+                await send_frame(websocket, codec, event.frame(codec))
+            except Exception:
+                return
+            MESSAGES_OUT.inc(f"lobby_{event.name}")
+
+
+def update_lobby(session_id: str):
+    """List a session in the lobby while someone is connected and a seat is free"""
+    game = games.get(session_id)
+    if (game is None or not clients.get(session_id) or not game["positions"] or game["winner"] is not None
+            or len(game["positions"]) >= MAX_SEATS or session_id in tournament_engine.matches):
+        waiting_room.remove(session_id)
+        return
+    host = next(iter(game["positions"]))
+    info = game["players"].get(host, {})
+    waiting_room.put(session_id, {
+        "session_id": session_id,
+        "host": info.get("display_name", host),
+        "avatar": info.get("display_avatar", "🙂"),
+        "players": len(game["positions"]),
+        "seats": MAX_SEATS,
+    })
+
+
+def apply_roll(session_id: str, username: str) -> dict:
+    """Roll for a player, advance the turn and return the state_update message"""
+    game = games[session_id]
+    roll = random.randint(1, 6)
+    pos = game["positions"].get(username, 0)
+    new_pos = min(pos + roll, 100)
+    game["positions"][username] = new_pos
+    if new_pos == 100 and game.get("winner") is None:
+        game["winner"] = username
+
+    # Switch turns
+    players = list(game["positions"].keys())
+    if game["turn"] is None:
+        game["turn"] = players[0]
+    else:
+        current_idx = players.index(username)
+        game["turn"] = players[(current_idx + 1) % len(players)]
+    # Encoded right away, so later moves don't change what was logged
+    event_log.append(session_id, "roll", user=username, roll=roll, positions=game["positions"],
+                     turn=game["turn"], winner=game["winner"])
+
+    # Build update message
+    return {
+        "type": "state_update",
+        "positions": game["positions"],
+        "turn": game["turn"],
+        "last_roll": roll,
+        "player": username,
+        "players": game["players"]
+    }
+
+
+async def play_roll(session_id: str, username: str):
+    """Apply a roll from a connected player or a bot and broadcast it"""
+    await broadcast(session_id, apply_roll(session_id, username))
+    bot_manager.notify(session_id)
+    game = games.get(session_id)
+    if game is not None and game["winner"] is not None:
+        update_lobby(session_id)
+        tournament_engine.game_over(session_id, game["winner"])
+
+
+async def receive_message(websocket: WebSocket) -> dict | None:
+    """Receive one text (JSON) or binary (MessagePack) frame; None if it can't be decoded"""
+    message = await websocket.receive()
+    if message["type"] == "websocket.disconnect":
+        raise WebSocketDisconnect(message.get("code", 1000), message.get("reason"))
+    frame = message.get("bytes") if message.get("bytes") is not None else message.get("text")
+    try:
+        data = wire.decode(frame, codecs.get(websocket))
+    except Exception:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+async def send_frame(websocket: WebSocket, codec, frame: str | bytes):
+    if codec.binary:
+        await websocket.send_bytes(frame)
+    else:
+        await websocket.send_text(frame)
+
+
+async def send_message(websocket: WebSocket, codec, message: dict):
+    await send_frame(websocket, codec, codec.encode(message))
+
+
+async def send_game_state(websocket: WebSocket, codec, session_id: str):
+    message = {
+        "type": "game_state",
+        "positions": games[session_id]["positions"],
+        "players": games[session_id]["players"],
+        "turn": games[session_id]["turn"]
+    }
+    if websocket in mux_sockets:
+        message["session"] = session_id
+    await send_message(websocket, codec, message)
+    MESSAGES_OUT.inc("game_state")
+
+
+async def send_error(websocket: WebSocket, codec, session_id: str, text: str):
+    await send_message(websocket, codec, {"type": "error", "session": session_id, "message": text})
+    MESSAGES_OUT.inc("error")
 
 
 async def broadcast(session_id: str, message: dict):
-    for ws in list(clients.get(session_id, [])):
+    start = perf_counter()
+    recipients = list(clients.get(session_id, []))
+    recipients.extend(spectators.get(session_id, ()))
+    # Encode once per codec in use (and once more for multiplexed sockets) rather than once per recipient
+    frames = {}
+    for ws in recipients:
+        codec = codecs.get(ws, wire.JSON)
+        key = (codec, ws in mux_sockets)
+        frame = frames.get(key)
+        if frame is None:
+            frame = frames[key] = codec.encode({**message, "session": session_id} if key[1] else message)
         try:
-            await ws.send_json(message)
+            await send_frame(ws, codec, frame)
         except Exception:
             pass
+    message_type = message.get("type", "other")
+    MESSAGES_OUT.inc(message_type, amount=len(recipients))
+    BROADCAST_SECONDS.observe(perf_counter() - start, message_type)
 
 
 async def broadcast_state(session_id: str, notice: str):
@@ -246,4 +1036,6 @@ async def broadcast_state(session_id: str, notice: str):
 # ========= RUN SERVER =========
 
 if __name__ == "__main__":
-    uvicorn.run("server:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
+    import uvicorn
+
+    uvicorn.run("server:app", host="0.0.0.0", port=8000, reload=True, ws="compression:CompressedWebSocketProtocol")
\ No newline at end of file
@@ -0,0 +1,112 @@
+import math
+
+import msgpack
+
+# Relative accuracy of the quantiles: an estimate is within 2% of the true value
+RELATIVE_ACCURACY = 0.02
+
+VERSION = 1
+
+
+class QuantileSketch:
+    """Streaming, mergeable quantile estimate of positive values (a DDSketch).
+
+    Values are counted in logarithmic buckets: bucket i holds values in
+    (gamma^(i-1), gamma^i], so any quantile is returned within
+    RELATIVE_ACCURACY of the true value however many values were added.
+    Two sketches merge by adding bucket counts, which makes per-user sketches
+    add up to exact global ones. Game durations and move counts span a few
+    hundred buckets at most, and to_bytes() stores only the occupied ones."""
+
+    __slots__ = ("counts", "zeros", "count", "total", "min", "max")
+
+    gamma = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+    _log_gamma = math.log(gamma)
+
+    def __init__(self):
+        self.counts: dict[int, int] = {}  # bucket index -> values in it
+        self.zeros = 0  # values <= 0 have no logarithm; they are kept apart
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float, count: int = 1):
+        if value > 0:
+            index = math.ceil(math.log(value) / self._log_gamma)
+            self.counts[index] = self.counts.get(index, 0) + count
+        else:
+            self.zeros += count
+        self.count += count
+        self.total += value * count
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def merge(self, other: "QuantileSketch"):
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.zeros += other.zeros
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def quantile(self, q: float) -> float | None:
+        """Estimated value below which a fraction `q` of the values fall; None when empty"""
+        if not self.count:
+            return None
+        rank = max(math.ceil(q * self.count) - 1, 0)  # nearest rank: p90 of 10 values is the 9th
+        if rank < self.zeros:
+            return self.min
+        seen = self.zeros
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen > rank:
+                # Middle of the bucket in relative terms, clamped to what was actually seen
+                value = 2 * self.gamma ** index / (self.gamma + 1)
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    def mean(self) -> float | None:
+        return self.total / self.count if self.count else None
+
+    def summary(self) -> dict:
+        """Count, mean and the quantiles the API reports"""
+        def rounded(value):
+            return None if value is None else round(value, 1)
+        return {
+            "count": self.count,
+            "mean": rounded(self.mean()),
+            "p50": rounded(self.quantile(0.5)),
+            "p90": rounded(self.quantile(0.9)),
+            "min": self.min if self.count else None,
+        }
+
+    def to_bytes(self) -> bytes:
+        # Occupied buckets as (gap from the previous index, count) pairs: small ints, a byte each
+        pairs, previous = [], 0
+        for index in sorted(self.counts):
+            pairs += (index - previous, self.counts[index])
+            previous = index
+        return msgpack.packb([VERSION, self.zeros, self.total, self.min if self.count else None,
+                              self.max if self.count else None, pairs])
+
+    @classmethod
+    def from_bytes(cls, data: bytes | None) -> "QuantileSketch":
+        """Sketch stored by to_bytes(); ValueError if it was written in another format version"""
+        sketch = cls()
+        if not data:
+            return sketch
+        row = msgpack.unpackb(data)
+        if row[0] != VERSION:
+            # Bucket boundaries depend on the format: counts from another version can't be read as ours
+            raise ValueError(f"quantile sketch format {row[0]}, expected {VERSION}")
+        _, sketch.zeros, sketch.total, low, high, pairs = row
+        index = 0
+        for i in range(0, len(pairs), 2):
+            index += pairs[i]
+            sketch.counts[index] = pairs[i + 1]
+        sketch.count = sketch.zeros + sum(sketch.counts.values())
+        if sketch.count:
+            sketch.min, sketch.max = low, high
+        return sketch
@@ -0,0 +1,50 @@
+import os
+import time
+import zlib
+
+import msgpack
+
+# Snapshot settings, overridable through the environment on the hosting platform
+SNAPSHOT_PATH = os.environ.get("SNAPSHOT_PATH", "sessions.snapshot")
+SNAPSHOT_TTL = float(os.environ.get("SNAPSHOT_TTL", "300"))  # seconds restored players get to reconnect
+
+VERSION = 1
+
+
+def save(sessions: dict, path: str = SNAPSHOT_PATH) -> int:
+    """Write session state as zlib-compressed MessagePack; returns the file size.
+
+    The file is written next to its final name and renamed into place, so a
+    reader never sees a half-written snapshot."""
+    payload = zlib.compress(msgpack.packb({"version": VERSION, "saved_at": time.time(), "sessions": sessions}), 6)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return len(payload)
+
+
+def load(path: str = SNAPSHOT_PATH, max_age: float = SNAPSHOT_TTL) -> dict:
+    """Read and remove the snapshot; {} if there is none or it is unreadable or too old.
+
+    Removing it means a process that crashes after restoring doesn't restore
+    the same state again on its next start."""
+    try:
+        with open(path, "rb") as f:
+            data = msgpack.unpackb(zlib.decompress(f.read()))
+    except FileNotFoundError:
+        return {}
+    except (OSError, zlib.error, ValueError):
+        data = None
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+    if not isinstance(data, dict) or data.get("version") != VERSION:
+        return {}
+    if time.time() - data.get("saved_at", 0) > max_age:
+        return {}
+    return data.get("sessions", {})
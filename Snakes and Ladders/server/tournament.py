@@ -0,0 +1,363 @@
+import asyncio
+import os
+import uuid
+from time import perf_counter
+
+import bots
+import metrics
+
+# The DB layer (SQLAlchemy) is imported where it is used, after server.init_database()
+
+MIN_PLAYERS = 8
+MAX_PLAYERS = 1024
+
+# Results are written behind: one transaction per batch, overridable through the environment
+FLUSH_INTERVAL = float(os.environ.get("TOURNAMENT_FLUSH_INTERVAL", "0.5"))  # seconds a batch may wait
+# Seconds a human entrant has to connect to a match before it goes to the side that did
+NO_SHOW_SECONDS = float(os.environ.get("TOURNAMENT_NO_SHOW_SECONDS", "120"))
+
+ACTIVE_MATCHES = metrics.Gauge("tournament_matches_active", "Tournament matches currently being played")
+FLUSHED_ROWS = metrics.Counter("tournament_rows_flushed_total", "Tournament rows written to the database")
+FLUSH_SECONDS = metrics.Histogram("tournament_flush_seconds", "Time to write one batch of tournament results")
+FLUSH_ERRORS = metrics.Counter("tournament_flush_errors_total", "Failed tournament result batches (retried)")
+NO_SHOWS = metrics.Counter("tournament_no_shows_total", "Matches awarded because an entrant never connected")
+
+
+def upsert(model):
+    """INSERT ... ON CONFLICT DO UPDATE for every non-key column of `model`"""
+    from sqlalchemy.dialects.sqlite import insert
+
+    table = model.__table__
+    statement = insert(table)
+    return statement.on_conflict_do_update(
+        index_elements=[c.name for c in table.primary_key],
+        set_={c.name: statement.excluded[c.name] for c in table.columns if not c.primary_key},
+    )
+
+
+class Match:
+    __slots__ = ("round", "slot", "players", "winner", "session_id")
+
+    def __init__(self, round_: int, slot: int):
+        self.round = round_
+        self.slot = slot
+        self.players: list[str | None] = [None, None]
+        self.winner: str | None = None
+        self.session_id: str | None = None
+
+    def is_bye(self) -> bool:
+        return self.round == 0 and self.players[0] is not None and self.players[1] is None
+
+
+class Bracket:
+    """Single-elimination bracket; rounds[r][s] feeds rounds[r + 1][s // 2]"""
+
+    def __init__(self, tournament_id: str, size: int, bot_names: set[str], bot_delay: float):
+        self.id = tournament_id
+        self.size = size
+        self.bots = bot_names
+        self.bot_delay = bot_delay
+        self.winner: str | None = None
+        self.rounds = [[Match(r, s) for s in range(size >> (r + 1))] for r in range(size.bit_length() - 1)]
+
+    def seed(self, entrants: list[str]):
+        """Fill the first round; the top seeds get the byes"""
+        byes = self.size - len(entrants)
+        players = iter(entrants)
+        for match in self.rounds[0]:
+            if byes:
+                match.players = [next(players), None]
+                byes -= 1
+            else:
+                match.players = [next(players), next(players)]
+
+    def to_dict(self) -> dict:
+        return {
+            "tournament_id": self.id,
+            "state": "finished" if self.winner else "running",
+            "winner": self.winner,
+            "rounds": [[{"players": m.players, "winner": m.winner, "session_id": m.session_id} for m in matches]
+                       for matches in self.rounds],
+        }
+
+
+class TournamentEngine:
+    """Runs brackets on top of the ordinary session model.
+
+    Every match is a regular game session: bot entrants are seated through
+    the BotManager, human entrants join /ws/{session_id}/{username}. A match
+    starts as soon as both of its feeder matches are decided, so brackets
+    never wait for a whole round and hundreds of matches run side by side.
+    All bracket state is touched only from the event loop, one bracket per
+    finished game, so there is no lock; the database is written by a single
+    writer task that batches rows and upserts them in one transaction.
+
+    A human entrant who hasn't connected NO_SHOW_SECONDS after their match
+    started forfeits it to the side that did (to the first seat if neither
+    did), so one absent player can't stall the bracket.
+
+    Only the first round is written synchronously. After a restart recover()
+    rebuilds each running bracket from its persisted winners and restarts the
+    matches that were undecided (including any whose result was still queued)."""
+
+    def __init__(self, games: dict, clients: dict, bot_manager: bots.BotManager, record=None):
+        self.games = games
+        self.clients = clients
+        self.bot_manager = bot_manager
+        self.record = record or (lambda session_id, kind, **data: None)  # server.event_log.append
+        self.brackets: dict[str, Bracket] = {}
+        self.matches: dict[str, tuple[Bracket, Match]] = {}  # session_id -> match being played
+        self.arrived: dict[str, set[str]] = {}  # session_id -> entrants seated or connected so far
+        self._deadlines: dict[str, asyncio.TimerHandle] = {}  # session_id -> no-show check
+        self._pending_matches: dict[tuple, dict] = {}  # (tournament, round, slot) -> latest row
+        self._pending_tournaments: dict[str, dict] = {}
+        self._dirty = asyncio.Event()
+
+    # ---------- bracket lifecycle ----------
+
+    async def create(self, players: list[str], entrants: int, bot_delay: float = 1.0) -> Bracket:
+        """Create a bracket for `entrants` players, filling the seats not taken by `players` with bots"""
+        if not MIN_PLAYERS <= entrants <= MAX_PLAYERS:
+            raise ValueError(f"A tournament needs {MIN_PLAYERS} to {MAX_PLAYERS} players")
+        if len(players) > entrants:
+            raise ValueError("More players than seats")
+        if len(set(players)) != len(players):
+            raise ValueError("Duplicate player")
+
+        bot_names = [bots.new_bot_name() for _ in range(entrants - len(players))]
+        size = 1 << (entrants - 1).bit_length()
+        bracket = Bracket(str(uuid.uuid4()), size, set(bot_names), bot_delay)
+        bracket.seed(players + bot_names)
+
+        # The first round is the only synchronous write: everything later can be rebuilt from it
+        rows = [self._match_row(bracket, match) for match in bracket.rounds[0]]
+        await asyncio.to_thread(self._write, [self._tournament_row(bracket, "running")], rows)
+
+        self.brackets[bracket.id] = bracket
+        for match in bracket.rounds[0]:
+            self._start(bracket, match)
+        return bracket
+
+    def get(self, tournament_id: str) -> dict | None:
+        bracket = self.brackets.get(tournament_id)
+        if bracket is not None:
+            return bracket.to_dict()
+        bracket = self._load(tournament_id)
+        return bracket.to_dict() if bracket else None
+
+    def game_over(self, session_id: str, winner: str):
+        """A game finished; advance the winner if it was a tournament match"""
+        entry = self._end(session_id)
+        if entry is None:
+            return
+        bracket, match = entry
+        # Bot-only sessions have nobody left to see the result
+        if not self.clients.get(session_id):
+            self.games.pop(session_id, None)
+            self.record(session_id, "close")
+        self._decide(bracket, match, winner)
+
+    def session_closed(self, session_id: str, last_player: str):
+        """The last client left a match session before it was decided: award a walkover.
+
+        A bot that was still seated wins; otherwise the player who stayed longest."""
+        entry = self._end(session_id)
+        if entry is None:
+            return
+        bracket, match = entry
+        bot = next((p for p in match.players if p in bracket.bots), None)
+        self._decide(bracket, match, bot or last_player)
+
+    def player_joined(self, session_id: str, username: str):
+        """An entrant connected to their match: no forfeit once both sides are here"""
+        arrived = self.arrived.get(session_id)
+        if arrived is None:
+            return
+        arrived.add(username)
+        bracket, match = self.matches[session_id]
+        deadline = self._deadlines.get(session_id)
+        if deadline is not None and all(player in arrived for player in match.players):
+            del self._deadlines[session_id]
+            deadline.cancel()
+
+    def _no_show(self, session_id: str):
+        """NO_SHOW_SECONDS passed without every entrant connecting: award the match"""
+        self._deadlines.pop(session_id, None)
+        arrived = self.arrived.get(session_id, ())
+        entry = self._end(session_id)
+        if entry is None:
+            return
+        bracket, match = entry
+        NO_SHOWS.inc()
+        winner = next((p for p in match.players if p in arrived), match.players[0])
+        self.bot_manager.remove_session(session_id)
+        if not self.clients.get(session_id):
+            self.games.pop(session_id, None)
+            self.record(session_id, "close")
+        self._decide(bracket, match, winner)
+
+    def _end(self, session_id: str) -> tuple[Bracket, Match] | None:
+        # The match is decided (or abandoned): stop tracking it
+        entry = self.matches.pop(session_id, None)
+        if entry is None:
+            return None
+        ACTIVE_MATCHES.dec()
+        self.arrived.pop(session_id, None)
+        deadline = self._deadlines.pop(session_id, None)
+        if deadline is not None:
+            deadline.cancel()
+        return entry
+
+    def _start(self, bracket: Bracket, match: Match):
+        if match.is_bye():
+            self._decide(bracket, match, match.players[0])
+            return
+
+        session_id = str(uuid.uuid4())
+        match.session_id = session_id
+        game = self.games[session_id] = {"positions": {}, "turn": None, "players": {}, "winner": None}
+        self.record(session_id, "match", tournament=bracket.id, round=match.round, slot=match.slot)
+        # players[0] is seated first, so it rolls first
+        for username in match.players:
+            if username in bracket.bots:
+                self.bot_manager.add(session_id, delay=bracket.bot_delay, username=username)
+            else:
+                game["positions"][username] = 0
+                game["players"][username] = {"display_name": username, "display_avatar": "🙂"}
+                self.record(session_id, "join", user=username)
+                self.record(session_id, "player_info", user=username, name=username, avatar="🙂")
+        self.matches[session_id] = (bracket, match)
+        ACTIVE_MATCHES.inc()
+        self._queue_match(bracket, match)
+        arrived = self.arrived[session_id] = {p for p in match.players if p in bracket.bots}
+        if len(arrived) < len(match.players):
+            self._deadlines[session_id] = asyncio.get_running_loop().call_later(
+                NO_SHOW_SECONDS, self._no_show, session_id)
+
+    def _decide(self, bracket: Bracket, match: Match, winner: str):
+        match.winner = winner
+        self._queue_match(bracket, match)
+
+        if match.round + 1 == len(bracket.rounds):
+            bracket.winner = winner
+            # Stays in memory until the result is flushed, see flush()
+            self._queue_tournament(bracket, "finished")
+            return
+
+        following = bracket.rounds[match.round + 1][match.slot // 2]
+        following.players[match.slot % 2] = winner
+        if None not in following.players:
+            self._start(bracket, following)
+
+    # ---------- recovery ----------
+
+    async def recover(self):
+        """Resume every running tournament from the database"""
+        brackets = await asyncio.to_thread(self._load_running)
+        for bracket in brackets:
+            self.brackets[bracket.id] = bracket
+            for matches in bracket.rounds:
+                for match in matches:
+                    if match.winner is None and match.players[0] is not None and (
+                            match.players[1] is not None or match.is_bye()):
+                        self._start(bracket, match)
+
+    def _load_running(self) -> list[Bracket]:
+        from database import SessionLocal, Tournament
+
+        db = SessionLocal()
+        try:
+            ids = [t.id for t in db.query(Tournament.id).filter(Tournament.status == "running")]
+        finally:
+            db.close()
+        return [bracket for bracket in map(self._load, ids) if bracket is not None]
+
+    def _load(self, tournament_id: str) -> Bracket | None:
+        from database import SessionLocal, Tournament, TournamentMatch
+
+        db = SessionLocal()
+        try:
+            row = db.query(Tournament).filter(Tournament.id == tournament_id).first()
+            if row is None:
+                return None
+            bracket = Bracket(row.id, row.size, set(filter(None, (row.bots or "").split(","))), row.bot_delay)
+            bracket.winner = row.winner
+            for m in db.query(TournamentMatch).filter(TournamentMatch.tournament_id == tournament_id):
+                match = bracket.rounds[m.round][m.slot]
+                match.players = [m.player_a, m.player_b]
+                match.winner = m.winner
+        finally:
+            db.close()
+
+        # Winners whose next-round row was still queued at shutdown
+        for matches in bracket.rounds[:-1]:
+            for match in matches:
+                if match.winner is not None:
+                    bracket.rounds[match.round + 1][match.slot // 2].players[match.slot % 2] = match.winner
+        final = bracket.rounds[-1][0]
+        if final.winner is not None:
+            bracket.winner = final.winner
+        return bracket
+
+    # ---------- batched persistence ----------
+
+    def _match_row(self, bracket: Bracket, match: Match) -> dict:
+        return {"tournament_id": bracket.id, "round": match.round, "slot": match.slot,
+                "player_a": match.players[0], "player_b": match.players[1], "winner": match.winner}
+
+    def _tournament_row(self, bracket: Bracket, status: str) -> dict:
+        return {"id": bracket.id, "size": bracket.size, "bots": ",".join(sorted(bracket.bots)),
+                "bot_delay": bracket.bot_delay, "status": status, "winner": bracket.winner}
+
+    def _queue_match(self, bracket: Bracket, match: Match):
+        # Later updates of the same match replace earlier ones in the batch
+        self._pending_matches[(bracket.id, match.round, match.slot)] = self._match_row(bracket, match)
+        self._dirty.set()
+
+    def _queue_tournament(self, bracket: Bracket, status: str):
+        self._pending_tournaments[bracket.id] = self._tournament_row(bracket, status)
+        self._dirty.set()
+
+    async def run_writer(self):
+        """Background task: flush queued rows at most every FLUSH_INTERVAL seconds"""
+        while True:
+            await self._dirty.wait()
+            await asyncio.sleep(FLUSH_INTERVAL)
+            await self.flush()
+
+    async def flush(self):
+        self._dirty.clear()
+        tournaments, matches = self._pending_tournaments, self._pending_matches
+        if not tournaments and not matches:
+            return
+        self._pending_tournaments, self._pending_matches = {}, {}
+        try:
+            await asyncio.to_thread(self._write, list(tournaments.values()), list(matches.values()))
+        except Exception:
+            FLUSH_ERRORS.inc()
+            # Put the batch back under anything queued meanwhile and retry on the next flush
+            for key, row in tournaments.items():
+                self._pending_tournaments.setdefault(key, row)
+            for key, row in matches.items():
+                self._pending_matches.setdefault(key, row)
+            self._dirty.set()
+            return
+        for tournament_id, row in tournaments.items():
+            if row["status"] == "finished":
+                self.brackets.pop(tournament_id, None)
+
+    def _write(self, tournaments: list[dict], matches: list[dict]):
+        from database import SessionLocal, Tournament, TournamentMatch
+
+        start = perf_counter()
+        db = SessionLocal()
+        try:
+            # One executemany upsert per table: rows may or may not exist yet
+            for model, rows in ((Tournament, tournaments), (TournamentMatch, matches)):
+                if rows:
+                    db.execute(upsert(model), rows)
+            db.commit()
+        finally:
+            db.close()
+        FLUSHED_ROWS.inc(amount=len(tournaments) + len(matches))
+        FLUSH_SECONDS.observe(perf_counter() - start)